@@ -1,27 +1,47 @@
 from __future__ import annotations
 
+from typing import Any, Dict, Optional
+
 from flask import Flask
 from flask_migrate import Migrate
 
 from app.controllers import register_blueprints
+from app.database import init_database
 from app.extensions import db
+from app.profiler import init_profiler
+from app.query_counter import init_query_counting
+from app.services.agent_service import init_agent_identity
+from app.services.material_scheduler import init_material_scheduler, register_material_commands
+from app.services.task_service import register_task_commands
+from app.services.travel_log_writer import init_travel_log_writer
+from bench.commands import register_bench_commands
 from seeds.agent_seed import register_agent_seed_commands
 from seeds.cities_seed import register_city_seed_commands
 from seeds.lab_seed import register_lab_seed_commands
 from seeds.trainlines_seed import register_trainlines_commands
 
 
-def create_app() -> Flask:
+def create_app(config_overrides: Optional[Dict[str, Any]] = None) -> Flask:
     app = Flask(__name__)
     app.config.from_object("config.Config")
+    # přebití konfigurace pro scratch aplikace (bench market-stress)
+    app.config.update(config_overrides or {})
 
-    db.init_app(app)
+    init_agent_identity(app)
+    init_database(app)
     Migrate(app, db)
+    init_query_counting(app)
+    init_profiler(app)
+    init_travel_log_writer(app)
+    init_material_scheduler(app)
 
     register_blueprints(app)
     register_city_seed_commands(app)
     register_trainlines_commands(app)
     register_lab_seed_commands(app)
     register_agent_seed_commands(app)
+    register_material_commands(app)
+    register_task_commands(app)
+    register_bench_commands(app)
 
     return app
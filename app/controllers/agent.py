@@ -1,17 +1,38 @@
 from __future__ import annotations
 
-from typing import Any, Dict
+from typing import Any, Dict, List
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request, stream_with_context
 
 from app.domain.agent.level_config import AGENT_LEVELS
 from app.extensions import db
 from app.models.agent import Agent
 from app.models.city import City
-from app.models.agent_travel_log import AgentTravelLog
+from app.query_counter import query_budget, read_only
+from app.services.agent_service import AgentError, create_agent, get_current_agent, login_agent, logout_agent
+from app.services.lab_service import build_lab_overview
+from app.services.material_service import serialize_city_material_state
+from app.services.task_service import (
+    advance_task_pipeline,
+    get_pending_story_dialogs,
+    list_agent_tasks,
+    list_task_payloads,
+)
+from app.services.travel_log_service import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    InvalidCursor,
+    fetch_travel_log_page,
+    iter_travel_log_ndjson,
+)
+from app.services.travel_log_writer import build_travel_row, flush_travel_log, record_travel
+from app.services.travel_stats_service import clear_travel_rollups, get_agent_stats
 
 bp = Blueprint("agent", __name__, url_prefix="/api")
 
+# sekce /api/dashboard v pořadí odpovědi; ?fields= vybírá podmnožinu
+DASHBOARD_SECTIONS = ("agent", "levels", "tasks", "story_dialogs", "lab", "city_materials")
+
 MINUTES_PER_DAY = 24 * 60
 MINUTES_PER_WEEK = MINUTES_PER_DAY * 7
 DAY_NAMES = ["Po", "Út", "St", "Čt", "Pá", "So", "Ne"]
@@ -133,16 +154,54 @@ def _extract_game_clock(payload: Dict[str, Any]) -> Dict[str, Any]:
 
 
 @bp.get("/agent")
+@query_budget(2)
 def api_agent():
     """Return the active agent and level configuration for the UI."""
-    agent = Agent.query.order_by(Agent.id.asc()).first()
+    agent = get_current_agent()
     return jsonify({"agent": _serialize_agent(agent), "levels": AGENT_LEVELS})
 
 
+@bp.post("/agents")
+@query_budget(14)
+def api_agent_create():
+    """Create a new agent (own playthrough) and bind it to the session; the token is for cookie-less clients."""
+    payload = request.get_json(silent=True) or {}
+    city_id = payload.get("city_id")
+    if city_id is not None:
+        try:
+            city_id = int(city_id)
+        except (TypeError, ValueError):
+            return jsonify({"error": "invalid_city_id"}), 400
+        city = db.session.get(City, city_id)
+        if city is None:
+            return jsonify({"error": "city_not_found"}), 404
+    else:
+        city = City.query.order_by(City.id.asc()).first()
+
+    try:
+        agent = create_agent(codename=payload.get("codename"), city=city)
+    except AgentError as exc:
+        db.session.rollback()
+        return jsonify({"error": exc.code}), exc.status
+    db.session.commit()
+    advance_task_pipeline(agent)
+    token = login_agent(agent)
+    return jsonify({"agent": _serialize_agent(agent), "token": token}), 201
+
+
+@bp.delete("/agent/session")
+@query_budget(0)
+def api_agent_logout():
+    """Forget the agent bound to this session (falls back to the default agent)."""
+    logout_agent()
+    return jsonify({"ok": True})
+
+
 @bp.post("/agent/location")
+@query_budget(7)
 def api_agent_update_location():
     """Persist the agent's current city from the FE."""
-    agent = Agent.query.order_by(Agent.id.asc()).first()
+    agent = get_current_agent()
     if not agent:
         return jsonify({"error": "Agent not found"}), 404
 
@@ -161,32 +220,24 @@ def api_agent_update_location():
     agent.last_city_id = previous_city_id
     agent.current_city_id = city.id
     agent.current_city = city
+    agent.record_trip()
 
-    travel_log = AgentTravelLog(
-        agent_id=agent.id,
-        from_city_id=previous_city_id,
-        to_city_id=city.id,
-        action="travel",
-        game_minutes=clock["minutes"],
-        game_week=clock["week_index"],
-        game_day_index=clock["day_index"],
-        game_day_label=clock["day_label"],
-        game_time_label=clock["time_label"],
-    )
-
-    db.session.add(travel_log)
+    travel_log = record_travel(build_travel_row(agent.id, previous_city_id, city.id, clock))
     db.session.commit()
-    db.session.refresh(travel_log)
 
-    return jsonify({"agent": _serialize_agent(agent), "travel_log": travel_log.serialize()})
+    return jsonify({"agent": _serialize_agent(agent), "travel_log": travel_log})
 
 
 @bp.post("/agent/reset")
+@query_budget(7)
 def api_agent_reset():
     """Reset agent stats so a new playthrough can start from level 1."""
-    agent = Agent.query.order_by(Agent.id.asc()).first()
+    agent = get_current_agent()
     if not agent:
         return jsonify({"error": "Agent not found"}), 404
+    # dopsat buffer travel logu (vlastní transakcí, dřív než tahle začne zapisovat),
+    # jinak by cesty z minulé hry po resetu znovu naplnily souhrny
+    flush_travel_log()
 
     base_cfg = _level_cfg(1) or {"energy_max": 0}
     energy_max = base_cfg.get("energy_max", 0)
@@ -210,29 +261,123 @@ def api_agent_reset():
     agent.material_max = material_max
     agent.hq_city_id = None
     agent.credits = 0
-    agent.inventory = Agent.normalize_inventory({})
+    agent.clear_inventory()
     agent.infection_level = 0
+    # souhrny cest patří k total_trips – nová hra je začíná od nuly
+    clear_travel_rollups(agent.id)
 
     db.session.commit()
     return jsonify({"agent": _serialize_agent(agent)})
 
 
+def _travel_log_filters() -> Dict[str, Any]:
+    return {
+        "game_week": request.args.get("game_week", type=int),
+        "game_day_index": request.args.get("game_day_index", type=int),
+        "city_id": request.args.get("city_id", type=int),
+    }
+
+
 @bp.get("/agent/travel-log")
+@query_budget(3)
 def api_agent_travel_log():
-    """Return the latest logged travels for the agent."""
-    agent = Agent.query.order_by(Agent.id.asc()).first()
+    """Return one page of the agent's travel history, newest first.
+
+    Query params: `limit` (1–200, default 25), `cursor` (the `next_cursor`
+    of the previous page), `game_week`, `game_day_index`, `city_id`
+    (departure or arrival city).
+    """
+    agent = get_current_agent()
     if not agent:
-        return jsonify({"logs": []})
+        return jsonify({"logs": [], "next_cursor": None})
+    flush_travel_log()
 
-    limit = request.args.get("limit", default=25, type=int)
+    limit = request.args.get("limit", default=DEFAULT_PAGE_SIZE, type=int)
     if limit is None or limit <= 0:
-        limit = 25
-    limit = min(limit, 200)
-
-    logs = (
-        AgentTravelLog.query.filter_by(agent_id=agent.id)
-        .order_by(AgentTravelLog.created_at.desc())
-        .limit(limit)
-        .all()
+        limit = DEFAULT_PAGE_SIZE
+    limit = min(limit, MAX_PAGE_SIZE)
+
+    try:
+        logs, next_cursor = fetch_travel_log_page(
+            agent.id,
+            limit=limit,
+            cursor=request.args.get("cursor") or None,
+            **_travel_log_filters(),
+        )
+    except InvalidCursor:
+        return jsonify({"error": "invalid_cursor"}), 400
+    return jsonify({"logs": logs, "next_cursor": next_cursor})
+
+
+@bp.get("/agent/travel-log/export")
+@query_budget(2)
+def api_agent_travel_log_export():
+    """Stream the agent's full travel history (oldest first) as NDJSON; same filters as travel-log."""
+    agent = get_current_agent()
+    if not agent:
+        return jsonify({"error": "Agent not found"}), 404
+    flush_travel_log()
+
+    response = Response(
+        stream_with_context(iter_travel_log_ndjson(agent.id, **_travel_log_filters())),
+        mimetype="application/x-ndjson",
     )
-    return jsonify({"logs": [log.serialize() for log in logs]})
+    response.headers["Content-Disposition"] = f'attachment; filename="travel-log-agent-{agent.id}.ndjson"'
+    return response
+
+
+@bp.get("/agent/stats")
+@query_budget(6)
+def api_agent_stats():
+    """Return travel statistics (top cities, most used connections, recent game weeks) from the rollup tables."""
+    agent = get_current_agent()
+    if not agent:
+        return jsonify({"error": "Agent not found"}), 404
+    flush_travel_log()
+    return jsonify({"stats": get_agent_stats(agent)})
+
+
+def _dashboard_fields() -> List[str] | None:
+    raw = request.args.get("fields")
+    if not raw:
+        return list(DASHBOARD_SECTIONS)
+    requested = {field.strip() for field in raw.split(",") if field.strip()}
+    if requested - set(DASHBOARD_SECTIONS):
+        return None
+    return [section for section in DASHBOARD_SECTIONS if section in requested]
+
+
+@bp.get("/dashboard")
+@query_budget(5)
+@read_only
+def api_dashboard():
+    """
+    Everything the UI refreshes on load and after actions in one response:
+    agent, levels, tasks, story_dialogs, lab and city_materials (of the current
+    city). `?fields=agent,tasks` returns only the listed sections. The agent and
+    its task rows are loaded once and shared by all sections.
+    """
+    fields = _dashboard_fields()
+    if fields is None:
+        return jsonify({"error": "unknown_fields", "allowed": list(DASHBOARD_SECTIONS)}), 400
+
+    # levels jsou statická konfigurace – agenta není třeba načítat
+    agent = get_current_agent() if set(fields) - {"levels"} else None
+    tasks = list_agent_tasks(agent) if agent and {"tasks", "story_dialogs"} & set(fields) else []
+
+    payload: Dict[str, Any] = {}
+    for field in fields:
+        if field == "agent":
+            payload["agent"] = _serialize_agent(agent)
+        elif field == "levels":
+            payload["levels"] = AGENT_LEVELS
+        elif field == "tasks":
+            payload["tasks"] = list_task_payloads(agent, tasks) if agent else []
+        elif field == "story_dialogs":
+            payload["story_dialogs"] = get_pending_story_dialogs(agent, tasks)
+        elif field == "lab":
+            payload["lab"] = build_lab_overview(agent)
+        elif field == "city_materials":
+            city = agent.current_city if agent else None
+            payload["city_materials"] = serialize_city_material_state(city) if city else None
+    return jsonify(payload)
@@ -2,14 +2,16 @@ from __future__ import annotations
 
 from flask import Blueprint, jsonify
 
-from app.models.agent import Agent
+from app.query_counter import query_budget
+from app.services.agent_service import get_current_agent
 from app.services.lab_service import build_lab_overview
 
 bp = Blueprint("lab", __name__, url_prefix="/api/lab")
 
 
 @bp.get("/actions")
+@query_budget(4)
 def api_lab_actions():
-    agent = Agent.query.order_by(Agent.id.asc()).first()
+    agent = get_current_agent()
     overview = build_lab_overview(agent)
     return jsonify(overview)
@@ -1,22 +1,21 @@
 from __future__ import annotations
 
-from datetime import datetime
-
-from flask import Blueprint, jsonify, render_template, request
+from flask import Blueprint, Response, abort, jsonify, render_template, request, stream_with_context
 
 from app.extensions import db
-from app.models.agent import Agent
 from app.models.city import City
-from app.models.train_line import TrainLine
+from app.query_counter import query_budget
+from app.services.agent_service import get_current_agent
+from app.services.map_payload_service import STREAM_SOURCES, get_map_payload, iter_map_payload_stream
+from app.services.market_service import MarketError, buy_materials, collect_materials
 from app.services.material_service import (
-    maybe_refresh_material_state,
+    refresh_material_states,
     serialize_city_material_state,
 )
-from app.services.timetable_service import (
-    compute_line_distance_miles,
-    compute_next_departures,
-    compute_travel_minutes,
-)
+from app.services.rail_network_service import get_rail_network
+from app.services.route_service import plan_fastest_route
+from app.services.task_payload_cache import clear_task_payload_cache, task_payload_cache_stats
+from app.services.timetable_service import compute_next_departures
 
 bp = Blueprint("main", __name__)
 
@@ -26,60 +25,52 @@ def index():
     return render_template("index.html")
 
 
+def _send_map_payload(name: str) -> Response:
+    """
+    Serve a precomputed map payload with ETag / If-None-Match and pre-compressed
+    gzip/brotli variants. `?stream=1` serializes the JSON in chunks instead of
+    holding the whole blob (for very large maps; no ETag, no compression).
+    """
+    if request.args.get("stream", type=int) and name in STREAM_SOURCES:
+        return Response(
+            stream_with_context(iter_map_payload_stream(name)),
+            mimetype="application/json",
+        )
+
+    payload = get_map_payload(name)
+    encoding, body, etag = payload.variant(request.accept_encodings)
+    response = Response(body, mimetype=payload.mimetype)
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    response.headers["Vary"] = "Accept-Encoding"
+    response.cache_control.no_cache = True
+    response.set_etag(etag)
+    return response.make_conditional(request)
+
+
 @bp.get("/api/cities")
+@query_budget(2)
 def api_cities():
     """Return all cities for the canvas map."""
-    cities = City.query.all()
-    data = []
-    for city in cities:
-        data.append({
-            "id": city.id,
-            "name": city.name,
-            "region": city.region.code if city.region else None,
-            "importance": city.importance,
-            "state": city.state,
-            "state_shortcut": city.state_shortcut,
-            "description": city.description,
-            "lat": city.lat,
-            "lon": city.lon,
-            "px": city.px,
-            "py": city.py,
-            "grid_x": city.grid_x,
-            "grid_y": city.grid_y,
-            "population": city.population,
-        })
-    return jsonify(data)
+    return _send_map_payload("cities")
 
 
 @bp.get("/api/trainlines")
+@query_budget(3)
 def api_trainlines():
-    """Return all train lines for the canvas map."""
-    lines = TrainLine.query.all()
-    data = []
-    for line in lines:
-        from_city = line.from_city
-        to_city = line.to_city
-        data.append({
-            "from": {
-                "id": from_city.id,
-                "name": from_city.name,
-                "px": from_city.px,
-                "py": from_city.py,
-            },
-            "to": {
-                "id": to_city.id,
-                "name": to_city.name,
-                "px": to_city.px,
-                "py": to_city.py,
-            },
-            "line_type": line.line_type,
-            "frequency_minutes": line.frequency_minutes,
-            "distance_units": compute_line_distance_miles(line),
-        })
-    return jsonify(data)
+    """Return all train lines for the canvas map (served from the in-memory network)."""
+    return _send_map_payload("trainlines")
+
+
+@bp.get("/api/map.bin")
+@query_budget(3)
+def api_map_bin():
+    """Return cities and train lines as a packed binary layout (see map_binary_service)."""
+    return _send_map_payload("map.bin")
 
 
 @bp.get("/api/timetable")
+@query_budget(3)
 def api_timetable():
     city_id = request.args.get("city_id", type=int)
     current_minutes = request.args.get("minutes", type=int)
@@ -91,22 +82,13 @@ def api_timetable():
         limit = 30
     limit = min(limit, 100)
 
-    city = City.query.get_or_404(city_id)
+    city = get_rail_network().city(city_id)
+    if city is None:
+        abort(404)
     departures = compute_next_departures(city, current_minutes, limit=limit)
 
     def to_dict(dep):
         line = dep["line"]
-        travel = dep.get("travel_minutes")
-        distance_miles = dep.get("distance_units")
-
-        if travel is None:
-            travel = compute_travel_minutes(
-                line,
-                line.from_city.importance,
-                line.to_city.importance,
-                distance_miles=distance_miles if distance_miles is not None else None,
-            )
-
         return {
             "departure_minutes": dep["departure_minutes"],
             "from_city": {
@@ -119,44 +101,81 @@ def api_timetable():
             },
             "line_type": line.line_type,
             "frequency_minutes": line.frequency_minutes,
-            "distance_units": (
-                distance_miles if distance_miles is not None else compute_line_distance_miles(line)
-            ),
-            "travel_minutes": travel,
+            "distance_units": dep["distance_units"],
+            "travel_minutes": dep["travel_minutes"],
         }
 
     return jsonify([to_dict(dep) for dep in departures])
 
 
-def _get_primary_agent() -> Agent | None:
-    return Agent.query.order_by(Agent.id.asc()).first()
+@bp.get("/api/routes")
+@query_budget(3)
+def api_routes():
+    """Return the fastest multi-hop train connection between two cities."""
+    from_city_id = request.args.get("from_city_id", type=int)
+    to_city_id = request.args.get("to_city_id", type=int)
+    current_minutes = request.args.get("minutes", type=int)
+
+    if from_city_id is None or to_city_id is None or current_minutes is None:
+        return jsonify({"error": "from_city_id, to_city_id and minutes are required"}), 400
+
+    network = get_rail_network()
+    from_city = network.city(from_city_id)
+    to_city = network.city(to_city_id)
+    if from_city is None or to_city is None:
+        abort(404)
+
+    legs = plan_fastest_route(from_city_id, to_city_id, current_minutes, network=network)
+    if legs is None:
+        return jsonify({"error": "route_not_found"}), 404
+
+    arrival_minutes = legs[-1]["arrival_minutes"] if legs else current_minutes
+    return jsonify({
+        "from_city": {"id": from_city.id, "name": from_city.name},
+        "to_city": {"id": to_city.id, "name": to_city.name},
+        "departure_minutes": current_minutes,
+        "arrival_minutes": arrival_minutes,
+        "total_minutes": arrival_minutes - current_minutes,
+        "legs": [
+            {
+                "from_city": {"id": leg["from_city"].id, "name": leg["from_city"].name},
+                "to_city": {"id": leg["to_city"].id, "name": leg["to_city"].name},
+                "departure_minutes": leg["departure_minutes"],
+                "arrival_minutes": leg["arrival_minutes"],
+                "wait_minutes": leg["wait_minutes"],
+                "line_type": leg["line"].line_type,
+                "frequency_minutes": leg["line"].frequency_minutes,
+                "distance_units": leg["distance_units"],
+                "travel_minutes": leg["travel_minutes"],
+            }
+            for leg in legs
+        ],
+    })
 
 
 @bp.get("/api/cities/<int:city_id>/materials")
+@query_budget(1)
 def api_city_materials(city_id: int):
+    # stav obnovuje plánovač / `flask materials refresh`, GET jen čte
     city = City.query.get_or_404(city_id)
-    maybe_refresh_material_state(city)
-    db.session.commit()
     return jsonify(serialize_city_material_state(city))
 
 
 @bp.post("/api/cities/<int:city_id>/materials/collect")
+@query_budget(5)
 def api_collect_city_materials(city_id: int):
     city = City.query.get_or_404(city_id)
-    agent = _get_primary_agent()
+    agent = get_current_agent()
     if not agent:
         return jsonify({"error": "agent_not_found"}), 404
     if agent.current_city_id != city.id:
         return jsonify({"error": "agent_not_in_city"}), 400
 
-    maybe_refresh_material_state(city)
-    capacity = max(0, (agent.material_max or 0) - (agent.material_current or 0))
-    collect_qty = min(city.material_info_qty or 0, capacity)
-    if collect_qty <= 0:
-        return jsonify({"error": "no_material_available"}), 400
-
-    city.material_info_qty = max(0, (city.material_info_qty or 0) - collect_qty)
-    agent.material_current = (agent.material_current or 0) + collect_qty
+    try:
+        collect_qty = collect_materials(agent, city)
+    except MarketError as exc:
+        db.session.rollback()
+        return jsonify({"error": exc.code}), exc.status
     db.session.commit()
 
     return jsonify(
@@ -172,6 +191,7 @@ def api_collect_city_materials(city_id: int):
 
 
 @bp.post("/api/cities/<int:city_id>/materials/buy")
+@query_budget(6)
 def api_buy_city_materials(city_id: int):
     payload = request.get_json(silent=True) or {}
     qty_requested = payload.get("quantity", 1)
@@ -182,33 +202,17 @@ def api_buy_city_materials(city_id: int):
     qty_requested = max(1, qty_requested)
 
     city = City.query.get_or_404(city_id)
-    agent = _get_primary_agent()
+    agent = get_current_agent()
     if not agent:
         return jsonify({"error": "agent_not_found"}), 404
     if agent.current_city_id != city.id:
         return jsonify({"error": "agent_not_in_city"}), 400
 
-    maybe_refresh_material_state(city)
-    if not city.market_material_qty or city.market_material_qty <= 0:
-        return jsonify({"error": "market_empty"}), 400
-    if not city.market_material_price:
-        return jsonify({"error": "price_missing"}), 400
-
-    capacity = max(0, (agent.material_max or 0) - (agent.material_current or 0))
-    purchasable_qty = min(city.market_material_qty, qty_requested, capacity)
-    if purchasable_qty <= 0:
-        return jsonify({"error": "no_capacity"}), 400
-
-    inventory = Agent.normalize_inventory(agent.inventory)
-    money = inventory.get("money", 0)
-    total_cost = purchasable_qty * city.market_material_price
-    if money < total_cost:
-        return jsonify({"error": "insufficient_funds"}), 400
-
-    inventory["money"] = money - total_cost
-    agent.inventory = inventory
-    agent.material_current = (agent.material_current or 0) + purchasable_qty
-    city.market_material_qty = max(0, city.market_material_qty - purchasable_qty)
+    try:
+        purchased_qty, total_cost = buy_materials(agent, city, qty_requested)
+    except MarketError as exc:
+        db.session.rollback()
+        return jsonify({"error": exc.code}), exc.status
     db.session.commit()
 
     return jsonify(
@@ -216,10 +220,10 @@ def api_buy_city_materials(city_id: int):
             "agent": {
                 "material_current": agent.material_current,
                 "material_max": agent.material_max,
-                "money": inventory["money"],
+                "money": agent.inventory["money"],
             },
             "city_materials": serialize_city_material_state(city),
-            "purchased_qty": purchasable_qty,
+            "purchased_qty": purchased_qty,
             "total_cost": total_cost,
         }
     )
@@ -229,21 +233,27 @@ def api_buy_city_materials(city_id: int):
 def api_debug_refresh_materials():
     payload = request.get_json(silent=True) or {}
     city_id = payload.get("city_id")
-    refreshed = []
+    city_ids = None
     if city_id is not None:
         try:
             city_id = int(city_id)
         except (TypeError, ValueError):
             return jsonify({"error": "invalid_city_id"}), 400
-        city = City.query.get(city_id)
-        if not city:
+        if db.session.get(City, city_id) is None:
             return jsonify({"error": "city_not_found"}), 404
-        maybe_refresh_material_state(city, now=datetime.now())
-        refreshed.append(serialize_city_material_state(city))
-    else:
-        cities = City.query.all()
-        for city in cities:
-            maybe_refresh_material_state(city, now=datetime.now())
-            refreshed.append(serialize_city_material_state(city))
+        city_ids = [city_id]
+    refresh_material_states(city_ids=city_ids, force=bool(payload.get("force")))
     db.session.commit()
+    cities = City.query.filter(City.id.in_(city_ids)) if city_ids else City.query
+    refreshed = [serialize_city_material_state(city) for city in cities.order_by(City.id)]
     return jsonify({"refreshed": refreshed, "count": len(refreshed)})
+
+
+@bp.route("/api/debug/task-cache", methods=["GET", "DELETE"])
+@query_budget(0)
+def api_debug_task_cache():
+    """Hit/miss counters of the rendered task payload cache (DELETE clears it)."""
+    if request.method == "DELETE":
+        clear_task_payload_cache()
+        return jsonify({"ok": True})
+    return jsonify(task_payload_cache_stats())
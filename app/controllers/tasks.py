@@ -2,11 +2,12 @@ from __future__ import annotations
 
 from flask import Blueprint, jsonify
 
-from app.models.agent import Agent
+from app.query_counter import query_budget, read_only
+from app.services.agent_service import get_current_agent
 from app.services.task_service import (
+    advance_task_pipeline,
     claim_reward,
     complete_objective_step,
-    ensure_task_pipeline,
     get_pending_story_dialogs,
     list_task_payloads,
     reset_task_pipeline,
@@ -17,9 +18,11 @@ bp = Blueprint("tasks", __name__, url_prefix="/api/tasks")
 
 @bp.get("")
 @bp.get("/")
+@query_budget(3)
+@read_only
 def api_tasks():
     """Return active/completed tasks for the main quest pipeline."""
-    agent = Agent.query.order_by(Agent.id.asc()).first()
+    agent = get_current_agent()
     if not agent:
         return jsonify({"tasks": []})
     tasks = list_task_payloads(agent)
@@ -27,9 +30,11 @@ def api_tasks():
 
 
 @bp.get("/story-dialogs")
+@query_budget(3)
+@read_only
 def api_story_dialogs():
     """Return dialogs that should appear in contextual panels (lab, HQ, ...)."""
-    agent = Agent.query.order_by(Agent.id.asc()).first()
+    agent = get_current_agent()
     if not agent:
         return jsonify({"dialogs": []})
     dialogs = get_pending_story_dialogs(agent)
@@ -37,9 +42,10 @@ def api_story_dialogs():
 
 
 @bp.post("/<task_id>/objectives/<int:objective_index>/complete")
+@query_budget(13)
 def api_complete_task_objective(task_id: str, objective_index: int):
     """Mark an objective as completed and grant rewards."""
-    agent = Agent.query.order_by(Agent.id.asc()).first()
+    agent = get_current_agent()
     if not agent:
         return jsonify({"error": "Agent not found"}), 404
 
@@ -47,7 +53,7 @@ def api_complete_task_objective(task_id: str, objective_index: int):
     if not result.get("ok"):
         return jsonify({"error": result.get("reason", "unknown")}), 400
 
-    ensure_task_pipeline(agent)
+    advance_task_pipeline(agent)
 
     response = {"task": result.get("task")}
     if result.get("xp_awarded"):
@@ -56,9 +62,10 @@ def api_complete_task_objective(task_id: str, objective_index: int):
 
 
 @bp.post("/<task_id>/claim")
+@query_budget(13)
 def api_claim_task_reward(task_id: str):
     """Claim reward for a completed task."""
-    agent = Agent.query.order_by(Agent.id.asc()).first()
+    agent = get_current_agent()
     if not agent:
         return jsonify({"error": "Agent not found"}), 404
 
@@ -66,7 +73,7 @@ def api_claim_task_reward(task_id: str):
     if not result.get("ok"):
         return jsonify({"error": result.get("reason", "unknown")}), 400
 
-    ensure_task_pipeline(agent)
+    advance_task_pipeline(agent)
 
     response = {"task": result.get("task")}
     if result.get("xp_awarded"):
@@ -75,9 +82,10 @@ def api_claim_task_reward(task_id: str):
 
 
 @bp.post("/reset")
+@query_budget(13)
 def api_reset_tasks():
     """Reset the task pipeline and enqueue a fresh set."""
-    agent = Agent.query.order_by(Agent.id.asc()).first()
+    agent = get_current_agent()
     if not agent:
         return jsonify({"error": "Agent not found"}), 404
 
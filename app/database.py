@@ -0,0 +1,139 @@
+# app/database.py
+#
+# Nastavení DB enginu z configu:
+# - SQLite: WAL (čtení neblokuje zápis), synchronous=NORMAL, busy timeout,
+#   mmap a pool spojení nad souborovou DB; PRAGMA se nastaví na každém novém spojení
+# - PostgreSQL (DATABASE_URL=postgresql://…): pool s pre-pingem a recyklací,
+#   volitelný statement_timeout; ovladač psycopg 3 (requirements-postgres.txt)
+# Explicitně zadané SQLALCHEMY_ENGINE_OPTIONS mají vždy přednost.
+
+from __future__ import annotations
+
+import weakref
+from typing import Any, Dict, Mapping
+
+from flask import Flask
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+
+from app.extensions import db
+
+# výchozí pool podle backendu (DB_POOL_SIZE / DB_MAX_OVERFLOW je přebijí)
+POOL_DEFAULTS = {
+    "sqlite": {"pool_size": 5, "max_overflow": 10},
+    "postgresql": {"pool_size": 10, "max_overflow": 20, "pool_pre_ping": True, "pool_recycle": 1800},
+}
+
+_pragma_engines: "weakref.WeakSet[Engine]" = weakref.WeakSet()
+
+
+def normalize_database_url(url: str) -> str:
+    """postgres:// (Heroku a spol.) a postgresql:// bez ovladače → postgresql+psycopg://."""
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+    if url.startswith("postgresql://"):
+        url = "postgresql+psycopg://" + url[len("postgresql://"):]
+    return url
+
+
+def _is_memory_sqlite(url) -> bool:
+    return url.database in (None, "", ":memory:") or url.query.get("mode") == "memory"
+
+
+def build_engine_options(config: Mapping[str, Any]) -> Dict[str, Any]:
+    """Parametry create_engine pro backend ze SQLALCHEMY_DATABASE_URI."""
+    url = make_url(config["SQLALCHEMY_DATABASE_URI"])
+    backend = url.get_backend_name()
+    # in-memory SQLite má vlastní SingletonThreadPool bez pool_size
+    pooled = backend != "sqlite" or not _is_memory_sqlite(url)
+    options: Dict[str, Any] = dict(POOL_DEFAULTS.get(backend, {})) if pooled else {}
+    connect_args: Dict[str, Any] = {}
+
+    if backend == "sqlite":
+        connect_args["timeout"] = config.get("SQLITE_BUSY_TIMEOUT_MS", 5000) / 1000
+    elif backend == "postgresql":
+        statement_timeout = config.get("DB_STATEMENT_TIMEOUT_MS")
+        if statement_timeout:
+            connect_args["options"] = f"-c statement_timeout={int(statement_timeout)}"
+
+    if pooled:
+        for key, option in (
+            ("DB_POOL_SIZE", "pool_size"),
+            ("DB_MAX_OVERFLOW", "max_overflow"),
+            ("DB_POOL_TIMEOUT", "pool_timeout"),
+            ("DB_POOL_RECYCLE", "pool_recycle"),
+        ):
+            if config.get(key) is not None:
+                options[option] = config[key]
+
+    if connect_args:
+        options["connect_args"] = connect_args
+    return options
+
+
+def sqlite_pragmas(config: Mapping[str, Any]) -> Dict[str, Any]:
+    """PRAGMA hodnoty pro každé nové SQLite spojení (None = nechat výchozí)."""
+    pragmas = {
+        "journal_mode": config.get("SQLITE_JOURNAL_MODE"),
+        "synchronous": config.get("SQLITE_SYNCHRONOUS"),
+        "busy_timeout": config.get("SQLITE_BUSY_TIMEOUT_MS"),
+        "mmap_size": config.get("SQLITE_MMAP_SIZE"),
+    }
+    return {name: value for name, value in pragmas.items() if value is not None}
+
+
+def install_sqlite_pragmas(engine: Engine, pragmas: Dict[str, Any]) -> None:
+    """Na každém novém spojení enginu nastaví PRAGMA (opakované volání nic nedělá)."""
+    if engine.dialect.name != "sqlite" or not pragmas or engine in _pragma_engines:
+        return
+    _pragma_engines.add(engine)
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+def dialect_insert():
+    """insert() dialektu aktuální session – kvůli INSERT … ON CONFLICT (SQLite i PostgreSQL)."""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"INSERT … ON CONFLICT is not available on {dialect}")
+    return insert
+
+
+def describe_engine(engine: Engine) -> Dict[str, Any]:
+    """Backend, pool a (u SQLite) skutečné PRAGMA hodnoty – pro bench meta a diagnostiku."""
+    info: Dict[str, Any] = {
+        "backend": engine.dialect.name,
+        "driver": engine.dialect.driver,
+        "pool": type(engine.pool).__name__,
+    }
+    size = getattr(engine.pool, "size", None)
+    if callable(size):
+        info["pool_size"] = size()
+    if engine.dialect.name == "sqlite":
+        with engine.connect() as connection:
+            for name in ("journal_mode", "synchronous", "busy_timeout", "mmap_size"):
+                info[name] = connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+    return info
+
+
+def init_database(app: Flask) -> None:
+    """db.init_app s parametry enginu z configu a SQLite PRAGMA na spojeních."""
+    app.config["SQLALCHEMY_DATABASE_URI"] = normalize_database_url(app.config["SQLALCHEMY_DATABASE_URI"])
+    options = build_engine_options(app.config)
+    options.update(app.config.get("SQLALCHEMY_ENGINE_OPTIONS") or {})
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = options
+
+    db.init_app(app)
+    with app.app_context():
+        install_sqlite_pragmas(db.engine, sqlite_pragmas(app.config))
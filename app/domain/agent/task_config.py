@@ -26,72 +26,94 @@ Pole, která UI očekává na každém úkolu:
 from __future__ import annotations
 
 import random
-from typing import Any, Dict, Iterable, List, Optional, Tuple
-
-from app.models.city import City
-from app.models.region import Region
-from app.models.train_line import TrainLine
-from sqlalchemy import or_
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 
+from flask import current_app
 
-class _SafeFormatDict(dict):
-    """Vrací původní placeholder, pokud není nalezen v replacements."""
+from app.domain.agent.task_registry import QuestTemplateRegistry
+from app.domain.seeded_random import STREAM_QUESTS, keyed_random, world_seed
+from app.models.city import City
+from app.services.rail_network_service import NetworkCity, RailNetwork, get_rail_network
 
-    def __missing__(self, key: str) -> str:
-        return "{" + key + "}"
+CATALOG_EXTENSION_KEY = "quest_city_catalog"
 
 
-def _format_template_value(value: Any, replacements: Dict[str, str]) -> Any:
-    if isinstance(value, str):
-        return value.format_map(_SafeFormatDict(replacements))
-    if isinstance(value, list):
-        return [_format_template_value(item, replacements) for item in value]
-    if isinstance(value, dict):
-        return {key: _format_template_value(val, replacements) for key, val in value.items()}
-    return value
+class CityCatalog:
+    """
+    Města pro placeholdery úkolů v paměti – odvozené ze snímku vlakové sítě:
+    kandidáti rozřazení podle (region, importance), jméno → město a sousedé
+    po aktivních linkách. Síť se po reseedu přestaví (značka mapy), katalog s ní,
+    takže vyplnění placeholderů nepotřebuje žádné SQL.
+    """
 
+    def __init__(self, network: RailNetwork) -> None:
+        self.network = network
+        ordered = sorted(network.cities.values(), key=lambda city: city.id)
+        # kandidáti jen s regionem – dřív City.query.join(Region)
+        self.by_id: Dict[int, NetworkCity] = {city.id: city for city in ordered if city.region_code is not None}
+        self.by_name: Dict[str, NetworkCity] = {}
+        self.by_lower_name: Dict[str, NetworkCity] = {}
+        self.buckets: Dict[Tuple[str, Optional[int]], List[NetworkCity]] = {}
+        for city in ordered:
+            self.by_name.setdefault(city.name, city)
+            self.by_lower_name.setdefault(city.name.lower(), city)
+            if city.region_code is not None:
+                self.buckets.setdefault((city.region_code, city.importance), []).append(city)
+        self.region_codes: List[str] = sorted({region for region, _ in self.buckets})
+        self._neighbors: Dict[int, Set[int]] = {}
+
+    def neighbor_ids(self, city_id: int) -> Set[int]:
+        neighbors = self._neighbors.get(city_id)
+        if neighbors is None:
+            neighbors = self._neighbors[city_id] = set(self.network.neighbors(city_id).neighbor_ids)
+        return neighbors
+
+    def city_names(
+        self,
+        region_codes: Optional[Iterable[str]],
+        *,
+        importance_max: Optional[int] = None,
+        importance_exact: Optional[int] = None,
+        exclude_region_code: Optional[str] = None,
+        include_city_ids: Optional[Iterable[int]] = None,
+    ) -> List[str]:
+        """Jména kandidátů seřazená podle id (stálé pořadí pro klíčovanou náhodu)."""
+        region_codes = list(region_codes or [])
+        if not region_codes and not exclude_region_code and not include_city_ids:
+            return []
 
-def _all_region_codes(exclude: Optional[str] = None) -> List[str]:
-    query = Region.query
-    if exclude:
-        query = query.filter(Region.code != exclude)
-    return [region.code for region in query.all()]
+        def importance_ok(importance: Optional[int]) -> bool:
+            if importance_exact is not None:
+                return importance == importance_exact
+            if importance_max is not None:
+                return importance is not None and importance <= importance_max
+            return True
 
+        regions = set(region_codes or self.region_codes)
+        regions.discard(exclude_region_code)
 
-def _load_city_names(
-    region_codes: Optional[Iterable[str]],
-    *,
-    importance_max: Optional[int] = None,
-    importance_exact: Optional[int] = None,
-    exclude_region_code: Optional[str] = None,
-    include_city_ids: Optional[Iterable[int]] = None,
-) -> List[str]:
-    if not region_codes and not exclude_region_code and not include_city_ids:
-        return []
-
-    query = City.query.join(Region)
-
-    if include_city_ids is not None:
-        ids = list(include_city_ids)
-        if not ids:
-            return []
-        query = query.filter(City.id.in_(ids))
+        if include_city_ids is not None:
+            pool = [self.by_id[city_id] for city_id in sorted(set(include_city_ids)) if city_id in self.by_id]
+            return [city.name for city in pool if city.region_code in regions and importance_ok(city.importance)]
 
-    if region_codes:
-        query = query.filter(Region.code.in_(list(region_codes)))
-    if exclude_region_code:
-        query = query.filter(Region.code != exclude_region_code)
-    if importance_exact is not None:
-        query = query.filter(City.importance == importance_exact)
-    elif importance_max is not None:
-        query = query.filter(City.importance <= importance_max)
-    return [city.name for city in query.all()]
+        pool = [
+            city
+            for (region, importance), bucket in self.buckets.items()
+            if region in regions and importance_ok(importance)
+            for city in bucket
+        ]
+        pool.sort(key=lambda city: city.id)
+        return [city.name for city in pool]
 
 
-def _get_city_by_name(city_name: Optional[str]) -> Optional[City]:
-    if not city_name:
-        return None
-    return City.query.filter(City.name == city_name).first()
+def city_catalog() -> CityCatalog:
+    """Katalog pro aktuální vlakovou síť; po přestavbě sítě (reseed) se postaví znovu."""
+    network = get_rail_network()
+    cached = current_app.extensions.get(CATALOG_EXTENSION_KEY)
+    if cached is None or cached.network is not network:
+        cached = CityCatalog(network)
+        current_app.extensions[CATALOG_EXTENSION_KEY] = cached
+    return cached
 
 
 def _resolve_placeholder_value(
@@ -100,6 +122,7 @@ def _resolve_placeholder_value(
     replacements: Dict[str, str],
     rng: random.Random,
     *,
+    catalog: CityCatalog,
     agent_city: Optional[City] = None,
     hq_city: Optional[City] = None,
 ) -> Optional[str]:
@@ -114,9 +137,8 @@ def _resolve_placeholder_value(
     elif not preferred and fallback_regions:
         preferred = fallback_regions
     elif not preferred and cfg.get("use_all_regions"):
-        preferred = _all_region_codes(
-            agent_region_code if cfg.get("exclude_agent_region") else None
-        )
+        excluded_region = agent_region_code if cfg.get("exclude_agent_region") else None
+        preferred = [code for code in catalog.region_codes if code != excluded_region]
 
     include_city_ids: Optional[List[int]] = None
     source = cfg.get("source")
@@ -134,29 +156,15 @@ def _resolve_placeholder_value(
     connected_placeholder = cfg.get("connected_to_placeholder")
     if connected_placeholder:
         anchor_name = replacements.get(connected_placeholder)
-        anchor_city = _get_city_by_name(anchor_name)
+        anchor_city = catalog.by_name.get(anchor_name) if anchor_name else None
         if anchor_city:
-            lines = (
-                TrainLine.query.filter(
-                    TrainLine.is_active == True,
-                    or_(
-                        TrainLine.from_city_id == anchor_city.id,
-                        TrainLine.to_city_id == anchor_city.id,
-                    ),
-                ).all()
-            )
-            neighbor_ids = set()
-            for line in lines:
-                if line.from_city_id == anchor_city.id:
-                    neighbor_ids.add(line.to_city_id)
-                else:
-                    neighbor_ids.add(line.from_city_id)
+            neighbor_ids = catalog.neighbor_ids(anchor_city.id)
             if include_city_ids is None:
                 include_city_ids = list(neighbor_ids)
             else:
                 include_city_ids = [cid for cid in include_city_ids if cid in neighbor_ids]
 
-    candidates = _load_city_names(
+    candidates = catalog.city_names(
         preferred,
         importance_max=cfg.get("importance_max"),
         importance_exact=cfg.get("importance_exact"),
@@ -205,14 +213,14 @@ def _resolve_placeholder_value(
     return value or default_value
 
 
+def quest_random(agent_id: Optional[int], task_id: str) -> random.Random:
+    """Deterministický generátor pro placeholdery úkolu `task_id` agenta `agent_id`."""
+    return keyed_random(world_seed(), STREAM_QUESTS, agent_id or 0, task_id)
+
+
 def build_template_from_placeholders(template: Dict[str, Any], replacements: Dict[str, Any]) -> Dict[str, Any]:
-    """Vrátí kopii templatu s aplikovanými placeholders."""
-    resolved: Dict[str, Any] = {}
-    for field, value in template.items():
-        if field == "dynamic_placeholders":
-            continue
-        resolved[field] = _format_template_value(value, replacements)
-    return resolved
+    """Vrátí kopii templatu s aplikovanými placeholders (přes předkompilovaný registr)."""
+    return TASK_TEMPLATE_REGISTRY.compiled_for(template).render(replacements)
 
 
 def resolve_template_for_agent(
@@ -223,8 +231,14 @@ def resolve_template_for_agent(
     hq_city: Optional[City] = None,
     rng: Optional[random.Random] = None,
     shared_replacements: Optional[Dict[str, Any]] = None,
+    agent_id: Optional[int] = None,
 ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
-    generator = rng or random
+    """
+    Doplní placeholdery templatu. Bez `rng` se losuje z proudu klíčovaného
+    (WORLD_SEED, agent_id, id úkolu) – stejný agent dostane u úkolu vždy stejná města.
+    """
+    generator = rng or quest_random(agent_id, template.get("id", ""))
+    catalog = city_catalog() if template.get("dynamic_placeholders") else None
     replacements: Dict[str, Any] = {}
     for key, cfg in template.get("dynamic_placeholders", {}).items():
         if shared_replacements is not None and key in shared_replacements:
@@ -235,6 +249,7 @@ def resolve_template_for_agent(
             agent_region_code,
             replacements,
             generator,
+            catalog=catalog,
             agent_city=agent_city,
             hq_city=hq_city,
         )
@@ -587,7 +602,8 @@ AGENT_TASK_TEMPLATES = [
 
 ]
 
-
+# index podle id + předkompilované texty; stavěno jednou při importu
+TASK_TEMPLATE_REGISTRY = QuestTemplateRegistry(AGENT_TASK_TEMPLATES)
 
 
 def get_agent_tasks(
@@ -596,15 +612,16 @@ def get_agent_tasks(
     agent_city: Optional[City] = None,
     hq_city: Optional[City] = None,
     rng: Optional[random.Random] = None,
+    agent_id: Optional[int] = None,
 ) -> List[Dict[str, Any]]:
     """
     Vrátí seznam úkolů s doplněnými dynamickými poli podle regionu agenta.
 
     Args:
         agent_region_code: kód regionu aktuálního města agenta (např. "northeast").
-        rng: volitelný Random, pro deterministické testy.
+        rng: volitelný Random; bez něj má každý úkol vlastní proud klíčovaný (agent_id, id úkolu).
+        agent_id: agent, pro kterého se úkoly losují.
     """
-    random_generator = rng or random
     resolved_tasks: List[Dict[str, Any]] = []
     shared_replacements: Dict[str, Any] = {}
 
@@ -614,8 +631,9 @@ def get_agent_tasks(
             agent_region_code=agent_region_code,
             agent_city=agent_city,
             hq_city=hq_city,
-            rng=random_generator,
+            rng=rng,
             shared_replacements=shared_replacements,
+            agent_id=agent_id,
         )
         resolved_tasks.append(resolved_task)
 
@@ -0,0 +1,194 @@
+# game/agent/task_registry.py
+"""
+Předkompilované šablony úkolů.
+
+Registr se staví jednou (při importu task_config) z AGENT_TASK_TEMPLATES:
+    - index podle id → hledání šablony je O(1) i pro tisíce úkolů,
+    - každý text s placeholdery je rozložený na segmenty (literál, placeholder),
+      takže vykreslení je jen join – žádné opakované parsování format stringů,
+    - vnořené seznamy / slovníky (objectives, triggery, dialogy) jsou zkompilované
+      do stromu uzlů, statické části se vracejí bez práce.
+
+Vykreslení má dva režimy, stejné jako dosavadní funkce:
+    - výchozí (build_template_from_placeholders): chybějící placeholder zůstane
+      v textu jako "{klíč}",
+    - strict (triggery, story dialogy): chybí-li kterýkoli placeholder, vrátí se
+      původní text beze změny.
+"""
+
+from __future__ import annotations
+
+import string
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+_FORMATTER = string.Formatter()
+
+
+class _SafeFormatDict(dict):
+    """Vrací původní placeholder, pokud není nalezen v replacements."""
+
+    def __missing__(self, key: str) -> str:
+        return "{" + key + "}"
+
+
+class _Const:
+    """Hodnota bez placeholderů – vrací se tak, jak je."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any) -> None:
+        self.value = value
+
+    def render(self, replacements: Dict[str, Any], strict: bool = False) -> Any:
+        return self.value
+
+
+class CompiledText:
+    """Text rozložený na segmenty (literál, název placeholderu nebo None)."""
+
+    __slots__ = ("source", "segments")
+
+    def __init__(self, source: str, segments: Tuple[Tuple[str, Optional[str]], ...]) -> None:
+        self.source = source
+        self.segments = segments
+
+    def render(self, replacements: Dict[str, Any], strict: bool = False) -> str:
+        parts: List[str] = []
+        for literal, field in self.segments:
+            parts.append(literal)
+            if field is None:
+                continue
+            if field in replacements:
+                parts.append(format(replacements[field]))
+            elif strict:
+                return self.source
+            else:
+                parts.append("{" + field + "}")
+        return "".join(parts)
+
+
+class _FormatText:
+    """
+    Text s placeholdery, které nejsou jen {název} (formát, konverze, index…);
+    vykresluje se postaru přes str.format, ať se chování nezmění.
+    """
+
+    __slots__ = ("source",)
+
+    def __init__(self, source: str) -> None:
+        self.source = source
+
+    def render(self, replacements: Dict[str, Any], strict: bool = False) -> str:
+        try:
+            if strict:
+                return self.source.format(**replacements)
+            return self.source.format_map(_SafeFormatDict(replacements))
+        except Exception:
+            return self.source
+
+
+class _ListNode:
+    __slots__ = ("items",)
+
+    def __init__(self, items: List[Any]) -> None:
+        self.items = items
+
+    def render(self, replacements: Dict[str, Any], strict: bool = False) -> List[Any]:
+        return [item.render(replacements, strict) for item in self.items]
+
+
+class _DictNode:
+    __slots__ = ("items",)
+
+    def __init__(self, items: List[Tuple[Any, Any]]) -> None:
+        self.items = items
+
+    def render(self, replacements: Dict[str, Any], strict: bool = False) -> Dict[Any, Any]:
+        return {key: node.render(replacements, strict) for key, node in self.items}
+
+
+@lru_cache(maxsize=8192)
+def _compile_text(value: str):
+    # uzly jsou neměnné, takže stejné texty (stavy, priority…) sdílí jeden uzel
+    if "{" not in value and "}" not in value:
+        return _Const(value)
+    try:
+        parsed = list(_FORMATTER.parse(value))
+    except ValueError:
+        # rozbitý format string (osamocená závorka) – necháme ho být
+        return _Const(value)
+
+    segments: List[Tuple[str, Optional[str]]] = []
+    for literal, field, spec, conversion in parsed:
+        if field is not None and (spec or conversion or not field.isidentifier()):
+            return _FormatText(value)
+        segments.append((literal, field))
+    if all(field is None for _, field in segments):
+        # bez placeholderů, jen případně odescapované {{ }}
+        return _Const("".join(literal for literal, _ in segments))
+    return CompiledText(value, tuple(segments))
+
+
+def compile_value(value: Any):
+    """Zkompiluje hodnotu šablony (text / seznam / slovník) do stromu uzlů s metodou render()."""
+    if isinstance(value, str):
+        return _compile_text(value)
+    if isinstance(value, list):
+        return _ListNode([compile_value(item) for item in value])
+    if isinstance(value, dict):
+        return _DictNode([(key, compile_value(val)) for key, val in value.items()])
+    return _Const(value)
+
+
+class QuestTemplate:
+    """Jedna šablona úkolu: původní dict + zkompilovaná pole."""
+
+    __slots__ = ("id", "raw", "_fields", "triggers", "story_dialogs")
+
+    def __init__(self, raw: Dict[str, Any]) -> None:
+        self.id = raw.get("id")
+        self.raw = raw
+        fields = [(field, compile_value(value)) for field, value in raw.items() if field != "dynamic_placeholders"]
+        self._fields = _DictNode(fields)
+        nodes = dict(fields)
+        self.triggers = self._items(nodes.get("objective_triggers"))
+        self.story_dialogs = self._items(nodes.get("story_dialogs"))
+
+    @staticmethod
+    def _items(node) -> List[Any]:
+        return list(node.items) if isinstance(node, _ListNode) else []
+
+    def render(self, replacements: Dict[str, Any]) -> Dict[str, Any]:
+        """Kopie šablony s dosazenými placeholdery (bez dynamic_placeholders)."""
+        return self._fields.render(replacements or {})
+
+
+class QuestTemplateRegistry:
+    """Šablony úkolů v pořadí pipeline, s indexem podle id."""
+
+    def __init__(self, templates: List[Dict[str, Any]]) -> None:
+        self._ordered: List[QuestTemplate] = []
+        self._by_id: Dict[str, QuestTemplate] = {}
+        for raw in templates:
+            compiled = QuestTemplate(raw)
+            if compiled.id in self._by_id:
+                raise ValueError(f"Duplicate task template id '{compiled.id}'")
+            self._ordered.append(compiled)
+            self._by_id[compiled.id] = compiled
+
+    def get(self, task_id: Optional[str]) -> Optional[QuestTemplate]:
+        return self._by_id.get(task_id)
+
+    def compiled_for(self, template: Dict[str, Any]) -> QuestTemplate:
+        """Zkompilovaná podoba daného dictu; šablony mimo registr se zkompilují na místě."""
+        compiled = self._by_id.get(template.get("id"))
+        if compiled is not None and compiled.raw is template:
+            return compiled
+        return QuestTemplate(template)
+
+    def __iter__(self) -> Iterator[QuestTemplate]:
+        return iter(self._ordered)
+
+    def __len__(self) -> int:
+        return len(self._ordered)
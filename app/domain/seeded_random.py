@@ -0,0 +1,133 @@
+# domain/seeded_random.py
+"""
+Deterministická náhoda klíčovaná podle toho, čeho se týká.
+
+Generátor je counter-based: n-té číslo proudu = mix(klíč, n), kde klíč se odvodí
+z WORLD_SEED, druhu proudu a identifikátorů (např. město + den obnovy, agent +
+úkol). Žádný stav mezi voláními, takže:
+    - stejný klíč dá vždy stejné hodnoty (reprodukovatelné load testy),
+    - hodnotu jde kdykoli spočítat znovu místo ukládání / cachovat ji,
+    - celé pole klíčů jde losovat najednou v NumPy (keyed_uniforms) se stejným
+      výsledkem jako po jednom přes KeyedRandom.
+
+Mix je finalizér SplitMix64 (Steele et al.); pro herní losování stačí, na nic
+kryptografického se nehodí.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import random
+from typing import Union
+
+import numpy as np
+from flask import current_app, has_app_context
+
+# druhy proudů – součást klíče, aby se proudy různých systémů nepřekrývaly
+STREAM_MATERIALS = 1
+STREAM_QUESTS = 2
+
+_MASK64 = (1 << 64) - 1
+_GOLDEN = 0x9E3779B97F4A7C15
+_MUL1 = 0xBF58476D1CE4E5B9
+_MUL2 = 0x94D049BB133111EB
+
+KeyPart = Union[int, str]
+
+
+def _mix64(x: int) -> int:
+    x = ((x ^ (x >> 30)) * _MUL1) & _MASK64
+    x = ((x ^ (x >> 27)) * _MUL2) & _MASK64
+    return x ^ (x >> 31)
+
+
+def _mix64_array(x: np.ndarray) -> np.ndarray:
+    # uint64 v NumPy přetéká modulo 2**64 stejně jako maska v _mix64
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(_MUL1)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(_MUL2)
+    return x ^ (x >> np.uint64(31))
+
+
+def _part_value(part: KeyPart) -> int:
+    if isinstance(part, str):
+        return int.from_bytes(hashlib.blake2b(part.encode("utf-8"), digest_size=8).digest(), "little")
+    return int(part) & _MASK64
+
+
+def stream_key(world_seed: int, stream: int, *parts: KeyPart) -> int:
+    """64bitový klíč proudu pro (world seed, druh proudu, identifikátory…)."""
+    key = _mix64(_part_value(world_seed) ^ _GOLDEN)
+    for part in (stream, *parts):
+        key = _mix64(((key ^ _part_value(part)) + _GOLDEN) & _MASK64)
+    return key
+
+
+def stream_keys(world_seed: int, stream: int, ids: np.ndarray, *parts: KeyPart) -> np.ndarray:
+    """stream_key(world_seed, stream, id, *parts) pro celé pole id najednou."""
+    prefix = np.uint64(stream_key(world_seed, stream))
+    keys = _mix64_array((prefix ^ np.asarray(ids).astype(np.uint64)) + np.uint64(_GOLDEN))
+    for part in parts:
+        keys = _mix64_array((keys ^ np.uint64(_part_value(part))) + np.uint64(_GOLDEN))
+    return keys
+
+
+def keyed_bits(key: int, counter: int) -> int:
+    """n-té (counter) 64bitové číslo proudu s klíčem key."""
+    return _mix64((key + (counter + 1) * _GOLDEN) & _MASK64)
+
+
+def keyed_uniforms(keys: np.ndarray, counter: int) -> np.ndarray:
+    """Pro každý klíč n-té číslo proudu jako float z [0, 1) – totéž, co KeyedRandom.random()."""
+    offset = np.uint64(((counter + 1) * _GOLDEN) & _MASK64)
+    bits = _mix64_array(keys + offset)
+    return (bits >> np.uint64(11)).astype(np.float64) * (1.0 / (1 << 53))
+
+
+class KeyedRandom(random.Random):
+    """
+    random.Random nad counter-based proudem – choice(), randint() i shuffle()
+    fungují jako obvykle, jen jsou dané klíčem. seed() nastaví klíč a vynuluje čítač.
+    """
+
+    def __init__(self, key: int = 0) -> None:
+        super().__init__(key)
+
+    def seed(self, a=None, version: int = 2) -> None:  # noqa: ARG002 – podpis random.Random
+        self._key = _part_value(a or 0)
+        self._counter = 0
+        self.gauss_next = None
+
+    def getstate(self):
+        return self._key, self._counter
+
+    def setstate(self, state) -> None:
+        self._key, self._counter = state
+
+    def _next64(self) -> int:
+        value = keyed_bits(self._key, self._counter)
+        self._counter += 1
+        return value
+
+    def random(self) -> float:
+        return (self._next64() >> 11) * (1.0 / (1 << 53))
+
+    def getrandbits(self, k: int) -> int:
+        if k < 0:
+            raise ValueError("number of bits must be non-negative")
+        words = (k + 63) // 64
+        value = 0
+        for _ in range(words):
+            value = (value << 64) | self._next64()
+        return value >> (words * 64 - k)
+
+
+def keyed_random(world_seed: int, stream: int, *parts: KeyPart) -> KeyedRandom:
+    """KeyedRandom pro (world seed, druh proudu, identifikátory…)."""
+    return KeyedRandom(stream_key(world_seed, stream, *parts))
+
+
+def world_seed() -> int:
+    """WORLD_SEED z konfigurace aplikace (mimo app context 0)."""
+    if not has_app_context():
+        return 0
+    return int(current_app.config.get("WORLD_SEED", 0))
@@ -5,8 +5,10 @@ from .region import Region  # noqa
 from .city import City  # noqa
 from .train_line import TrainLine  # noqa
 from .agent import Agent  # noqa
+from .agent_inventory_item import AgentInventoryItem  # noqa
 from .tool import Tool  # noqa
 from .agent_task_progress import AgentTaskProgress  # noqa
 from .agent_travel_log import AgentTravelLog  # noqa
 from .lab_action import LabAction, LabActionState  # noqa
 from .active_task import ActiveTask  # noqa
+from .travel_stats import AgentCityVisit, AgentLineUsage, AgentWeekActivity  # noqa
@@ -27,5 +27,11 @@ class ActiveTask(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow,
                            onupdate=datetime.utcnow)
 
+    # úkol agenta podle task_id / aktivní úkoly agenta
+    __table_args__ = (
+        db.Index("ix_active_tasks_agent_id_task_id", "agent_id", "task_id"),
+        db.Index("ix_active_tasks_agent_id_status", "agent_id", "status"),
+    )
+
     def __repr__(self):
         return f"<ActiveTask agent={self.agent_id} task={self.task_id} step={self.current_objective}>"
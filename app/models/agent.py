@@ -1,6 +1,10 @@
 # models/agent.py
+from sqlalchemy import func, update
+from sqlalchemy.orm.attributes import set_committed_value
+
 from app.extensions import db
 from app.domain.agent.level_config import AGENT_LEVELS
+from app.models.agent_inventory_item import AgentInventoryItem
 
 DEFAULT_INVENTORY = {
     "energy_generator": 0,
@@ -39,7 +43,6 @@ class Agent(db.Model):
 
     codename = db.Column(db.String(100), unique=True)
     credits = db.Column(db.Integer, nullable=False, default=0)
-    inventory = db.Column(db.JSON, nullable=False, default=lambda: DEFAULT_INVENTORY.copy())
     infection_level = db.Column(db.Integer, nullable=False, default=0)  # 0-100 škála závažnosti
     last_action_at = db.Column(db.DateTime)
 
@@ -57,6 +60,12 @@ class Agent(db.Model):
     current_city = db.relationship("City", foreign_keys=[current_city_id])
     last_city = db.relationship("City", foreign_keys=[last_city_id])
     hq_city = db.relationship("City", foreign_keys=[hq_city_id])
+    # jen pro čtení (property inventory); měnit přes add_to_inventory() a spol.
+    inventory_items = db.relationship(
+        "AgentInventoryItem",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
 
     def __repr__(self):
         return f"<Agent id={self.id} level={self.level} xp={self.xp}>"
@@ -67,7 +76,50 @@ class Agent(db.Model):
         if isinstance(value, dict):
             inventory.update(value)
         return inventory
-    
+
+    @property
+    def inventory(self) -> dict:
+        """Inventář jako dict položka → množství (chybějící položky = 0)."""
+        return self.normalize_inventory({row.item: row.quantity for row in self.inventory_items})
+
+    def _sync_inventory(self, item: str, quantity: int) -> None:
+        # načtené řádky srovnat s tím, co vrátil UPDATE; nový řádek = načíst znovu
+        if "inventory_items" not in self.__dict__:
+            return
+        for row in self.inventory_items:
+            if row.item == item:
+                set_committed_value(row, "quantity", quantity)
+                return
+        db.session.expire(self, ["inventory_items"])
+
+    def add_to_inventory(self, item: str, amount: int) -> int:
+        """Atomicky přičte amount k položce; vrací nové množství."""
+        quantity = AgentInventoryItem.add(self.id, item, amount)
+        self._sync_inventory(item, quantity)
+        return quantity
+
+    def take_from_inventory(self, item: str, amount: int, partial: bool = False) -> int | None:
+        """
+        Atomicky odečte amount. Bez `partial` jen pokud agent tolik má (jinak None),
+        s `partial` vezme, co jde, a nechá 0. Vrací nové množství.
+        """
+        if partial:
+            quantity = AgentInventoryItem.take_up_to(self.id, item, amount)
+        else:
+            quantity = AgentInventoryItem.take(self.id, item, amount)
+        if quantity is not None:
+            self._sync_inventory(item, quantity)
+        return quantity
+
+    def ensure_inventory_at_least(self, item: str, minimum: int) -> int:
+        quantity = AgentInventoryItem.ensure_at_least(self.id, item, minimum)
+        self._sync_inventory(item, quantity)
+        return quantity
+
+    def clear_inventory(self) -> None:
+        AgentInventoryItem.clear(self.id)
+        db.session.expire(self, ["inventory_items"])
+
     def get_level_config(self, level: int):
         """Vrátí config pro daný level (nebo None, pokud neexistuje)."""
         for cfg in AGENT_LEVELS:
@@ -87,12 +139,29 @@ class Agent(db.Model):
     def max_level(self) -> int:
         return max(cfg["level"] for cfg in AGENT_LEVELS)
 
+    def record_trip(self) -> int:
+        """Započítá cestu (total_trips + 1) přímo v SQL, stejně atomicky jako souhrny travel logu."""
+        table = type(self).__table__
+        total_trips = db.session.execute(
+            update(table)
+            .where(table.c.id == self.id)
+            .values(total_trips=func.coalesce(table.c.total_trips, 0) + 1)
+            .returning(table.c.total_trips)
+        ).scalar_one()
+        set_committed_value(self, "total_trips", total_trips)
+        return total_trips
+
     def gain_xp(self, amount: int):
         """Přidá XP a případně zvedne level + energii dle configu."""
         if amount <= 0:
             return
 
-        self.xp += amount
+        # přičtení přímo v SQL – souběžné odměny se nepřepíšou
+        table = type(self).__table__
+        xp = db.session.execute(
+            update(table).where(table.c.id == self.id).values(xp=table.c.xp + amount).returning(table.c.xp)
+        ).scalar_one()
+        set_committed_value(self, "xp", xp)
 
         # opakovaně kontrolujeme, jestli nedosáhl dalšího levelu
         while True:
@@ -121,8 +190,6 @@ class Agent(db.Model):
 
             # energii necháváme prázdnou; nabíjí se až později
 
-            inventory = self.normalize_inventory(self.inventory)
             for item in cfg.get("unlock_items", []):
                 if item.get("type") == "credits" and item.get("amount"):
-                    inventory["money"] = inventory.get("money", 0) + int(item["amount"])
-            self.inventory = inventory
+                    self.add_to_inventory("money", int(item["amount"]))
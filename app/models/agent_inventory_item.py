@@ -0,0 +1,74 @@
+# models/agent_inventory_item.py
+#
+# Inventář agenta po položkách (řádek = agent + položka + množství).
+# Chybějící řádek = 0. Změny jdou přímo v SQL (quantity = quantity + :delta),
+# takže souběžné odměny / nákupy se nepřepisují a jde filtrovat podle množství.
+from typing import Optional
+
+from sqlalchemy import delete, update
+
+from app.database import dialect_insert
+from app.extensions import db
+
+
+class AgentInventoryItem(db.Model):
+    __tablename__ = "agent_inventory_items"
+
+    agent_id = db.Column(db.Integer, db.ForeignKey("agents.id", ondelete="CASCADE"), primary_key=True)
+    item = db.Column(db.String(50), primary_key=True)  # např. "money", "energy_module"
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+
+    # "agenti s víc než N peněz"
+    __table_args__ = (
+        db.Index("ix_agent_inventory_items_item_quantity", "item", "quantity"),
+    )
+
+    @classmethod
+    def add(cls, agent_id: int, item: str, amount: int) -> int:
+        """Přičte amount (může být i záporné, bez kontroly); vrací nové množství."""
+        table = cls.__table__
+        statement = dialect_insert()(table).values(agent_id=agent_id, item=item, quantity=amount)
+        statement = statement.on_conflict_do_update(
+            index_elements=["agent_id", "item"],
+            set_={"quantity": table.c.quantity + statement.excluded.quantity},
+        ).returning(table.c.quantity)
+        return db.session.execute(statement).scalar_one()
+
+    @classmethod
+    def take(cls, agent_id: int, item: str, amount: int) -> Optional[int]:
+        """Odečte amount, jen pokud ho agent má; vrací nové množství nebo None."""
+        table = cls.__table__
+        return db.session.execute(
+            update(table)
+            .where(table.c.agent_id == agent_id, table.c.item == item, table.c.quantity >= amount)
+            .values(quantity=table.c.quantity - amount)
+            .returning(table.c.quantity)
+        ).scalar()
+
+    @classmethod
+    def take_up_to(cls, agent_id: int, item: str, amount: int) -> int:
+        """Odečte amount, ale nejvýš na 0; vrací nové množství."""
+        table = cls.__table__
+        quantity = db.session.execute(
+            update(table)
+            .where(table.c.agent_id == agent_id, table.c.item == item)
+            .values(quantity=db.case((table.c.quantity > amount, table.c.quantity - amount), else_=0))
+            .returning(table.c.quantity)
+        ).scalar()
+        return quantity or 0
+
+    @classmethod
+    def ensure_at_least(cls, agent_id: int, item: str, minimum: int) -> int:
+        """Zvedne množství na minimum, pokud je menší; vrací nové množství."""
+        table = cls.__table__
+        statement = dialect_insert()(table).values(agent_id=agent_id, item=item, quantity=minimum)
+        statement = statement.on_conflict_do_update(
+            index_elements=["agent_id", "item"],
+            set_={"quantity": db.case((table.c.quantity < minimum, minimum), else_=table.c.quantity)},
+        ).returning(table.c.quantity)
+        return db.session.execute(statement).scalar_one()
+
+    @classmethod
+    def clear(cls, agent_id: int) -> None:
+        """Vyprázdní inventář agenta (všechno na 0)."""
+        db.session.execute(delete(cls.__table__).where(cls.__table__.c.agent_id == agent_id))
@@ -26,6 +26,11 @@ class AgentTravelLog(db.Model):
     from_city = db.relationship("City", foreign_keys=[from_city_id])
     to_city = db.relationship("City", foreign_keys=[to_city_id])
 
+    # poslední záznamy agenta (samotný index vytváří migrace 1f2e3d4c5b6a)
+    __table_args__ = (
+        db.Index("ix_agent_travel_log_agent_id_created_at", "agent_id", "created_at"),
+    )
+
     def serialize(self) -> dict:
         """Return a structured representation for APIs."""
         return {
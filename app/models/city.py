@@ -28,3 +28,9 @@ class City(db.Model):
     material_refreshed_at = db.Column(db.DateTime)
 
     region = db.relationship("Region", back_populates="cities")
+
+    # hledání podle jména: přesně (placeholdery úkolů) a bez ohledu na velikost písmen (HQ)
+    __table_args__ = (
+        db.Index("ix_cities_name", "name"),
+        db.Index("ix_cities_name_lower", db.func.lower(name)),
+    )
@@ -57,4 +57,6 @@ class LabActionState(db.Model):
 
     __table_args__ = (
         db.UniqueConstraint("lab_action_id", "agent_id", name="uq_lab_action_state"),
+        # stavy jednoho agenta – unikátní klíč začíná lab_action_id, takže tohle nepokryje
+        db.Index("ix_lab_action_states_agent_id_lab_action_id", "agent_id", "lab_action_id"),
     )
@@ -27,6 +27,12 @@ class TrainLine(db.Model):
     from_city = db.relationship("City", foreign_keys=[from_city_id])
     to_city   = db.relationship("City", foreign_keys=[to_city_id])
 
+    # odjezdy z města: is_active AND (from_city_id = ? OR to_city_id = ?)
+    __table_args__ = (
+        db.Index("ix_train_lines_from_city_id_is_active", "from_city_id", "is_active"),
+        db.Index("ix_train_lines_to_city_id_is_active", "to_city_id", "is_active"),
+    )
+
     def __repr__(self):
         return f"<TrainLine {self.from_city.name} ↔ {self.to_city.name}>"
     
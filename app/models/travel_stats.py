@@ -0,0 +1,46 @@
+# models/travel_stats.py
+#
+# Průběžně udržované souhrny travel logu (plní travel_stats_service při zápisu logu),
+# aby statistiky nemusely procházet agent_travel_log.
+from app.extensions import db
+
+
+class AgentCityVisit(db.Model):
+    """Kolikrát agent přijel do města."""
+
+    __tablename__ = "agent_city_visits"
+
+    agent_id = db.Column(db.Integer, db.ForeignKey("agents.id"), primary_key=True)
+    city_id = db.Column(db.Integer, db.ForeignKey("cities.id"), primary_key=True)
+    visits = db.Column(db.Integer, nullable=False, default=0)
+    last_visited_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index("ix_agent_city_visits_agent_id_visits", "agent_id", "visits"),
+    )
+
+
+class AgentLineUsage(db.Model):
+    """Kolikrát agent projel spojení mezi dvěma městy (bez ohledu na směr, city_a_id < city_b_id)."""
+
+    __tablename__ = "agent_line_usage"
+
+    agent_id = db.Column(db.Integer, db.ForeignKey("agents.id"), primary_key=True)
+    city_a_id = db.Column(db.Integer, db.ForeignKey("cities.id"), primary_key=True)
+    city_b_id = db.Column(db.Integer, db.ForeignKey("cities.id"), primary_key=True)
+    trips = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index("ix_agent_line_usage_agent_id_trips", "agent_id", "trips"),
+    )
+
+
+class AgentWeekActivity(db.Model):
+    """Počet cest agenta v herním týdnu."""
+
+    __tablename__ = "agent_week_activity"
+
+    agent_id = db.Column(db.Integer, db.ForeignKey("agents.id"), primary_key=True)
+    game_week = db.Column(db.Integer, primary_key=True)
+    trips = db.Column(db.Integer, nullable=False, default=0)
+    last_game_minutes = db.Column(db.Integer)
@@ -0,0 +1,200 @@
+# app/profiler.py
+#
+# Volitelný profiler requestů (PROFILER_ENABLED):
+# - wall time requestu, počet a čas SQL dotazů (listenery z query_counter)
+# - čas strávený ve vybraných service funkcích (@profiled, inkluzivně –
+#   vnořené volání se započítá i nadřazené funkci)
+# - výsledek jde do hlavičky Server-Timing a do klouzavého okna
+#   posledních requestů pro každý endpoint (/api/debug/perf)
+# Vypnutý profiler = žádné hooky ani listenery; @profiled stojí jen jednu kontrolu příznaku.
+
+from __future__ import annotations
+
+import functools
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+import numpy as np
+from flask import Flask, current_app, g, jsonify, request
+
+from app.extensions import db
+from app.query_counter import QueryCounter, install_query_listeners
+
+EXTENSION_KEY = "profiler"
+
+# hranice histogramu wall time v ms (poslední koš = všechno nad)
+HISTOGRAM_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000)
+
+_enabled = False
+_current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("current_request_profile", default=None)
+
+
+class RequestProfile:
+    """Měření jednoho requestu."""
+
+    __slots__ = ("started", "queries", "spans")
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.queries = QueryCounter().__enter__()
+        # název funkce → [celkový čas v s, počet volání]
+        self.spans: Dict[str, List[float]] = {}
+
+    def add_span(self, name: str, elapsed: float) -> None:
+        span = self.spans.get(name)
+        if span is None:
+            self.spans[name] = [elapsed, 1]
+        else:
+            span[0] += elapsed
+            span[1] += 1
+
+
+def profiled(fn: Callable) -> Callable:
+    """Změří dobu volání service funkce v rámci profilovaného requestu."""
+    name = fn.__name__
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not _enabled:
+            return fn(*args, **kwargs)
+        profile = _current_profile.get()
+        if profile is None:
+            return fn(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profile.add_span(name, time.perf_counter() - started)
+
+    return wrapper
+
+
+class PerfWindow:
+    """Klouzavé okno posledních N requestů pro každý endpoint."""
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Deque[Dict[str, Any]]] = {}
+
+    def add(self, endpoint: str, sample: Dict[str, Any]) -> None:
+        with self._lock:
+            samples = self._samples.get(endpoint)
+            if samples is None:
+                samples = self._samples[endpoint] = deque(maxlen=self.size)
+            samples.append(sample)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._samples.clear()
+
+    def snapshot(self) -> Dict[str, List[Dict[str, Any]]]:
+        with self._lock:
+            return {endpoint: list(samples) for endpoint, samples in self._samples.items()}
+
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    p50, p95, p99 = np.percentile(np.asarray(values, dtype=np.float64), [50, 95, 99])
+    return {"p50": round(float(p50), 3), "p95": round(float(p95), 3), "p99": round(float(p99), 3)}
+
+
+def summarize_endpoint(samples: List[Dict[str, Any]]) -> Dict[str, Any]:
+    wall = [sample["wall_ms"] for sample in samples]
+    counts, _ = np.histogram(wall, bins=[0, *HISTOGRAM_BUCKETS_MS, np.inf])
+    # seznam, ne dict – jsonify klíče řadí abecedně a pořadí košů by se ztratilo
+    histogram = [
+        {"lt_ms": edge, "count": int(count)}
+        for edge, count in zip([*HISTOGRAM_BUCKETS_MS, None], counts)
+    ]
+
+    spans: Dict[str, List[float]] = {}
+    for sample in samples:
+        for name, duration in sample["spans"].items():
+            spans.setdefault(name, []).append(duration)
+
+    return {
+        "requests": len(samples),
+        "wall_ms": _percentiles(wall),
+        "histogram_ms": histogram,
+        "sql_queries": _percentiles([sample["sql_queries"] for sample in samples]),
+        "sql_ms": _percentiles([sample["sql_ms"] for sample in samples]),
+        "functions_ms": {
+            name: {**_percentiles(values), "calls": len(values)}
+            for name, values in sorted(spans.items())
+        },
+    }
+
+
+def _start_profile() -> None:
+    profile = RequestProfile()
+    g.request_profile = profile
+    g.request_profile_token = _current_profile.set(profile)
+
+
+def _finish_profile(response):
+    profile: Optional[RequestProfile] = g.pop("request_profile", None)
+    if profile is None:
+        return response
+    _current_profile.reset(g.pop("request_profile_token"))
+    profile.queries.__exit__(None, None, None)
+
+    wall_ms = (time.perf_counter() - profile.started) * 1000
+    sql_ms = profile.queries.total_seconds * 1000
+    spans_ms = {name: total * 1000 for name, (total, _) in profile.spans.items()}
+
+    timings = [
+        f"total;dur={wall_ms:.2f}",
+        f'sql;dur={sql_ms:.2f};desc="{profile.queries.count} queries"',
+    ]
+    timings += [f"{name};dur={duration:.2f}" for name, duration in spans_ms.items()]
+    response.headers.add("Server-Timing", ", ".join(timings))
+
+    if request.endpoint and request.endpoint != "debug_perf":
+        current_app.extensions[EXTENSION_KEY].add(
+            f"{request.method} {request.url_rule.rule if request.url_rule else request.endpoint}",
+            {
+                "wall_ms": wall_ms,
+                "sql_queries": profile.queries.count,
+                "sql_ms": sql_ms,
+                "spans": spans_ms,
+            },
+        )
+    return response
+
+
+def _discard_profile(exc) -> None:
+    profile = g.pop("request_profile", None)
+    if profile is not None:
+        _current_profile.reset(g.pop("request_profile_token"))
+        profile.queries.__exit__(None, None, None)
+
+
+def api_debug_perf():
+    """Rolling per-endpoint latency / SQL / service-function statistics (DELETE clears them)."""
+    window: PerfWindow = current_app.extensions[EXTENSION_KEY]
+    if request.method == "DELETE":
+        window.clear()
+        return jsonify({"ok": True})
+    snapshot = window.snapshot()
+    return jsonify({
+        "window": window.size,
+        "endpoints": {endpoint: summarize_endpoint(samples) for endpoint, samples in sorted(snapshot.items())},
+    })
+
+
+def init_profiler(app: Flask) -> None:
+    """Zapne profiler, pokud to povoluje PROFILER_ENABLED."""
+    global _enabled
+    if not app.config.get("PROFILER_ENABLED"):
+        return
+    _enabled = True
+    app.extensions[EXTENSION_KEY] = PerfWindow(app.config.get("PROFILER_WINDOW", 500))
+    with app.app_context():
+        install_query_listeners(db.engine)
+    app.before_request(_start_profile)
+    app.after_request(_finish_profile)
+    app.teardown_request(_discard_profile)
+    app.add_url_rule("/api/debug/perf", "debug_perf", api_debug_perf, methods=["GET", "DELETE"])
@@ -0,0 +1,214 @@
+# app/query_counter.py
+#
+# Počítadlo SQL dotazů:
+# - listener na engine (before/after_cursor_execute) zapisuje do právě aktivních počítadel
+# - per-request režim (SQL_QUERY_COUNTING): log dotazů, hlavička X-SQL-Queries
+#   a kontrola rozpočtu (SQL_QUERY_BUDGET nebo @query_budget na view);
+#   se SQL_QUERY_BUDGET_STRICT překročení vyhodí QueryBudgetExceeded
+# - @read_only na view: request nesmí poslat zápis (INSERT/UPDATE/DELETE…);
+#   hlídá se ve stejném režimu a stejně přísně jako rozpočet
+# - count_queries() / assert_max_queries() / assert_read_only() pro testy a benchmarky
+# - uncounted() pro práci na pozadí, kterou request jen "dotlačí" (flush bufferu)
+# Když je počítání vypnuté a nikdo count_queries() nevolá, listener se vůbec neregistruje.
+
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from flask import Flask, current_app, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.extensions import db
+
+_active_counters: ContextVar[Tuple["QueryCounter", ...]] = ContextVar("active_query_counters", default=())
+
+
+# první slovo příkazu, které znamená zápis do DB
+WRITE_STATEMENT_KEYWORDS = frozenset({"INSERT", "UPDATE", "DELETE", "REPLACE", "MERGE", "UPSERT", "CREATE", "DROP", "ALTER"})
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Request (nebo blok v assert_max_queries) položil víc SQL dotazů, než je povoleno."""
+
+
+class ReadOnlyViolation(AssertionError):
+    """Read-only request (nebo blok v assert_read_only) poslal do DB zápis."""
+
+
+class QueryCounter:
+    """Seznam provedených dotazů (SQL, doba v s) za dobu, kdy je počítadlo aktivní."""
+
+    __slots__ = ("statements",)
+
+    def __init__(self) -> None:
+        self.statements: List[Tuple[str, float]] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(duration for _, duration in self.statements)
+
+    @property
+    def writes(self) -> List[str]:
+        """Zapisující příkazy mezi provedenými (podle prvního klíčového slova)."""
+        return [statement for statement, _ in self.statements if _is_write(statement)]
+
+    def __enter__(self) -> "QueryCounter":
+        _active_counters.set(_active_counters.get() + (self,))
+        return self
+
+    def __exit__(self, *exc) -> None:
+        _active_counters.set(tuple(counter for counter in _active_counters.get() if counter is not self))
+
+
+def _is_write(statement: str) -> bool:
+    words = statement.lstrip().split(None, 1)
+    return bool(words) and words[0].upper() in WRITE_STATEMENT_KEYWORDS
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _active_counters.get():
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    counters = _active_counters.get()
+    if not counters:
+        return
+    started = conn.info.get("query_started")
+    elapsed = time.perf_counter() - started.pop() if started else 0.0
+    for counter in counters:
+        counter.statements.append((statement, elapsed))
+
+
+def install_query_listeners(engine: Engine) -> None:
+    """Zaregistruje listenery na engine (opakované volání nic nedělá)."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+@contextmanager
+def count_queries(engine: Optional[Engine] = None) -> Iterator[QueryCounter]:
+    """Spočítá dotazy položené uvnitř bloku: `with count_queries() as q: ...; q.count`."""
+    install_query_listeners(engine or db.engine)
+    with QueryCounter() as counter:
+        yield counter
+
+
+@contextmanager
+def assert_max_queries(limit: int, engine: Optional[Engine] = None) -> Iterator[QueryCounter]:
+    """Jako count_queries, ale po skončení bloku vyhodí QueryBudgetExceeded nad limitem."""
+    with count_queries(engine) as counter:
+        yield counter
+    if counter.count > limit:
+        raise QueryBudgetExceeded(_format_budget_error(limit, counter))
+
+
+@contextmanager
+def assert_read_only(engine: Optional[Engine] = None) -> Iterator[QueryCounter]:
+    """Jako count_queries, ale po skončení bloku vyhodí ReadOnlyViolation, pokud padl zápis."""
+    with count_queries(engine) as counter:
+        yield counter
+    if counter.writes:
+        raise ReadOnlyViolation(_format_writes_error(counter))
+
+
+@contextmanager
+def uncounted() -> Iterator[None]:
+    """Dotazy uvnitř bloku se nezapočítají do žádného aktivního počítadla."""
+    token = _active_counters.set(())
+    try:
+        yield
+    finally:
+        _active_counters.reset(token)
+
+
+def query_budget(limit: int) -> Callable:
+    """Dekorátor view – povolený počet SQL dotazů na request (přebíjí SQL_QUERY_BUDGET)."""
+
+    def decorator(view):
+        view.query_budget = limit
+        return view
+
+    return decorator
+
+
+def read_only(view):
+    """Dekorátor view – request jen čte; zápis se zaloguje (nebo vyhodí ve strict režimu)."""
+    view.read_only = True
+    return view
+
+
+def _format_writes_error(counter: QueryCounter) -> str:
+    writes = counter.writes
+    lines = [f"{len(writes)} write statements in a read-only block:"]
+    lines += [f"  {statement.splitlines()[0][:200]}" for statement in writes]
+    return "\n".join(lines)
+
+
+def _format_budget_error(limit: int, counter: QueryCounter) -> str:
+    lines = [f"{counter.count} SQL queries (budget {limit}):"]
+    lines += [f"  {statement.splitlines()[0][:200]}" for statement, _ in counter.statements]
+    return "\n".join(lines)
+
+
+def _start_request_counter() -> None:
+    g.query_counter = QueryCounter().__enter__()
+
+
+def _finish_request_counter(response):
+    counter: Optional[QueryCounter] = g.pop("query_counter", None)
+    if counter is None:
+        return response
+    counter.__exit__(None, None, None)
+
+    response.headers["X-SQL-Queries"] = str(counter.count)
+    current_app.logger.info(
+        "%s %s: %d SQL queries in %.1f ms",
+        request.method,
+        request.full_path.rstrip("?"),
+        counter.count,
+        counter.total_seconds * 1000,
+    )
+    for statement, duration in counter.statements:
+        current_app.logger.debug("  %.2f ms  %s", duration * 1000, statement)
+
+    view = current_app.view_functions.get(request.endpoint)
+    budget = getattr(view, "query_budget", current_app.config.get("SQL_QUERY_BUDGET"))
+    if budget is not None and counter.count > budget:
+        message = _format_budget_error(budget, counter)
+        if current_app.config.get("SQL_QUERY_BUDGET_STRICT"):
+            raise QueryBudgetExceeded(f"{request.endpoint}: {message}")
+        current_app.logger.warning("%s over SQL budget – %s", request.endpoint, message)
+
+    if getattr(view, "read_only", False) and counter.writes:
+        message = _format_writes_error(counter)
+        if current_app.config.get("SQL_QUERY_BUDGET_STRICT"):
+            raise ReadOnlyViolation(f"{request.endpoint}: {message}")
+        current_app.logger.warning("%s wrote to the database – %s", request.endpoint, message)
+    return response
+
+
+def _discard_request_counter(exc) -> None:
+    counter = g.pop("query_counter", None)
+    if counter is not None:
+        counter.__exit__(None, None, None)
+
+
+def init_query_counting(app: Flask) -> None:
+    """Zapne počítání dotazů na request, pokud to povoluje SQL_QUERY_COUNTING."""
+    if not app.config.get("SQL_QUERY_COUNTING"):
+        return
+    with app.app_context():
+        install_query_listeners(db.engine)
+    app.before_request(_start_request_counter)
+    app.after_request(_finish_request_counter)
+    app.teardown_request(_discard_request_counter)
@@ -0,0 +1,312 @@
+# services/agent_service.py
+#
+# Agent aktuálního requestu:
+# - identita z tokenu (Authorization: Bearer / X-Agent-Token) nebo ze session
+#   cookie; bez identity se první agent použije jen v režimu jednoho hráče / v debugu
+#   (AGENT_FALLBACK_TO_PRIMARY), jinak klient nemá agenta a založí si ho (POST /api/agents)
+# - krátký TTL cache identit: token → id, id → existuje, id prvního agenta;
+#   řádek agenta se pak načte podle primárního klíče jedním dotazem i s městy
+#   (joinedload) a v rámci requestu se drží v `g`
+# ORM objekty agenta se mezi requesty necachují – dva workery by si jinak
+# navzájem přepisovaly energii, materiál a inventář ze zastaralých kopií.
+
+from __future__ import annotations
+
+import secrets
+import threading
+import time
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from flask import Flask, current_app, g, request, session
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
+
+from app.extensions import db
+from app.models.agent import Agent
+from app.models.city import City
+from app.profiler import profiled
+
+EXTENSION_KEY = "agent_identity_cache"
+TOKEN_SALT = "agent-token"
+SESSION_KEY = "agent_id"
+
+_MISSING = object()
+
+# stejně jako sloupec Agent.codename
+CODENAME_MAX_LENGTH = 100
+
+
+class AgentError(ValueError):
+    """Agenta nejde založit; `code` jde rovnou do JSON odpovědi jako "error"."""
+
+    def __init__(self, code: str, status: int = 400) -> None:
+        super().__init__(code)
+        self.code = code
+        self.status = status
+
+
+class TTLCache:
+    """Malý thread-safe cache s expirací položek (monotonic čas)."""
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 100_000) -> None:
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._items: Dict[Hashable, Tuple[float, Any]] = {}
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        item = self._items.get(key)
+        if item is None:
+            return default
+        expires, value = item
+        if expires < time.monotonic():
+            with self._lock:
+                self._items.pop(key, None)
+            return default
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            if len(self._items) >= self.max_entries:
+                self._evict_expired()
+                if len(self._items) >= self.max_entries:
+                    self._items.pop(next(iter(self._items)))
+            self._items[key] = (time.monotonic() + self.ttl, value)
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def _evict_expired(self) -> None:
+        now = time.monotonic()
+        for key in [key for key, (expires, _) in self._items.items() if expires < now]:
+            del self._items[key]
+
+
+def _identity_cache() -> TTLCache:
+    cache = current_app.extensions.get(EXTENSION_KEY)
+    if cache is None:
+        cache = current_app.extensions.setdefault(EXTENSION_KEY, TTLCache(current_app.config.get("AGENT_CACHE_TTL", 30)))
+    return cache
+
+
+def agent_query():
+    """Agent.query s eager loadem měst a inventáře, na které sahají serializace a úkoly."""
+    return Agent.query.options(
+        joinedload(Agent.current_city).joinedload(City.region),
+        joinedload(Agent.hq_city),
+        joinedload(Agent.inventory_items),
+    )
+
+
+# -------------------------------------------------------------------
+# Tokeny a session
+# -------------------------------------------------------------------
+
+
+def _serializer() -> URLSafeTimedSerializer:
+    # i mimo request (bench, CLI) se podepisuje jen skutečným klíčem
+    secret_key = current_app.secret_key or _dev_secret_key(current_app)
+    return URLSafeTimedSerializer(secret_key, salt=TOKEN_SALT)
+
+
+def issue_agent_token(agent_id: int) -> str:
+    """Podepsaný token s id agenta (bez stavu v DB)."""
+    return _serializer().dumps({"agent_id": agent_id})
+
+
+def _agent_id_from_token(token: str) -> Optional[int]:
+    cache = _identity_cache()
+    agent_id = cache.get(("token", token), _MISSING)
+    if agent_id is _MISSING:
+        try:
+            payload = _serializer().loads(token, max_age=current_app.config.get("AGENT_TOKEN_MAX_AGE"))
+            agent_id = int(payload["agent_id"])
+        except (BadSignature, KeyError, TypeError, ValueError):
+            agent_id = None
+        cache.set(("token", token), agent_id)
+    return agent_id
+
+
+def _request_token() -> Optional[str]:
+    header = request.headers.get("Authorization", "")
+    if header.lower().startswith("bearer "):
+        return header[7:].strip() or None
+    return request.headers.get("X-Agent-Token") or None
+
+
+def login_agent(agent: Agent) -> str:
+    """Uloží agenta do session cookie a vrátí token pro klienty bez cookies."""
+    session[SESSION_KEY] = agent.id
+    g.current_agent = agent
+    return issue_agent_token(agent.id)
+
+
+def logout_agent() -> None:
+    session.pop(SESSION_KEY, None)
+    g.pop("current_agent", None)
+
+
+# -------------------------------------------------------------------
+# Resolve agenta pro request
+# -------------------------------------------------------------------
+
+
+def _agent_exists(agent_id: int) -> bool:
+    cache = _identity_cache()
+    exists = cache.get(("agent", agent_id))
+    if exists is None:
+        exists = db.session.execute(select(Agent.id).where(Agent.id == agent_id)).first() is not None
+        cache.set(("agent", agent_id), exists)
+    return exists
+
+
+def init_agent_identity(app: Flask) -> None:
+    """
+    Podpisový klíč se kontroluje až u prvního requestu (CLI příkazy – migrace, seedy,
+    bench – ho nepotřebují). Tehdy už je známý i debug z `app.run(debug=True)`:
+    v debugu / testing dostane aplikace náhodný klíč na proces, jinak request spadne –
+    bez SECRET_KEY by šlo tokeny i session podvrhnout.
+    """
+    lock = threading.Lock()
+
+    @app.before_request
+    def _require_secret_key() -> None:
+        if app.config.get("SECRET_KEY"):
+            return
+        with lock:
+            if not app.config.get("SECRET_KEY"):
+                _dev_secret_key(app)
+
+
+def _dev_secret_key(app: Flask) -> str:
+    """Náhodný klíč pro debug / testing; mimo ně RuntimeError."""
+    if not (app.debug or app.testing):
+        raise RuntimeError("SECRET_KEY is not set – agent tokens and sessions cannot be signed safely")
+    app.config["SECRET_KEY"] = secrets.token_hex(32)
+    app.logger.warning("SECRET_KEY not set – using a random per-process key (debug only)")
+    return app.config["SECRET_KEY"]
+
+
+def _fallback_to_primary() -> bool:
+    """AGENT_FALLBACK_TO_PRIMARY; nenastavené = jen v debugu / testing (režim jednoho hráče)."""
+    enabled = current_app.config.get("AGENT_FALLBACK_TO_PRIMARY")
+    if enabled is None:
+        return current_app.debug or current_app.testing
+    return enabled
+
+
+def _primary_agent_id() -> Optional[int]:
+    """Id agenta s nejnižším id (režim jednoho hráče) – dotaz jen jednou za TTL."""
+    cache = _identity_cache()
+    agent_id = cache.get("primary", _MISSING)
+    if agent_id is _MISSING:
+        agent_id = db.session.execute(select(Agent.id).order_by(Agent.id.asc()).limit(1)).scalar()
+        cache.set("primary", agent_id)
+    return agent_id
+
+
+def resolve_agent_id() -> Optional[int]:
+    """
+    Id agenta pro aktuální request: token > session > první agent
+    (jen pokud AGENT_FALLBACK_TO_PRIMARY). Neplatný token se na session neptá.
+    """
+    token = _request_token()
+    if token is not None:
+        agent_id = _agent_id_from_token(token)
+    else:
+        agent_id = session.get(SESSION_KEY)
+
+    if agent_id is not None:
+        return agent_id if _agent_exists(agent_id) else None
+    if token is None and _fallback_to_primary():
+        return _primary_agent_id()
+    return None
+
+
+def load_agent(agent_id: int) -> Agent | None:
+    """Agent podle primárního klíče i s current_city/region a hq_city."""
+    return agent_query().filter(Agent.id == agent_id).one_or_none()
+
+
+@profiled
+def get_current_agent() -> Agent | None:
+    """Agent aktuálního requestu (načtený nejvýš jednou za request)."""
+    if "current_agent" in g:
+        return g.current_agent
+
+    agent_id = resolve_agent_id()
+    agent = load_agent(agent_id) if agent_id is not None else None
+    if agent is None and agent_id is not None:
+        # agent mezitím zmizel (reseed) – zahodit cache a zkusit to znovu
+        forget_agent(agent_id)
+        agent_id = resolve_agent_id()
+        agent = load_agent(agent_id) if agent_id is not None else None
+    g.current_agent = agent
+    return agent
+
+
+def forget_agent(agent_id: Optional[int] = None) -> None:
+    """Zahodí cache identit pro agenta (nebo celý cache) – po vytvoření / smazání agentů."""
+    cache = _identity_cache()
+    if agent_id is None:
+        cache.clear()
+        return
+    cache.pop(("agent", agent_id))
+    cache.pop("primary")
+
+
+# -------------------------------------------------------------------
+# Nový agent
+# -------------------------------------------------------------------
+
+
+def normalize_codename(codename: Any) -> Optional[str]:
+    """Ořízne krycí jméno; prázdné, příliš dlouhé nebo ne-text → AgentError."""
+    if codename is None:
+        return None
+    if not isinstance(codename, str):
+        raise AgentError("codename_invalid")
+    codename = codename.strip()
+    if not codename or len(codename) > CODENAME_MAX_LENGTH:
+        raise AgentError("codename_invalid")
+    return codename
+
+
+def create_agent(codename: Optional[str] = None, city: Optional[City] = None) -> Agent:
+    """
+    Založí agenta se základními hodnotami (stejnými jako seed-agent); commit dělá volající.
+    Obsazené krycí jméno → AgentError("codename_taken", 409), session pak musí volající vrátit
+    (rollback). Unikátnost hlídá index na codename, takže to platí i pro dva souběžné requesty.
+    """
+    codename = normalize_codename(codename)
+    agent = Agent(
+        level=1,
+        xp=0,
+        energy_current=5,
+        energy_max=5,
+        data_current=0,
+        data_max=100,
+        material_current=0,
+        material_max=100,
+        credits=0,
+        current_city_id=city.id if city else None,
+        total_trips=0,
+        total_cleaned_cities=0,
+        codename=codename,
+    )
+    db.session.add(agent)
+    try:
+        db.session.flush()
+    except IntegrityError as exc:
+        if codename is None:
+            raise
+        raise AgentError("codename_taken", 409) from exc
+    forget_agent(agent.id)
+    return agent
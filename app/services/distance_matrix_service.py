@@ -0,0 +1,198 @@
+# services/distance_matrix_service.py
+#
+# Předpočítané matice vzdáleností mezi všemi městy (N×N):
+# - [0] vzdušná vzdálenost v mílích (haversine, bez DISTANCE_SCALE)
+# - [1] nejkratší čistá doba jízdy vlakem v minutách (bez čekání na odjezd)
+# Matice se staví vektorově v NumPy ze sítě v paměti a ukládají se jako .npy
+# vedle data.db. Název souboru obsahuje hash měst a linek, takže po reseedu
+# vznikne nový soubor a načtení existujícího je jen mmap (mikrosekundy).
+# Staví se líně při prvním použití na dané značce mapy (plánovač tras, heuristika A*);
+# mapy nad DISTANCE_MATRIX_MAX_CITIES se přeskočí.
+
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+import threading
+from typing import Dict, Optional
+
+import numpy as np
+from flask import current_app, has_app_context
+
+from app.profiler import profiled
+from app.services.rail_network_service import RailNetwork, get_rail_network
+from app.services.timetable_service import EARTH_RADIUS_MI
+
+EXTENSION_KEY = "distance_matrix"
+FILE_PREFIX = "distance_matrix-"
+
+_build_lock = threading.Lock()
+
+
+class DistanceMatrix:
+    """Read-only pohled na matice; řádky/sloupce jsou města seřazená podle id."""
+
+    def __init__(self, city_ids: np.ndarray, data: np.ndarray, network_hash: str, stamp: Optional[int] = None) -> None:
+        self.city_ids = city_ids
+        self.index: Dict[int, int] = {int(city_id): idx for idx, city_id in enumerate(city_ids)}
+        self.great_circle = data[0]
+        self.rail_minutes = data[1]
+        self.network_hash = network_hash
+        self.stamp = stamp
+
+    def great_circle_miles(self, from_city_id: int, to_city_id: int) -> Optional[float]:
+        """Vzdušná vzdálenost v mílích, None pro neznámé město."""
+        a = self.index.get(from_city_id)
+        b = self.index.get(to_city_id)
+        if a is None or b is None:
+            return None
+        return float(self.great_circle[a, b])
+
+    def rail_travel_minutes(self, from_city_id: int, to_city_id: int) -> Optional[float]:
+        """Nejkratší doba jízdy po kolejích v minutách, None pokud spojení neexistuje."""
+        a = self.index.get(from_city_id)
+        b = self.index.get(to_city_id)
+        if a is None or b is None:
+            return None
+        value = float(self.rail_minutes[a, b])
+        return None if np.isinf(value) else value
+
+
+def network_hash(network: RailNetwork) -> str:
+    """Otisk měst a linek – mění se jen se změnou dat, ze kterých se matice počítají."""
+    digest = hashlib.sha1()
+    for city in network.cities.values():
+        digest.update(repr((city.id, city.lat, city.lon, city.px, city.py)).encode())
+    for line in network.lines:
+        if line.is_active:
+            digest.update(repr((line.from_city_id, line.to_city_id, line.travel_minutes)).encode())
+    return digest.hexdigest()[:16]
+
+
+def build_great_circle_matrix(lat: np.ndarray, lon: np.ndarray, px: np.ndarray, py: np.ndarray) -> np.ndarray:
+    """
+    Vektorový haversine pro všechny dvojice měst (míle).
+    Dvojice, kde některé město nemá GPS, dostanou obrazovkovou vzdálenost z px/py
+    (stejný fallback jako TrainLine.compute_distance).
+    """
+    has_gps = ~(np.isnan(lat) | np.isnan(lon))
+    lat_rad = np.radians(np.where(has_gps, lat, 0.0))
+    lon_rad = np.radians(np.where(has_gps, lon, 0.0))
+
+    dlat = lat_rad[:, None] - lat_rad[None, :]
+    dlon = lon_rad[:, None] - lon_rad[None, :]
+    cos_lat = np.cos(lat_rad)
+    a = np.sin(dlat / 2) ** 2 + cos_lat[:, None] * cos_lat[None, :] * np.sin(dlon / 2) ** 2
+    miles = EARTH_RADIUS_MI * 2 * np.arctan2(np.sqrt(a), np.sqrt(np.clip(1 - a, 0.0, None)))
+
+    both_gps = has_gps[:, None] & has_gps[None, :]
+    if not both_gps.all():
+        dx = px[:, None] - px[None, :]
+        dy = py[:, None] - py[None, :]
+        miles = np.where(both_gps, miles, np.hypot(dx, dy))
+    return miles
+
+
+def build_rail_minutes_matrix(network: RailNetwork, index: Dict[int, int]) -> np.ndarray:
+    """
+    Nejkratší doby jízdy mezi všemi dvojicemi (Floyd–Warshall, vektorově po řádcích).
+    O(N³) operací v NumPy – v řádu sekund pro tisíce měst; nedosažitelné = inf.
+    """
+    n = len(index)
+    dist = np.full((n, n), np.inf, dtype=np.float64)
+    np.fill_diagonal(dist, 0.0)
+    for line in network.lines:
+        if not line.is_active:
+            continue
+        a = index.get(line.from_city_id)
+        b = index.get(line.to_city_id)
+        if a is None or b is None:
+            continue
+        weight = min(dist[a, b], line.travel_minutes)
+        dist[a, b] = weight
+        dist[b, a] = weight
+
+    for k in range(n):
+        np.minimum(dist, dist[:, k, None] + dist[None, k, :], out=dist)
+    return dist
+
+
+def build_distance_matrix_data(network: RailNetwork) -> np.ndarray:
+    """Vrátí pole (2, N, N) float32: [0] vzdušné míle, [1] minuty po kolejích."""
+    city_ids = np.fromiter(network.cities.keys(), dtype=np.int64, count=len(network.cities))
+    index = {int(city_id): idx for idx, city_id in enumerate(city_ids)}
+    cities = list(network.cities.values())
+
+    def column(attr: str) -> np.ndarray:
+        return np.array(
+            [getattr(city, attr) if getattr(city, attr) is not None else np.nan for city in cities],
+            dtype=np.float64,
+        )
+
+    great_circle = build_great_circle_matrix(column("lat"), column("lon"), column("px"), column("py"))
+    rail = build_rail_minutes_matrix(network, index)
+    return np.stack([great_circle, rail]).astype(np.float32)
+
+
+def _save_atomically(path: str, data: np.ndarray) -> None:
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(prefix=FILE_PREFIX, suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            np.save(fh, data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def load_or_build_distance_matrix(network: RailNetwork) -> DistanceMatrix:
+    """Namapuje matice z disku, nebo je postaví a uloží (staré soubory smaže)."""
+    digest = network_hash(network)
+    city_ids = np.fromiter(network.cities.keys(), dtype=np.int64, count=len(network.cities))
+    directory = current_app.config["DISTANCE_MATRIX_DIR"]
+    path = os.path.join(directory, f"{FILE_PREFIX}{digest}.npy")
+
+    if not os.path.exists(path):
+        _save_atomically(path, build_distance_matrix_data(network))
+        for name in os.listdir(directory):
+            if name.startswith(FILE_PREFIX) and name.endswith(".npy") and name != os.path.basename(path):
+                try:
+                    os.remove(os.path.join(directory, name))
+                except OSError:
+                    pass  # jiný proces ji může mít ještě namapovanou
+
+    data = np.load(path, mmap_mode="r")
+    return DistanceMatrix(city_ids, data, digest, stamp=network.stamp)
+
+
+@profiled
+def get_distance_matrix() -> DistanceMatrix:
+    """Matice pro aktuální síť; po reseedu (nová značka mapy) se přepočítá."""
+    network = get_rail_network()
+    matrix = current_app.extensions.get(EXTENSION_KEY)
+    if matrix is not None and matrix.stamp == network.stamp:
+        return matrix
+
+    with _build_lock:
+        matrix = current_app.extensions.get(EXTENSION_KEY)
+        if matrix is None or matrix.stamp != network.stamp:
+            matrix = load_or_build_distance_matrix(network)
+            current_app.extensions[EXTENSION_KEY] = matrix
+    return matrix
+
+
+def distance_matrix_for(network: RailNetwork) -> Optional[DistanceMatrix]:
+    """
+    Matice pro danou síť, pokud jde použít: síť je aktuální síť aplikace a nemá víc
+    než DISTANCE_MATRIX_MAX_CITIES měst. Jinak None – volající spočítá vzdálenost postaru.
+    """
+    if not has_app_context() or not network.cities:
+        return None
+    if len(network.cities) > current_app.config.get("DISTANCE_MATRIX_MAX_CITIES", 1000):
+        return None
+    if network is not get_rail_network():
+        return None
+    return get_distance_matrix()
@@ -6,6 +6,7 @@ from typing import Dict, List
 
 from app.models.agent import Agent
 from app.models.lab_action import LabAction, LabActionState
+from app.profiler import profiled
 
 
 CATEGORY_ORDER = {
@@ -81,6 +82,7 @@ def _build_locked_reason(agent: Agent | None, action: LabAction, state: LabActio
     return unlocked, locked_reason
 
 
+@profiled
 def build_lab_overview(agent: Agent | None) -> dict:
     actions = LabAction.query.order_by(LabAction.category.asc(), LabAction.id.asc()).all()
     state_by_action: Dict[int, LabActionState] = {}
@@ -0,0 +1,137 @@
+# services/map_binary_service.py
+#
+# Kompaktní binární formát mapy pro canvas klienta (/api/map.bin).
+# Všechno little-endian, každá sekce zarovnaná na 4 bajty, takže prohlížeč
+# může nad ArrayBufferem rovnou vytvořit Int32Array / Float32Array / … bez kopírování.
+#
+# Hlavička (32 B):
+#   magic "AUSM" | u16 verze | u16 velikost hlavičky
+#   u32 měst (N) | u32 linek (M) | u32 regionů (R) | u32 typů linek (T)
+#   u32 řetězců (S = N + R + T) | u32 bajtů řetězců
+# Sekce v tomto pořadí:
+#   city_ids      Int32[N]
+#   px, py        Float32[N], Float32[N]   (NaN = chybí)
+#   line_cities   Uint32[2M]               (indexy měst: from, to, from, to, …)
+#   line_distance Float32[M]
+#   line_freq     Uint16[M]
+#   city_region   Uint16[N]                (index do regionů, 0xFFFF = bez regionu)
+#   importance    Uint8[N]
+#   line_type     Uint8[M]                 (index do typů linek)
+#   str_offsets   Uint32[S + 1]            (do bloku řetězců)
+#   strings       UTF-8                    (jména měst, kódy regionů, typy linek)
+
+from __future__ import annotations
+
+import struct
+from typing import Any, Dict, List
+
+import numpy as np
+
+from app.services.rail_network_service import RailNetwork
+
+MAP_BIN_MAGIC = b"AUSM"
+MAP_BIN_VERSION = 1
+MAP_BIN_MIMETYPE = "application/octet-stream"
+
+_HEADER = struct.Struct("<4sHHIIIIII")
+NO_REGION = 0xFFFF
+
+
+def _pad(chunk: bytes) -> bytes:
+    return chunk + b"\0" * (-len(chunk) % 4)
+
+
+def encode_map_bin(network: RailNetwork) -> bytes:
+    """Zabalí města a linky ze sítě v paměti do binárního formátu (viz hlavička modulu)."""
+    cities = list(network.cities.values())
+    index = {city.id: idx for idx, city in enumerate(cities)}
+    regions = sorted({city.region_code for city in cities if city.region_code})
+    region_index = {code: idx for idx, code in enumerate(regions)}
+    line_types = sorted({line.line_type for line in network.lines})
+    type_index = {line_type: idx for idx, line_type in enumerate(line_types)}
+    lines = network.lines
+
+    def floats(values) -> np.ndarray:
+        return np.array([np.nan if value is None else value for value in values], dtype="<f4")
+
+    strings: List[bytes] = [city.name.encode("utf-8") for city in cities]
+    strings += [code.encode("utf-8") for code in regions]
+    strings += [line_type.encode("utf-8") for line_type in line_types]
+    offsets = np.zeros(len(strings) + 1, dtype="<u4")
+    np.cumsum([len(s) for s in strings], out=offsets[1:])
+    string_blob = b"".join(strings)
+
+    sections = [
+        np.array([city.id for city in cities], dtype="<i4"),
+        floats(city.px for city in cities),
+        floats(city.py for city in cities),
+        np.array(
+            [(index[line.from_city_id], index[line.to_city_id]) for line in lines],
+            dtype="<u4",
+        ).reshape(-1),
+        floats(line.distance_units for line in lines),
+        np.array([line.frequency_minutes or 0 for line in lines], dtype="<u2"),
+        np.array([region_index.get(city.region_code, NO_REGION) for city in cities], dtype="<u2"),
+        np.array([city.importance or 0 for city in cities], dtype="u1"),
+        np.array([type_index[line.line_type] for line in lines], dtype="u1"),
+        offsets,
+    ]
+
+    header = _HEADER.pack(
+        MAP_BIN_MAGIC,
+        MAP_BIN_VERSION,
+        _HEADER.size,
+        len(cities),
+        len(lines),
+        len(regions),
+        len(line_types),
+        len(strings),
+        len(string_blob),
+    )
+    return b"".join([header, *(_pad(section.tobytes()) for section in sections), _pad(string_blob)])
+
+
+def decode_map_bin(data: bytes) -> Dict[str, Any]:
+    """Opačný směr k encode_map_bin – pro kontrolu formátu a nástroje mimo prohlížeč."""
+    magic, version, header_size, n, m, r, t, s, string_bytes = _HEADER.unpack_from(data)
+    if magic != MAP_BIN_MAGIC:
+        raise ValueError("not a map.bin payload")
+    if version != MAP_BIN_VERSION:
+        raise ValueError(f"unsupported map.bin version {version}")
+
+    pos = header_size
+
+    def take(dtype: str, count: int) -> np.ndarray:
+        nonlocal pos
+        array = np.frombuffer(data, dtype=dtype, count=count, offset=pos)
+        pos += array.nbytes + (-array.nbytes % 4)
+        return array
+
+    city_ids = take("<i4", n)
+    px = take("<f4", n)
+    py = take("<f4", n)
+    line_cities = take("<u4", 2 * m).reshape(m, 2)
+    line_distance = take("<f4", m)
+    line_freq = take("<u2", m)
+    city_region = take("<u2", n)
+    importance = take("u1", n)
+    line_type = take("u1", m)
+    offsets = take("<u4", s + 1)
+    blob = data[pos:pos + string_bytes]
+    strings = [blob[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(s)]
+
+    return {
+        "version": version,
+        "city_ids": city_ids,
+        "px": px,
+        "py": py,
+        "importance": importance,
+        "city_region": city_region,
+        "city_names": strings[:n],
+        "regions": strings[n:n + r],
+        "line_types": strings[n + r:n + r + t],
+        "line_cities": line_cities,
+        "line_distance": line_distance,
+        "line_frequency": line_freq,
+        "line_type": line_type,
+    }
@@ -0,0 +1,196 @@
+# services/map_payload_service.py
+#
+# Předpočítané odpovědi mapových endpointů (/api/cities, /api/trainlines):
+# - JSON se serializuje jednou na verzi mapy (značka z map_stamp) a drží se
+#   jako bytes spolu s ETagem a předkomprimovanými variantami (gzip, brotli)
+# - seed příkazy značku posunou, takže další request blob postaví znovu
+# - pro hodně velké mapy je k dispozici i streamovaná serializace po kusech
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+from flask import current_app
+from sqlalchemy import select
+
+from app.extensions import db
+from app.models.city import City
+from app.models.region import Region
+from app.profiler import profiled
+from app.services.map_binary_service import MAP_BIN_MIMETYPE, encode_map_bin
+from app.services.map_stamp import read_map_stamp
+from app.services.rail_network_service import RailNetwork, get_rail_network
+
+try:  # brotli je volitelný – bez něj se posílá gzip
+    import brotli
+except ImportError:  # pragma: no cover - záleží na prostředí
+    brotli = None
+
+EXTENSION_KEY = "map_payloads"
+JSON_MIMETYPE = "application/json"
+STREAM_CHUNK_SIZE = 500
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+_build_lock = threading.Lock()
+
+
+class MapPayload:
+    """Hotové tělo odpovědi včetně ETagu a zkomprimovaných variant."""
+
+    __slots__ = ("body", "mimetype", "etag", "stamp", "encoded")
+
+    def __init__(self, body: bytes, mimetype: str, stamp: Optional[int]) -> None:
+        self.body = body
+        self.mimetype = mimetype
+        self.stamp = stamp
+        self.etag = hashlib.sha1(body).hexdigest()
+        self.encoded: Dict[str, bytes] = {"gzip": gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)}
+        if brotli is not None:
+            self.encoded["br"] = brotli.compress(body, quality=BROTLI_QUALITY)
+
+    def variant(self, accept_encodings) -> tuple:
+        """
+        Vybere nejmenší variantu, kterou klient přijímá.
+        Vrací (kódování nebo None, tělo, ETag) – každá varianta má vlastní ETag.
+        """
+        best = (None, self.body, self.etag)
+        for encoding, body in self.encoded.items():
+            if accept_encodings[encoding] and len(body) < len(best[1]):
+                best = (encoding, body, f"{self.etag}-{encoding}")
+        return best
+
+
+def _json_dumps(data: Any) -> str:
+    # stejný výstup jako jsonify() mimo debug režim (seřazené klíče, kompaktní oddělovače)
+    return current_app.json.dumps(data, separators=(",", ":"))
+
+
+def serialize_city(city: City, region_code: Optional[str]) -> Dict[str, Any]:
+    return {
+        "id": city.id,
+        "name": city.name,
+        "region": region_code,
+        "importance": city.importance,
+        "state": city.state,
+        "state_shortcut": city.state_shortcut,
+        "description": city.description,
+        "lat": city.lat,
+        "lon": city.lon,
+        "px": city.px,
+        "py": city.py,
+        "grid_x": city.grid_x,
+        "grid_y": city.grid_y,
+        "population": city.population,
+    }
+
+
+def iter_city_payloads(yield_per: int = STREAM_CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """Města s kódem regionu jedním dotazem (JOIN), načítaná po dávkách."""
+    stmt = (
+        select(City, Region.code)
+        .outerjoin(Region, City.region_id == Region.id)
+        .order_by(City.id)
+        .execution_options(yield_per=yield_per)
+    )
+    for city, region_code in db.session.execute(stmt):
+        yield serialize_city(city, region_code)
+
+
+def iter_trainline_payloads(network: RailNetwork) -> Iterator[Dict[str, Any]]:
+    """Linky ze sítě v paměti – vzdálenosti jsou už předpočítané."""
+    for line in network.lines:
+        from_city = network.city(line.from_city_id)
+        to_city = network.city(line.to_city_id)
+        yield {
+            "from": {
+                "id": from_city.id,
+                "name": from_city.name,
+                "px": from_city.px,
+                "py": from_city.py,
+            },
+            "to": {
+                "id": to_city.id,
+                "name": to_city.name,
+                "px": to_city.px,
+                "py": to_city.py,
+            },
+            "line_type": line.line_type,
+            "frequency_minutes": line.frequency_minutes,
+            "distance_units": line.distance_units,
+        }
+
+
+def iter_json_array(
+    items: Iterable[Any],
+    dumps: Callable[[Any], str],
+    chunk_size: int = STREAM_CHUNK_SIZE,
+) -> Iterator[str]:
+    """Serializuje JSON pole po kusech – výsledek je bajtově stejný jako blob."""
+    yield "["
+    separator = ""
+    chunk = []
+    for item in items:
+        chunk.append(dumps(item))
+        if len(chunk) >= chunk_size:
+            yield separator + ",".join(chunk)
+            separator = ","
+            chunk = []
+    if chunk:
+        yield separator + ",".join(chunk)
+    yield "]\n"
+
+
+def _build_cities() -> tuple:
+    body = "".join(iter_json_array(iter_city_payloads(), _json_dumps))
+    return body.encode("utf-8"), JSON_MIMETYPE
+
+
+def _build_trainlines() -> tuple:
+    body = "".join(iter_json_array(iter_trainline_payloads(get_rail_network()), _json_dumps))
+    return body.encode("utf-8"), JSON_MIMETYPE
+
+
+def _build_map_bin() -> tuple:
+    return encode_map_bin(get_rail_network()), MAP_BIN_MIMETYPE
+
+
+# název payloadu → funkce vracející (bytes, mimetype)
+PAYLOAD_BUILDERS: Dict[str, Callable[[], tuple]] = {
+    "cities": _build_cities,
+    "trainlines": _build_trainlines,
+    "map.bin": _build_map_bin,
+}
+
+
+@profiled
+def get_map_payload(name: str) -> MapPayload:
+    """Vrátí předpočítaný payload; po změně mapy (nová značka) ho postaví znovu."""
+    stamp = read_map_stamp()
+    payloads = current_app.extensions.setdefault(EXTENSION_KEY, {})
+    payload = payloads.get(name)
+    if payload is not None and payload.stamp == stamp:
+        return payload
+
+    with _build_lock:
+        payload = payloads.get(name)
+        if payload is None or payload.stamp != stamp:
+            body, mimetype = PAYLOAD_BUILDERS[name]()
+            payload = MapPayload(body, mimetype, stamp)
+            payloads[name] = payload
+    return payload
+
+
+# JSON payloady, které jde místo blobu streamovat
+STREAM_SOURCES: Dict[str, Callable[[], Iterable[Dict[str, Any]]]] = {
+    "cities": iter_city_payloads,
+    "trainlines": lambda: iter_trainline_payloads(get_rail_network()),
+}
+
+
+def iter_map_payload_stream(name: str) -> Iterator[str]:
+    """Streamovaná varianta JSON payloadu – nic se nedrží v paměti celé."""
+    return iter_json_array(STREAM_SOURCES[name](), _json_dumps)
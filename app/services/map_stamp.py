@@ -0,0 +1,37 @@
+# services/map_stamp.py
+#
+# Značka verze mapy (města + linky).
+# Seed příkazy běží v jiném procesu než server, proto se změna mapy
+# nepropisuje přes paměť, ale přes soubor – stačí porovnat jeho mtime.
+
+from __future__ import annotations
+
+import os
+import time
+from typing import Optional
+
+from flask import current_app
+
+
+def _stamp_path() -> Optional[str]:
+    return current_app.config.get("MAP_STAMP_PATH")
+
+
+def read_map_stamp() -> Optional[int]:
+    """Vrátí aktuální verzi mapy (mtime značky v ns) nebo None, pokud značka chybí."""
+    path = _stamp_path()
+    if not path:
+        return None
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def bump_map_stamp() -> None:
+    """Označí mapu jako změněnou – všechny procesy si při dalším čtení přestaví cache."""
+    path = _stamp_path()
+    if not path:
+        return
+    with open(path, "w", encoding="utf-8") as fh:
+        fh.write(str(time.time_ns()))
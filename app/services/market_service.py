@@ -0,0 +1,136 @@
+# services/market_service.py
+#
+# Sběr a nákup materiálu ve městě bez zámků a bez ztracených zápisů:
+# - zásoba města se odečítá podmíněným UPDATE (… WHERE qty >= :qty), takže dva
+#   agenti nikdy neprodají / neseberou víc, než ve městě je
+# - agentovi se materiál přičítá podmíněně (… WHERE material_current + :qty <= material_max)
+# - peníze se strhávají z agent_inventory_items stejně (… WHERE quantity >= :cost)
+# - když podmínka nesedí, už provedené kroky se vrátí, načtou se čerstvé hodnoty
+#   a pokus se opakuje (nejvýš MAX_ATTEMPTS); všechno ve stejné transakci, commit řeší volající
+# UPDATE … RETURNING vrátí nové hodnoty rovnou, bez dalšího SELECTu.
+
+from __future__ import annotations
+
+from typing import Any, Optional, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.extensions import db
+from app.models.agent import Agent
+from app.models.city import City
+
+MAX_ATTEMPTS = 5
+
+
+class MarketError(ValueError):
+    """Transakci nejde provést; `code` jde rovnou do JSON odpovědi jako "error"."""
+
+    def __init__(self, code: str, status: int = 400) -> None:
+        super().__init__(code)
+        self.code = code
+        self.status = status
+
+
+def _take_city_stock(city: City, column: str, qty: int, **expected: Any) -> Optional[int]:
+    """Odečte qty ze sloupce města, pokud tam ještě je; vrací nový stav nebo None."""
+    table = City.__table__
+    statement = (
+        update(table)
+        .where(table.c.id == city.id, table.c[column] >= qty)
+        .values({column: table.c[column] - qty})
+        .returning(table.c[column])
+    )
+    for key, value in expected.items():
+        statement = statement.where(table.c[key] == value)
+    return db.session.execute(statement).scalar()
+
+
+def _return_city_stock(city: City, column: str, qty: int) -> None:
+    table = City.__table__
+    db.session.execute(update(table).where(table.c.id == city.id).values({column: table.c[column] + qty}))
+
+
+def _reload(instance, *columns: str) -> None:
+    """Načte čerstvé hodnoty sloupců z DB do už načteného objektu (bez flush)."""
+    table = type(instance).__table__
+    row = db.session.execute(select(*(table.c[column] for column in columns)).where(table.c.id == instance.id)).one()
+    for column, value in zip(columns, row):
+        set_committed_value(instance, column, value)
+
+
+def _credit_material(agent: Agent, qty: int) -> Optional[int]:
+    """Přičte agentovi qty materiálu, pokud se vejde; vrací nový material_current nebo None."""
+    table = Agent.__table__
+    return db.session.execute(
+        update(table)
+        .where(table.c.id == agent.id, table.c.material_current + qty <= table.c.material_max)
+        .values(material_current=table.c.material_current + qty)
+        .returning(table.c.material_current)
+    ).scalar()
+
+
+def collect_materials(agent: Agent, city: City) -> int:
+    """Sebere z infocentra města, kolik se agentovi vejde; vrací sebrané množství."""
+    for attempt in range(MAX_ATTEMPTS):
+        if attempt:
+            _reload(city, "material_info_qty")
+            _reload(agent, "material_current", "material_max")
+        capacity = max(0, (agent.material_max or 0) - (agent.material_current or 0))
+        collect_qty = min(city.material_info_qty or 0, capacity)
+        if collect_qty <= 0:
+            raise MarketError("no_material_available")
+
+        city_left = _take_city_stock(city, "material_info_qty", collect_qty)
+        if city_left is None:
+            continue
+        material_current = _credit_material(agent, collect_qty)
+        if material_current is None:
+            _return_city_stock(city, "material_info_qty", collect_qty)
+            continue
+
+        set_committed_value(city, "material_info_qty", city_left)
+        set_committed_value(agent, "material_current", material_current)
+        return collect_qty
+    raise MarketError("market_busy", 409)
+
+
+def buy_materials(agent: Agent, city: City, qty_requested: int) -> Tuple[int, int]:
+    """Koupí až qty_requested materiálu z trhu města; vrací (koupené množství, cena celkem)."""
+    for attempt in range(MAX_ATTEMPTS):
+        if attempt:
+            _reload(city, "market_material_qty", "market_material_price")
+            _reload(agent, "material_current", "material_max")
+        price = city.market_material_price
+        if not city.market_material_qty or city.market_material_qty <= 0:
+            raise MarketError("market_empty")
+        if not price:
+            raise MarketError("price_missing")
+
+        capacity = max(0, (agent.material_max or 0) - (agent.material_current or 0))
+        purchasable_qty = min(city.market_material_qty, qty_requested, capacity)
+        if purchasable_qty <= 0:
+            raise MarketError("no_capacity")
+
+        total_cost = purchasable_qty * price
+        if agent.inventory["money"] < total_cost:
+            raise MarketError("insufficient_funds")
+
+        # cena musí být pořád ta, za kterou se počítalo
+        city_left = _take_city_stock(city, "market_material_qty", purchasable_qty, market_material_price=price)
+        if city_left is None:
+            continue
+        if agent.take_from_inventory("money", total_cost) is None:
+            # peníze mezitím utratil jiný request
+            _return_city_stock(city, "market_material_qty", purchasable_qty)
+            raise MarketError("insufficient_funds")
+        material_current = _credit_material(agent, purchasable_qty)
+        if material_current is None:
+            _return_city_stock(city, "market_material_qty", purchasable_qty)
+            agent.add_to_inventory("money", total_cost)
+            continue
+
+        set_committed_value(city, "market_material_qty", city_left)
+        set_committed_value(agent, "material_current", material_current)
+        return purchasable_qty, total_cost
+    raise MarketError("market_busy", 409)
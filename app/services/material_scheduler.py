@@ -0,0 +1,108 @@
+# services/material_scheduler.py
+#
+# Denní obnova materiálu ve městech mimo requesty:
+# - vlákno na pozadí (MATERIAL_REFRESH_SCHEDULER=1) spí do další kotvy 06:00
+#   a pak jedním během obnoví všechna města (refresh_material_states)
+# - po startu procesu nejdřív dožene, co zmeškal (města se starším stavem)
+# - vlákno se pouští až s prvním requestem, takže CLI příkazy (migrace, seedy) nic nespouští
+# - pro cron bez vlákna: `flask materials refresh` (idempotentní, jde pouštět opakovaně)
+
+from __future__ import annotations
+
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Optional
+
+import click
+from flask import Flask
+from flask.cli import AppGroup
+
+from app.extensions import db
+from app.services.material_service import _refresh_anchor, refresh_material_states
+
+EXTENSION_KEY = "material_scheduler"
+# po chybě obnovy se to zkusí znovu za tuto dobu (s)
+RETRY_DELAY = 60.0
+
+logger = logging.getLogger(__name__)
+
+
+def run_material_refresh(now: Optional[datetime] = None, force: bool = False) -> int:
+    """Obnoví zastaralé stavy materiálu v jedné transakci; vrací počet obnovených měst."""
+    try:
+        refreshed = refresh_material_states(now=now, force=force)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return refreshed
+
+
+class MaterialRefreshScheduler:
+    """Vlákno, které každý den v 06:00 obnoví stav materiálu ve všech městech."""
+
+    def __init__(self, app: Flask) -> None:
+        self.app = app
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="material-refresh", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def run_once(self) -> int:
+        with self.app.app_context():
+            try:
+                return run_material_refresh()
+            finally:
+                db.session.remove()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                refreshed = self.run_once()
+                if refreshed:
+                    logger.info("materials: refreshed %d cities", refreshed)
+                now = datetime.now()
+                delay = (_refresh_anchor(now) + timedelta(days=1) - now).total_seconds()
+            except Exception:
+                logger.exception("materials: refresh failed, retrying in %.0f s", RETRY_DELAY)
+                delay = RETRY_DELAY
+            self._stop.wait(max(delay, 0.0))
+
+
+def get_material_scheduler(app: Flask) -> Optional[MaterialRefreshScheduler]:
+    return app.extensions.get(EXTENSION_KEY)
+
+
+def init_material_scheduler(app: Flask) -> None:
+    """Zapne denní obnovu materiálu vláknem na pozadí, pokud to povoluje MATERIAL_REFRESH_SCHEDULER."""
+    if not app.config.get("MATERIAL_REFRESH_SCHEDULER"):
+        return
+    scheduler = MaterialRefreshScheduler(app)
+    app.extensions[EXTENSION_KEY] = scheduler
+    app.before_request(scheduler.ensure_started)
+
+
+def register_material_commands(app: Flask) -> None:
+    materials = AppGroup("materials", help="Daily city material state.")
+
+    @materials.command("refresh")
+    @click.option("--force", is_flag=True, help="Re-roll every city, not only those older than today's 06:00.")
+    def refresh(force: bool):
+        """Refresh city material state in one batch (run from cron shortly after 06:00)."""
+        refreshed = run_material_refresh(force=force)
+        click.echo(f"✅ Refreshed material state of {refreshed} cities.")
+
+    app.cli.add_command(materials)
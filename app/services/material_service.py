@@ -1,9 +1,27 @@
+# services/material_service.py
+#
+# Denní stav materiálu ve městech:
+# - stav se obnovuje jednou denně v 06:00 (kotva _refresh_anchor)
+# - náhoda je klíčovaná (WORLD_SEED, město, den obnovy) – domain/seeded_random.py,
+#   takže výchozí stav dne jde kdykoli spočítat znovu (roll_material_state)
+# - refresh_material_states() obnoví všechna zastaralá města najednou: hodnoty
+#   se losují v NumPy po celých polích a zapíší se jedním hromadným
+#   UPDATE (executemany) – volá ho plánovač / `flask materials refresh`
+#   (services/material_scheduler.py), requesty stav jen čtou
+# - maybe_refresh_material_state() je původní obnova jednoho města (benchmarky)
+
 from __future__ import annotations
 
 from datetime import datetime, timedelta
-import random
+from typing import Iterable
+
+import numpy as np
+from sqlalchemy import bindparam, func, or_, select, update
 
+from app.domain.seeded_random import STREAM_MATERIALS, keyed_uniforms, stream_keys, world_seed
+from app.extensions import db
 from app.models.city import City
+from app.profiler import profiled
 
 
 INFO_WEIGHTS = {
@@ -26,51 +44,144 @@ def _refresh_anchor(now: datetime) -> datetime:
     return anchor
 
 
-def _pick_weighted(options: list[tuple[int, int]], rng: random.Random) -> int:
-    total = sum(weight for _, weight in options)
-    if total <= 0:
-        return options[-1][0]
-    roll = rng.randint(1, total)
-    running = 0
-    for value, weight in options:
-        running += weight
-        if roll <= running:
-            return value
-    return options[-1][0]
-
-
-def _pick_price(min_price: int, max_price: int, rng: random.Random) -> int:
-    options = list(range(min_price, max_price + 1, 10))
-    return rng.choice(options)
+def _refresh_day(anchor: datetime) -> int:
+    """Číslo dne obnovy (ordinal data kotvy) – část klíče náhody."""
+    return anchor.date().toordinal()
+
+
+def draw_material_states(
+    city_ids: np.ndarray,
+    importance: np.ndarray,
+    refresh_day: int,
+    seed: int | None = None,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    info_qty, market_qty a cena pro pole měst podle INFO_WEIGHTS / MARKET_RULES.
+
+    Náhoda je klíčovaná (world seed, město, den obnovy) – stejné město má ve
+    stejný den vždy stejný stav, ať se počítá po jednom nebo v celé dávce.
+    Cena 0 znamená, že trh nic nenabízí.
+    """
+    keys = stream_keys(world_seed() if seed is None else seed, STREAM_MATERIALS, city_ids, refresh_day)
+    roll_info, roll_qty, roll_price = (keyed_uniforms(keys, counter) for counter in range(3))
+
+    levels = np.where(np.isin(importance, list(MARKET_RULES)), importance, 3)
+    info_qty = np.zeros(levels.size, dtype=np.int64)
+    market_qty = np.zeros(levels.size, dtype=np.int64)
+    market_price = np.zeros(levels.size, dtype=np.int64)
+
+    for level, rule in MARKET_RULES.items():
+        mask = levels == level
+        if not mask.any():
+            continue
+        values, weights = (np.asarray(column) for column in zip(*INFO_WEIGHTS[level]))
+        bounds = np.cumsum(weights) / weights.sum()
+        picked = np.searchsorted(bounds, roll_info[mask], side="right")
+        info_qty[mask] = values[np.minimum(picked, values.size - 1)]
+
+        qty_span = rule["qty_max"] - rule["qty_min"] + 1
+        market_qty[mask] = rule["qty_min"] + (roll_qty[mask] * qty_span).astype(np.int64)
+        price_steps = (rule["price_max"] - rule["price_min"]) // 10 + 1
+        market_price[mask] = rule["price_min"] + 10 * (roll_price[mask] * price_steps).astype(np.int64)
+
+    market_price[market_qty == 0] = 0
+    return info_qty, market_qty, market_price
+
+
+def roll_material_state(city_id: int, importance: int | None, refresh_day: int, seed: int | None = None) -> dict:
+    """Stav materiálu jednoho města pro daný den – spočítaný znovu, nic se nečte ani neukládá."""
+    info_qty, market_qty, market_price = draw_material_states(
+        np.array([city_id]), np.array([importance or 3]), refresh_day, seed
+    )
+    return {
+        "info_qty": int(info_qty[0]),
+        "market_qty": int(market_qty[0]),
+        "market_price": int(market_price[0]) or None,
+    }
 
 
-def maybe_refresh_material_state(city: City, now: datetime | None = None, rng: random.Random | None = None) -> bool:
+@profiled
+def maybe_refresh_material_state(city: City, now: datetime | None = None) -> bool:
     now = now or datetime.now()
-    rng = rng or random.Random()
     anchor = _refresh_anchor(now)
     last_refresh = city.material_refreshed_at
     if last_refresh and last_refresh >= anchor:
         return False
 
-    importance = city.importance or 3
-    info_weights = INFO_WEIGHTS.get(importance, INFO_WEIGHTS[3])
-    info_qty = _pick_weighted(info_weights, rng)
-
-    market_rule = MARKET_RULES.get(importance, MARKET_RULES[3])
-    market_qty = rng.randint(market_rule["qty_min"], market_rule["qty_max"])
-    market_price = (
-        _pick_price(market_rule["price_min"], market_rule["price_max"], rng)
-        if market_qty > 0
-        else None
-    )
-
-    city.material_info_qty = info_qty
-    city.market_material_qty = market_qty
-    city.market_material_price = market_price
+    state = roll_material_state(city.id, city.importance, _refresh_day(anchor))
+    city.material_info_qty = state["info_qty"]
+    city.market_material_qty = state["market_qty"]
+    city.market_material_price = state["market_price"]
     city.material_refreshed_at = now
     return True
 
 
+def _is_stale(column, anchor: datetime):
+    return or_(column.is_(None), column < anchor)
+
+
+@profiled
+def refresh_material_states(
+    now: datetime | None = None,
+    city_ids: Iterable[int] | None = None,
+    force: bool = False,
+    seed: int | None = None,
+) -> int:
+    """
+    Obnoví stav materiálu všech měst, která ho mají starší než poslední kotvu 06:00
+    (s force=True všech – tím se vrátí dnešní výchozí stav), a vrátí počet měst, která
+    UPDATE skutečně změnil. Commit řeší volající.
+
+    UPDATE má podmínku na material_refreshed_at i sám, takže druhý souběžný běh
+    (víc workerů, cron + plánovač) nevrátí zásoby, které mezitím někdo vybral.
+    """
+    now = now or datetime.now()
+    anchor = _refresh_anchor(now)
+
+    statement = select(City.id, func.coalesce(City.importance, 3)).order_by(City.id)
+    if not force:
+        statement = statement.where(_is_stale(City.material_refreshed_at, anchor))
+    if city_ids is not None:
+        statement = statement.where(City.id.in_(list(city_ids)))
+    rows = db.session.execute(statement).all()
+    if not rows:
+        return 0
+
+    ids, importance = (np.fromiter(column, dtype=np.int64, count=len(rows)) for column in zip(*rows))
+    info_qty, market_qty, market_price = draw_material_states(ids, importance, _refresh_day(anchor), seed)
+
+    table = City.__table__
+    statement = (
+        update(table)
+        .where(table.c.id == bindparam("b_id"))
+        .values(
+            material_info_qty=bindparam("b_info_qty"),
+            market_material_qty=bindparam("b_market_qty"),
+            market_material_price=bindparam("b_market_price"),
+            material_refreshed_at=now,
+        )
+    )
+    if not force:
+        statement = statement.where(_is_stale(table.c.material_refreshed_at, anchor))
+    result = db.session.execute(
+        statement,
+        [
+            {"b_id": city_id, "b_info_qty": info, "b_market_qty": qty, "b_market_price": price or None}
+            for city_id, info, qty, price in zip(
+                ids.tolist(), info_qty.tolist(), market_qty.tolist(), market_price.tolist()
+            )
+        ],
+    )
+    # počítá se, co UPDATE opravdu změnil – řádky, které mezitím obnovil souběžný běh,
+    # podmínka přeskočí; psycopg2 (execute_batch) rowcount po dávkách nesčítá, tam se
+    # spočítají města s razítkem tohoto běhu
+    if db.session.get_bind().dialect.supports_sane_multi_rowcount:
+        return result.rowcount
+    return db.session.execute(
+        select(func.count()).select_from(City).where(City.id.in_(ids.tolist()), City.material_refreshed_at == now)
+    ).scalar_one()
+
+
 def serialize_city_material_state(city: City) -> dict:
     return {
         "city_id": city.id,
@@ -0,0 +1,202 @@
+# services/rail_network_service.py
+#
+# Vlaková síť v paměti procesu:
+# - jednou načte města a linky z DB (TrainLine/City/Region)
+# - pro každé město drží kompaktní pole sousedů (soused, linka, frekvence,
+#   vzdálenost, doba jízdy), takže jízdní řád už nesahá do SQL
+# - seed příkazy ji invalidují přes značku verze mapy (viz map_stamp)
+
+from __future__ import annotations
+
+import threading
+from array import array
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from flask import current_app
+
+from app.models.city import City
+from app.models.region import Region
+from app.models.train_line import TrainLine
+from app.profiler import profiled
+from app.services.map_stamp import bump_map_stamp, read_map_stamp
+from app.services.timetable_service import (
+    compute_city_distance_miles,
+    compute_travel_minutes,
+    spread_offset,
+)
+
+EXTENSION_KEY = "rail_network"
+
+_build_lock = threading.Lock()
+
+
+class NetworkCity(NamedTuple):
+    id: int
+    name: str
+    importance: Optional[int]
+    region_code: Optional[str]
+    lat: Optional[float]
+    lon: Optional[float]
+    px: Optional[float]
+    py: Optional[float]
+
+
+class NetworkLine(NamedTuple):
+    id: int
+    from_city_id: int
+    to_city_id: int
+    line_type: str
+    frequency_minutes: int
+    is_active: bool
+    distance_units: float  # míle po trati (už vynásobené DISTANCE_SCALE)
+    travel_minutes: int
+
+
+class CityAdjacency:
+    """
+    Sousedé jednoho města jako paralelní pole.
+    Nejdřív jdou linky, které z města vyjíždějí (from_city), pak linky,
+    které do něj vedou (to_city) – obojí seřazené podle id linky, stejně
+    jako je dřív skládal jízdní řád. `offsets` je posun prvního odjezdu
+    dne (spread_offset), takže jízdní řád i plánovač tras čtou stejný rozpis.
+    """
+
+    __slots__ = (
+        "neighbor_ids",
+        "line_ids",
+        "frequencies",
+        "distances",
+        "travel_minutes",
+        "offsets",
+        "outbound_count",
+    )
+
+    def __init__(self) -> None:
+        self.neighbor_ids = array("l")
+        self.line_ids = array("l")
+        self.frequencies = array("l")
+        self.distances = array("d")
+        self.travel_minutes = array("l")
+        self.offsets = array("l")
+        self.outbound_count = 0
+
+    def __len__(self) -> int:
+        return len(self.line_ids)
+
+    def _append(self, neighbor_id: int, line: NetworkLine) -> None:
+        self.neighbor_ids.append(neighbor_id)
+        self.line_ids.append(line.id)
+        self.frequencies.append(line.frequency_minutes or 60)
+        self.distances.append(line.distance_units)
+        self.travel_minutes.append(line.travel_minutes)
+
+    def _finalize(self) -> None:
+        total = len(self)
+        self.offsets = array("l", (spread_offset(idx, freq, total) for idx, freq in enumerate(self.frequencies)))
+
+
+_EMPTY_ADJACENCY = CityAdjacency()
+
+
+class RailNetwork:
+    """Neměnný snímek vlakové sítě – sdílený všemi requesty procesu."""
+
+    def __init__(
+        self,
+        cities: Dict[int, NetworkCity],
+        lines: Tuple[NetworkLine, ...],
+        stamp: Optional[int] = None,
+    ) -> None:
+        self.cities = cities
+        self.lines = lines
+        self.lines_by_id = {line.id: line for line in lines}
+        self.stamp = stamp
+        self.adjacency: Dict[int, CityAdjacency] = {city_id: CityAdjacency() for city_id in cities}
+
+        active = [line for line in lines if line.is_active]
+        for line in active:
+            self.adjacency.setdefault(line.from_city_id, CityAdjacency())._append(line.to_city_id, line)
+        for adjacency in self.adjacency.values():
+            adjacency.outbound_count = len(adjacency)
+        for line in active:
+            self.adjacency.setdefault(line.to_city_id, CityAdjacency())._append(line.from_city_id, line)
+        for adjacency in self.adjacency.values():
+            adjacency._finalize()
+
+    def city(self, city_id: int) -> Optional[NetworkCity]:
+        return self.cities.get(city_id)
+
+    def neighbors(self, city_id: int) -> CityAdjacency:
+        return self.adjacency.get(city_id, _EMPTY_ADJACENCY)
+
+
+def build_rail_network(stamp: Optional[int] = None) -> RailNetwork:
+    """Načte celou síť třemi dotazy a předpočítá vzdálenosti i doby jízdy."""
+    region_codes = {region.id: region.code for region in Region.query.all()}
+    city_rows = City.query.order_by(City.id).all()
+    city_by_id = {city.id: city for city in city_rows}
+
+    cities: Dict[int, NetworkCity] = {
+        city.id: NetworkCity(
+            id=city.id,
+            name=city.name,
+            importance=city.importance,
+            region_code=region_codes.get(city.region_id),
+            lat=city.lat,
+            lon=city.lon,
+            px=city.px,
+            py=city.py,
+        )
+        for city in city_rows
+    }
+
+    lines: List[NetworkLine] = []
+    for line in TrainLine.query.order_by(TrainLine.id).all():
+        from_city = city_by_id.get(line.from_city_id)
+        to_city = city_by_id.get(line.to_city_id)
+        distance_miles = compute_city_distance_miles(from_city, to_city, line.distance_units)
+        travel_minutes = compute_travel_minutes(
+            line,
+            imp_a=from_city.importance if from_city else None,
+            imp_b=to_city.importance if to_city else None,
+            distance_miles=distance_miles,
+        )
+        lines.append(
+            NetworkLine(
+                id=line.id,
+                from_city_id=line.from_city_id,
+                to_city_id=line.to_city_id,
+                line_type=line.line_type,
+                frequency_minutes=line.frequency_minutes,
+                is_active=bool(line.is_active),
+                distance_units=distance_miles,
+                travel_minutes=travel_minutes,
+            )
+        )
+
+    return RailNetwork(cities, tuple(lines), stamp=stamp)
+
+
+@profiled
+def get_rail_network() -> RailNetwork:
+    """
+    Vrátí síť pro aktuální aplikaci. Staví se jen při prvním použití
+    nebo když seed změnil značku verze mapy.
+    """
+    stamp = read_map_stamp()
+    network = current_app.extensions.get(EXTENSION_KEY)
+    if network is not None and network.stamp == stamp:
+        return network
+
+    with _build_lock:
+        network = current_app.extensions.get(EXTENSION_KEY)
+        if network is None or network.stamp != stamp:
+            network = build_rail_network(stamp=stamp)
+            current_app.extensions[EXTENSION_KEY] = network
+    return network
+
+
+def invalidate_rail_network() -> None:
+    """Zahodí síť v tomto procesu a označí mapu jako změněnou pro ostatní procesy."""
+    current_app.extensions.pop(EXTENSION_KEY, None)
+    bump_map_stamp()
@@ -0,0 +1,166 @@
+# services/route_service.py
+#
+# Plánovač nejrychlejší trasy přes více přestupů:
+# - časově závislý A* nad vlakovou sítí v paměti (rail_network_service)
+# - čekání na odjezd podle frekvence a offsetů z jízdního řádu
+# - heuristika = nejkratší čistá doba jízdy do cíle z předpočítané matice
+#   (distance_matrix_service); bez matice vzdušná vzdálenost nejrychlejším vlakem
+
+from __future__ import annotations
+
+import heapq
+import math
+from typing import Any, Dict, List, Optional
+
+from app.profiler import profiled
+from app.services.distance_matrix_service import distance_matrix_for
+from app.services.rail_network_service import RailNetwork, get_rail_network
+from app.services.timetable_service import (
+    DISTANCE_SCALE,
+    MINUTES_PER_DAY,
+    _haversine_miles,
+    next_departure_minutes,
+)
+
+# nejvyšší rychlost v compute_travel_minutes (úroveň 1 = express)
+MAX_SPEED_MPH = 190
+
+
+def _earliest_departure(current_minutes: int, offset: int, freq: int) -> int:
+    """
+    Nejbližší odjezd linky, na který agent stihne nastoupit.
+    Rozpis se každou půlnoc resetuje na první odjezd dne, takže u frekvencí,
+    které nedělí 24 h (např. 75 min), může první vlak nového dne jet dřív než
+    "pokračování" včerejšího intervalu – počkat na něj je pak rychlejší.
+    Díky tomu je čas příjezdu monotónní v čase startu (FIFO) a A* zůstává korektní.
+    """
+    dep = next_departure_minutes(current_minutes, offset, freq)
+    next_day_start = current_minutes - current_minutes % MINUTES_PER_DAY + MINUTES_PER_DAY
+    if dep > next_day_start:
+        dep = min(dep, next_departure_minutes(next_day_start, offset, freq))
+    return dep
+
+
+def _build_heuristic(network: RailNetwork, target_id: int):
+    """
+    Vrátí funkci city_id → dolní odhad minut do cíle (inf = cíl je nedosažitelný).
+    S maticí je to nejkratší doba jízdy po kolejích bez čekání: čekání je nezáporné
+    a nejkratší cesty splňují trojúhelníkovou nerovnost, takže odhad je přípustný
+    i konzistentní a je mnohem těsnější než vzdušná čára.
+    """
+    matrix = distance_matrix_for(network)
+    if matrix is not None and target_id in matrix.index:
+        column = matrix.rail_minutes[:, matrix.index[target_id]]
+        index = matrix.index
+        return lambda city_id: float(column[index[city_id]])
+    return _build_haversine_heuristic(network, target_id)
+
+
+def _build_haversine_heuristic(network: RailNetwork, target_id: int):
+    """
+    Záložní heuristika bez matice. Každá trať je aspoň tak dlouhá jako vzdušná
+    čára * DISTANCE_SCALE a žádný vlak nejede rychleji než MAX_SPEED_MPH,
+    takže odhad je přípustný i konzistentní.
+    Pokud některé město nemá GPS (trasy se pak počítají z px/py), heuristiku vypneme.
+    """
+    target = network.city(target_id)
+    if target is None or target.lat is None or target.lon is None:
+        return lambda city_id: 0.0
+    if any(city.lat is None or city.lon is None for city in network.cities.values()):
+        return lambda city_id: 0.0
+
+    minutes_per_mile = 60.0 / MAX_SPEED_MPH * DISTANCE_SCALE
+    cache: Dict[int, float] = {}
+
+    def heuristic(city_id: int) -> float:
+        value = cache.get(city_id)
+        if value is None:
+            city = network.cities[city_id]
+            value = _haversine_miles(city.lat, city.lon, target.lat, target.lon) * minutes_per_mile
+            cache[city_id] = value
+        return value
+
+    return heuristic
+
+
+@profiled
+def plan_fastest_route(
+    from_city_id: int,
+    to_city_id: int,
+    departure_minutes: int,
+    network: Optional[RailNetwork] = None,
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Najde trasu s nejdřívějším příjezdem do cíle při startu v departure_minutes.
+
+    Vrací seznam úseků (dictů s klíči from_city, to_city, line, departure_minutes,
+    arrival_minutes, wait_minutes, travel_minutes, distance_units), prázdný seznam
+    pokud start == cíl, nebo None, pokud cíl není dosažitelný.
+    Odjezdy odpovídají rozpisu compute_next_departures bez posunů o 5 minut,
+    kterými jízdní řád jen odděluje kolidující časy v tabuli (a s čekáním
+    na první vlak dne, viz _earliest_departure).
+    """
+    network = network or get_rail_network()
+    if network.city(from_city_id) is None or network.city(to_city_id) is None:
+        return None
+    if from_city_id == to_city_id:
+        return []
+
+    heuristic = _build_heuristic(network, to_city_id)
+    start_estimate = heuristic(from_city_id)
+    if start_estimate == math.inf:
+        return None
+
+    best_arrival: Dict[int, int] = {from_city_id: departure_minutes}
+    # city_id → (předchozí město, index v jeho adjacency, čas odjezdu)
+    came_from: Dict[int, tuple] = {}
+    settled = set()
+    heap = [(departure_minutes + start_estimate, departure_minutes, from_city_id)]
+
+    while heap:
+        _, arrival, city_id = heapq.heappop(heap)
+        if city_id in settled:
+            continue
+        if city_id == to_city_id:
+            break
+        settled.add(city_id)
+
+        adjacency = network.neighbors(city_id)
+        for idx in range(len(adjacency)):
+            neighbor_id = adjacency.neighbor_ids[idx]
+            if neighbor_id in settled:
+                continue
+            dep = _earliest_departure(arrival, adjacency.offsets[idx], adjacency.frequencies[idx])
+            arr = dep + adjacency.travel_minutes[idx]
+            known = best_arrival.get(neighbor_id)
+            if known is not None and known <= arr:
+                continue
+            estimate = heuristic(neighbor_id)
+            if estimate == math.inf:
+                continue  # z tohoto města se do cíle nedá dojet
+            best_arrival[neighbor_id] = arr
+            came_from[neighbor_id] = (city_id, idx, dep)
+            heapq.heappush(heap, (arr + estimate, arr, neighbor_id))
+
+    if to_city_id not in came_from:
+        return None
+
+    legs: List[Dict[str, Any]] = []
+    city_id = to_city_id
+    while city_id != from_city_id:
+        prev_id, idx, dep = came_from[city_id]
+        adjacency = network.neighbors(prev_id)
+        travel = adjacency.travel_minutes[idx]
+        legs.append({
+            "from_city": network.city(prev_id),
+            "to_city": network.city(city_id),
+            "line": network.lines_by_id[adjacency.line_ids[idx]],
+            "departure_minutes": dep,
+            "arrival_minutes": dep + travel,
+            "wait_minutes": dep - best_arrival[prev_id],
+            "travel_minutes": travel,
+            "distance_units": adjacency.distances[idx],
+        })
+        city_id = prev_id
+    legs.reverse()
+    return legs
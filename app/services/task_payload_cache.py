@@ -0,0 +1,116 @@
+# services/task_payload_cache.py
+#
+# LRU cache vykreslených šablon úkolů pro /api/tasks:
+# - výsledek quest.render(placeholders) závisí jen na (id úkolu, placeholdery)
+#   a u přiděleného úkolu se nemění, takže se vykresluje jednou
+# - klíč = id úkolu + hash placeholderů (kanonický JSON → blake2b)
+# - volatilní pole (completed_objectives, progress, status, reward_claimed)
+#   dosazuje serialize_active_task při každém requestu nad kopií fragmentu
+# - počitadla hits / misses / evictions pro monitoring (/api/debug/task-cache)
+# Šablony se mění jen s nasazením (registr se staví při importu), takže cache
+# nepotřebuje invalidaci; TASK_PAYLOAD_CACHE_SIZE=0 ho vypne.
+
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from flask import current_app, has_app_context
+
+from app.domain.agent.task_registry import QuestTemplate
+
+EXTENSION_KEY = "task_payload_cache"
+
+
+class LRUCache:
+    """Thread-safe LRU s počitadly zásahů; hodnoty se nesmí měnit (sdílí je víc requestů)."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._items: "OrderedDict[Hashable, Any]" = OrderedDict()
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return value
+            self.misses += 1
+        # vykreslení mimo zámek; dva souběžné missy spočítají totéž, nevadí
+        value = factory()
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._items),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+def placeholders_digest(placeholders: Dict[str, Any]) -> str:
+    """Stabilní hash placeholderů – nezávislý na pořadí klíčů."""
+    canonical = json.dumps(placeholders or {}, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _payload_cache() -> Optional[LRUCache]:
+    if not has_app_context():
+        return None
+    cache = current_app.extensions.get(EXTENSION_KEY)
+    if cache is None:
+        size = int(current_app.config.get("TASK_PAYLOAD_CACHE_SIZE", 4096) or 0)
+        if size <= 0:
+            return None
+        cache = current_app.extensions.setdefault(EXTENSION_KEY, LRUCache(size))
+    return cache
+
+
+def rendered_task_fragment(quest: QuestTemplate, placeholders: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Vykreslená šablona úkolu (bez volatilních polí) – z cache, nebo čerstvě.
+    Vrácený dict je sdílený: volající ho nesmí měnit, jen kopírovat.
+    """
+    cache = _payload_cache()
+    if cache is None:
+        return quest.render(placeholders)
+    key: Tuple[str, str] = (quest.id, placeholders_digest(placeholders))
+    return cache.get_or_create(key, lambda: quest.render(placeholders))
+
+
+def task_payload_cache_stats() -> Dict[str, Any]:
+    """Počitadla cache pro monitoring; vypnutý cache = {"enabled": False}."""
+    cache = _payload_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+
+def clear_task_payload_cache() -> None:
+    cache = _payload_cache()
+    if cache is not None:
+        cache.clear()
@@ -1,24 +1,34 @@
 # services/task_service.py
 #
 # Jednoduchý quest engine:
-# - načítá templaty z AGENT_TASK_TEMPLATES
+# - načítá templaty z předkompilovaného TASK_TEMPLATE_REGISTRY (index podle id)
 # - drží stav v ActiveTask
 # - zpracovává triggery a odměny
+# - další úkol přiděluje jen advance_task_pipeline po událostech (vytvoření agenta,
+#   splnění kroku, vyzvednutí odměny, reset); výpisy úkolů a dialogů jen čtou
 
 from __future__ import annotations
 
 from typing import Optional, Dict, Any, List
 import re
 import random
+
+import click
+from flask import Flask
+from flask.cli import AppGroup
+
 from app.extensions import db
 from app.models.active_task import ActiveTask
 from app.models.agent import Agent
 from app.models.city import City
 from app.domain.agent.task_config import (
-    AGENT_TASK_TEMPLATES,
+    TASK_TEMPLATE_REGISTRY,
+    city_catalog,
     resolve_template_for_agent,
-    build_template_from_placeholders,
 )
+from app.domain.agent.task_registry import QuestTemplate
+from app.services.task_payload_cache import rendered_task_fragment
+from app.profiler import profiled
 
 
 # -------------------------------------------------------------------
@@ -33,25 +43,14 @@ def _agent_region_code(agent: Agent | None) -> Optional[str]:
 
 
 def get_task_template(task_id: str) -> Optional[Dict[str, Any]]:
-    """Najde task template podle id v AGENT_TASK_TEMPLATES."""
-    for t in AGENT_TASK_TEMPLATES:
-        if t.get("id") == task_id:
-            return t
-    return None
+    """Najde task template podle id (původní dict z AGENT_TASK_TEMPLATES)."""
+    quest = TASK_TEMPLATE_REGISTRY.get(task_id)
+    return quest.raw if quest else None
 
 
-def resolve_placeholders_in_value(value: Any, placeholders: Dict[str, Any]) -> Any:
-    """
-    Pokud je value string a obsahuje {placeholder},
-    použije .format(**placeholders). Jinak vrátí původní hodnotu.
-    """
-    if isinstance(value, str) and "{" in value and "}" in value:
-        try:
-            return value.format(**placeholders)
-        except Exception:
-            # Když se nepodaří, necháme původní hodnotu (radši fail-safe)
-            return value
-    return value
+def get_quest_template(task_id: str) -> Optional[QuestTemplate]:
+    """Najde předkompilovanou šablonu podle id."""
+    return TASK_TEMPLATE_REGISTRY.get(task_id)
 
 
 def extract_total_xp_from_reward(reward_text: str) -> int:
@@ -72,6 +71,7 @@ def extract_total_xp_from_reward(reward_text: str) -> int:
 # -------------------------------------------------------------------
 
 
+@profiled
 def assign_task(
     agent: Agent,
     task_id: str,
@@ -105,13 +105,15 @@ def assign_task(
             agent_region_code=region_code,
             agent_city=agent.current_city,
             hq_city=agent.hq_city,
-            rng=rng or random,
+            rng=rng,
+            agent_id=agent.id,
         )
         placeholders = resolved_placeholders
 
     if isinstance(placeholders, dict) and placeholders.get("hq_city") and not agent.hq_city_id:
         hq_name = placeholders.get("hq_city")
-        hq_city = City.query.filter(City.name.ilike(str(hq_name))).first()
+        catalog_city = city_catalog().by_lower_name.get(str(hq_name).lower())
+        hq_city = db.session.get(City, catalog_city.id) if catalog_city else None
         if hq_city:
             agent.hq_city_id = hq_city.id
             agent.hq_city = hq_city
@@ -179,10 +181,11 @@ def process_trigger(
     if not active:
         return {"processed": False, "reason": "no_active_task"}
 
-    template = get_task_template(active.task_id)
-    if not template:
+    quest = get_quest_template(active.task_id)
+    if not quest:
         return {"processed": False, "reason": "template_not_found"}
 
+    template = quest.raw
     objectives = template.get("objectives", [])
     triggers = template.get("objective_triggers", [])
 
@@ -201,21 +204,19 @@ def process_trigger(
             "task_completed": True,
         }
 
-    expected_trigger = triggers[current_step]
+    placeholders = active.objective_state.get("placeholders", {})
+    expected_trigger = quest.triggers[current_step].render(placeholders, strict=True)
     expected_type = expected_trigger.get("type")
 
     if expected_type != trigger_type:
         # jiný typ triggeru, než čeká aktuální krok
         return {"processed": False, "reason": "wrong_trigger_type"}
 
-    placeholders = active.objective_state.get("placeholders", {})
-
     # porovnání ostatních parametrů (city_name, item, npc, module, ...)
-    for key, expected_value in expected_trigger.items():
+    for key, resolved_expected in expected_trigger.items():
         if key == "type":
             continue
 
-        resolved_expected = resolve_placeholders_in_value(expected_value, placeholders)
         actual = trigger_data.get(key)
 
         # Pokud expected není None a máme actual, musí se rovnat
@@ -263,12 +264,14 @@ def process_trigger(
 
 def serialize_active_task(active_task: ActiveTask) -> Optional[Dict[str, Any]]:
     """Převede ActiveTask + šablonu na payload pro FE."""
-    template = get_task_template(active_task.task_id)
-    if not template:
+    quest = get_quest_template(active_task.task_id)
+    if not quest:
         return None
 
+    template = quest.raw
     placeholders = active_task.objective_state.get("placeholders", {}) if active_task.objective_state else {}
-    resolved = build_template_from_placeholders(template, placeholders)
+    # vykreslený text se pro přidělený úkol nemění – bere se z LRU, mění se jen stav níže
+    resolved = rendered_task_fragment(quest, placeholders)
 
     objectives = resolved.get("objectives") or template.get("objectives") or []
     completed_flags = list((active_task.objective_state or {}).get("completed") or [])
@@ -332,15 +335,11 @@ def complete_objective_step(agent: Agent, task_id: str, objective_index: int) ->
         except (TypeError, ValueError):
             money_awarded = 0
     if money_awarded:
-        inventory = Agent.normalize_inventory(agent.inventory)
-        inventory["money"] = (inventory.get("money") or 0) + money_awarded
-        agent.inventory = inventory
+        agent.add_to_inventory("money", money_awarded)
 
     if isinstance(trigger, dict) and trigger.get("type") == "buy_item" and trigger.get("item") == "energy_generator":
-        inventory = Agent.normalize_inventory(agent.inventory)
-        inventory["money"] = max(0, (inventory.get("money") or 0) - 500)
-        inventory["energy_generator"] = max(1, inventory.get("energy_generator") or 0)
-        agent.inventory = inventory
+        agent.take_from_inventory("money", 500, partial=True)
+        agent.ensure_inventory_at_least("energy_generator", 1)
 
     db.session.commit()
 
@@ -355,7 +354,13 @@ def _active_tasks_for_agent(agent: Agent) -> List[ActiveTask]:
     return ActiveTask.query.filter_by(agent_id=agent.id).order_by(ActiveTask.created_at.asc()).all()
 
 
-def ensure_task_pipeline(agent: Agent) -> List[ActiveTask]:
+@profiled
+def advance_task_pipeline(agent: Agent) -> List[ActiveTask]:
+    """
+    Posune pipeline: nemá-li agent žádný rozpracovaný ani nevyzvednutý úkol,
+    přidělí mu další šablonu v pořadí (zápis + commit). Volá se po událostech,
+    které pipeline mění, nikdy z GET endpointů.
+    """
     tasks = _active_tasks_for_agent(agent)
     has_pending = any(
         task.status == "active"
@@ -366,8 +371,8 @@ def ensure_task_pipeline(agent: Agent) -> List[ActiveTask]:
         return tasks
 
     existing_ids = {task.task_id for task in tasks}
-    for template in AGENT_TASK_TEMPLATES:
-        task_id = template.get("id")
+    for quest in TASK_TEMPLATE_REGISTRY:
+        task_id = quest.id
         if task_id not in existing_ids:
             assign_task(agent, task_id)
             break
@@ -380,15 +385,21 @@ def reset_task_pipeline(agent: Agent) -> List[ActiveTask]:
     Smaže všechny aktivní/ukončené úkoly agenta a vytvoří nové podle pipeline.
     Využije současnou pozici agenta (např. po restartu hry) pro nové placeholdery.
     """
-    existing = ActiveTask.query.filter_by(agent_id=agent.id).all()
-    for task in existing:
-        db.session.delete(task)
+    ActiveTask.query.filter_by(agent_id=agent.id).delete(synchronize_session=False)
     db.session.commit()
-    return ensure_task_pipeline(agent)
+    return advance_task_pipeline(agent)
+
+
+def list_agent_tasks(agent: Agent) -> List[ActiveTask]:
+    """Všechny úkoly agenta v pořadí přidělení – jeden dotaz, dá se sdílet mezi výpisy."""
+    return _active_tasks_for_agent(agent)
 
 
-def list_task_payloads(agent: Agent) -> List[Dict[str, Any]]:
-    tasks = ensure_task_pipeline(agent)
+@profiled
+def list_task_payloads(agent: Agent, tasks: Optional[List[ActiveTask]] = None) -> List[Dict[str, Any]]:
+    """Payloady rozpracovaných a nevyzvednutých úkolů (jen čtení); `tasks` = už načtené úkoly."""
+    if tasks is None:
+        tasks = _active_tasks_for_agent(agent)
     payloads: List[Dict[str, Any]] = []
     for active in tasks:
         if active.status == "completed" and active.reward_claimed:
@@ -485,28 +496,20 @@ def _normalize_completed_flags(active_task: ActiveTask, template: Dict[str, Any]
     return completed_flags
 
 
-def _format_story_value(value: Any, placeholders: Dict[str, Any]) -> Any:
-    if isinstance(value, dict):
-        return {key: _format_story_value(val, placeholders) for key, val in value.items()}
-    if isinstance(value, list):
-        return [_format_story_value(item, placeholders) for item in value]
-    return resolve_placeholders_in_value(value, placeholders)
-
-
 def _build_story_dialogs_for_task(
     agent: Agent | None,
     active_task: ActiveTask,
-    template: Dict[str, Any],
+    quest: QuestTemplate,
 ) -> List[Dict[str, Any]]:
-    story_entries = template.get("story_dialogs") or []
+    story_entries = quest.raw.get("story_dialogs") or []
     if not story_entries:
         return []
 
     placeholders = (active_task.objective_state or {}).get("placeholders") or {}
-    completed_flags = _normalize_completed_flags(active_task, template)
+    completed_flags = _normalize_completed_flags(active_task, quest.raw)
 
     dialogs: List[Dict[str, Any]] = []
-    for entry in story_entries:
+    for entry, compiled_entry in zip(story_entries, quest.story_dialogs):
         panel = entry.get("panel")
         if not panel:
             continue
@@ -543,29 +546,52 @@ def _build_story_dialogs_for_task(
             "objective_index": objective_index,
         }
 
+        rendered = compiled_entry.render(placeholders, strict=True)
         for key in ("cache_key", "title", "body", "confirm_label", "button_label"):
             if key in entry:
-                payload[key] = _format_story_value(entry[key], placeholders)
+                payload[key] = rendered[key]
 
-        character_data = entry.get("character")
-        if character_data:
-            payload["character"] = _format_story_value(character_data, placeholders)
+        if entry.get("character"):
+            payload["character"] = rendered["character"]
 
         dialogs.append(payload)
 
     return dialogs
 
 
-def get_pending_story_dialogs(agent: Agent | None) -> List[Dict[str, Any]]:
+@profiled
+def get_pending_story_dialogs(agent: Agent | None, tasks: Optional[List[ActiveTask]] = None) -> List[Dict[str, Any]]:
     """Vrátí seznam dialogů, které má FE zobrazit (např. brífing v laboratoři)."""
     if not agent:
         return []
+    if tasks is None:
+        tasks = _active_tasks_for_agent(agent)
 
     dialogs: List[Dict[str, Any]] = []
-    for active in ensure_task_pipeline(agent):
-        template = get_task_template(active.task_id)
-        if not template:
+    for active in tasks:
+        quest = get_quest_template(active.task_id)
+        if not quest:
             continue
-        dialogs.extend(_build_story_dialogs_for_task(agent, active, template))
+        dialogs.extend(_build_story_dialogs_for_task(agent, active, quest))
 
     return dialogs
+
+
+def register_task_commands(app: Flask) -> None:
+    tasks_cli = AppGroup("tasks", help="Quest pipeline maintenance.")
+
+    @tasks_cli.command("advance")
+    @click.option("--agent-id", type=int, default=None, help="Only this agent (default: all agents).")
+    def advance(agent_id: Optional[int]):
+        """Assign the next task to agents with nothing in progress (e.g. agents created before event-driven assignment)."""
+        query = Agent.query.order_by(Agent.id)
+        if agent_id is not None:
+            query = query.filter(Agent.id == agent_id)
+        advanced = 0
+        for agent in query.all():
+            before = len(_active_tasks_for_agent(agent))
+            if len(advance_task_pipeline(agent)) > before:
+                advanced += 1
+        click.echo(f"✅ Assigned a new task to {advanced} agents.")
+
+    app.cli.add_command(tasks_cli)
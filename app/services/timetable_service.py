@@ -5,6 +5,7 @@ from typing import List, Dict, Any, Optional
 
 from app.models.city import City
 from app.models.train_line import TrainLine
+from app.profiler import profiled
 
 EARTH_RADIUS_MI = 3958.8
 # 1.18 (realismus) * 1.20 (neletíš vzdušnou čarou) = 1.416
@@ -25,28 +26,38 @@ def _haversine_miles(lat1: float, lon1: float, lat2: float, lon2: float) -> floa
     c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
     return EARTH_RADIUS_MI * c
 
-def compute_line_distance_miles(line: TrainLine) -> float:
+def compute_city_distance_miles(
+    from_city: Optional[City],
+    to_city: Optional[City],
+    distance_units: Optional[float] = None,
+) -> float:
     """
-    Vrátí vzdálenost trasy v mílích. Primárně používá GPS (lat/lon),
+    Vrátí vzdálenost mezi dvěma městy trasy v mílích. Primárně používá GPS (lat/lon),
     fallback na uložené distance_units nebo px/py, pokud chybí souřadnice.
     """
-    if line and line.from_city and line.to_city:
-        fa, fb = line.from_city, line.to_city
+    if from_city and to_city:
+        fa, fb = from_city, to_city
         if (
             fa.lat is not None and fa.lon is not None
             and fb.lat is not None and fb.lon is not None
         ):
             return _haversine_miles(fa.lat, fa.lon, fb.lat, fb.lon) * DISTANCE_SCALE
 
-    if line and line.distance_units:
-        return line.distance_units * DISTANCE_SCALE
+    if distance_units:
+        return distance_units * DISTANCE_SCALE
 
-    if line and line.from_city and line.to_city:
+    if from_city and to_city:
         # fallback na obrazovkové vzdálenosti (užitečné jen pro debug)
-        return TrainLine.compute_distance(line.from_city, line.to_city) * DISTANCE_SCALE
+        return TrainLine.compute_distance(from_city, to_city) * DISTANCE_SCALE
 
     return 0.0
 
+def compute_line_distance_miles(line: TrainLine) -> float:
+    """Vrátí vzdálenost trasy v mílích (viz compute_city_distance_miles)."""
+    if not line:
+        return 0.0
+    return compute_city_distance_miles(line.from_city, line.to_city, line.distance_units)
+
 # První odjezdy dne začínají hned po půlnoci, ne až v 8:00
 START_BASE_MINUTES = 0
 
@@ -58,78 +69,73 @@ def get_spacing_for_importance(importance: int) -> int:
         return 5   # střední
     return 10      # méně vlaků (typicky importance 3)
 
+MINUTES_PER_DAY = 24 * 60
+
+def spread_offset(idx: int, freq: int, total: int) -> int:
+    """
+    Vrátí offset v rámci intervalu [0, freq), který rovnoměrně rozprostře linky.
+    """
+    if total <= 1:
+        return 0
+    # rozprostření mezi 0 a freq (exkluzivně)
+    return int(round((idx + 1) * freq / (total + 1)))
+
+def next_departure_minutes(current_minutes: int, offset: int, freq: int) -> int:
+    """
+    První odjezd linky >= current_minutes (absolutní herní minuty).
+    Linka jezdí každých `freq` minut, první vlak dne vyjíždí v START_BASE_MINUTES + offset.
+    """
+    # Budeme řešit rozestupy v rámci jednoho dne – mod 24h
+    day_minutes = current_minutes % MINUTES_PER_DAY
+    day_start_minutes = current_minutes - day_minutes  # absolutní začátek dne
+
+    first_departure = START_BASE_MINUTES + offset  # např. 0:02, 0:05...
+
+    # spočítáme první odjezd >= aktuální čas
+    if day_minutes <= first_departure:
+        next_dep = first_departure
+    else:
+        k = math.ceil((day_minutes - first_departure) / freq)
+        next_dep = first_departure + k * freq
+
+    # převod na absolutní čas v minutách od startu hry
+    return day_start_minutes + next_dep
+
+@profiled
 def compute_next_departures(city: City, current_minutes: int, limit: int = 5) -> List[Dict[str, Any]]:
     """
     Vrátí seznam nejbližších odjezdů vlaků z daného města.
 
     current_minutes = herní čas v minutách (klidně od startu hry, my si to převedeme).
+    city může být ORM City i NetworkCity ze sítě v paměti – čte se jen id.
     Vrací pole dictů s klíči:
-      departure_minutes, from_city, to_city, line
+      departure_minutes, from_city, to_city, line, travel_minutes, distance_units
+    (to_city je NetworkCity, line je NetworkLine – bez dalších SQL dotazů)
     """
     if city is None:
         return []
 
-    # Budeme řešit rozestupy v rámci jednoho dne – mod 24h
-    MINUTES_PER_DAY = 24 * 60
-    day_minutes = current_minutes % MINUTES_PER_DAY
-    day_start_minutes = current_minutes - day_minutes  # absolutní začátek dne (Po 8:00 = 480)
+    # síť importujeme až tady – rail_network_service staví na funkcích z tohoto modulu
+    from app.services.rail_network_service import get_rail_network
 
-    importance = city.importance or 3
-    spacing = get_spacing_for_importance(importance)
+    network = get_rail_network()
 
-    # všechny aktivní linky z daného města (obě směry)
-    from_lines = (
-        TrainLine.query
-        .filter_by(from_city_id=city.id, is_active=True)
-        .order_by(TrainLine.id)
-        .all()
-    )
-    to_lines = (
-        TrainLine.query
-        .filter_by(to_city_id=city.id, is_active=True)
-        .order_by(TrainLine.id)
-        .all()
-    )
+    # všechny aktivní linky z daného města (obě směry) – nejdřív odjezdy
+    # po směru linky (from → to), pak protisměr (to → from); offsety
+    # rozprostření jsou předpočítané v síti
+    adjacency = network.neighbors(city.id)
 
     candidates = []
     used_departure_minutes = set()
 
-    def spread_offset(idx: int, freq: int, total: int) -> int:
-        """
-        Vrátí offset v rámci intervalu [0, freq), který rovnoměrně rozprostře linky.
-        """
-        if total <= 1:
-            return 0
-        # rozprostření mezi 0 a freq (exkluzivně)
-        return int(round((idx + 1) * freq / (total + 1)))
+    for idx in range(len(adjacency)):
+        freq = adjacency.frequencies[idx]
+        next_dep_abs = next_departure_minutes(current_minutes, adjacency.offsets[idx], freq)
 
-    total_lines = len(from_lines) + len(to_lines)
-
-    # FROM → TO
-    for idx, line in enumerate(from_lines):
-        freq = line.frequency_minutes or 60
-        distance_miles = compute_line_distance_miles(line)
-        offset = spread_offset(idx, freq, total_lines)
-
-        first_departure = START_BASE_MINUTES + offset  # např. 8:02, 8:05...
-
-        # spočítáme první odjezd >= aktuální čas
-        if day_minutes <= first_departure:
-            next_dep = first_departure
-        else:
-            k = math.ceil((day_minutes - first_departure) / freq)
-            next_dep = first_departure + k * freq
-
-        # převod na absolutní čas v minutách od startu hry
-        next_dep_abs = day_start_minutes + next_dep
-
-        # spočítáme délku cestování pro trasu
-        travel_minutes = compute_travel_minutes(
-            line,
-            imp_a=line.from_city.importance,
-            imp_b=line.to_city.importance,
-            distance_miles=distance_miles,
-        )
+        to_city = network.city(adjacency.neighbor_ids[idx])
+        line = network.lines_by_id[adjacency.line_ids[idx]]
+        travel_minutes = adjacency.travel_minutes[idx]
+        distance_miles = adjacency.distances[idx]
 
         # vygenerujeme pár dalších odjezdů této linky
         for i in range(5):
@@ -140,43 +146,7 @@ def compute_next_departures(city: City, current_minutes: int, limit: int = 5) ->
             candidates.append({
                 "departure_minutes": dep_time,
                 "from_city": city,
-                "to_city": line.to_city,
-                "line": line,
-                "travel_minutes": travel_minutes,
-                "distance_units": distance_miles,
-            })
-
-    # TO → FROM (vlak z "to_city" směrem zpět do current city)
-    for idx, line in enumerate(to_lines):
-        freq = line.frequency_minutes or 60
-        distance_miles = compute_line_distance_miles(line)
-        offset = spread_offset(len(from_lines) + idx, freq, total_lines)
-        first_departure = START_BASE_MINUTES + offset
-
-        if day_minutes <= first_departure:
-            next_dep = first_departure
-        else:
-            k = math.ceil((day_minutes - first_departure) / freq)
-            next_dep = first_departure + k * freq
-
-        next_dep_abs = day_start_minutes + next_dep
-
-        travel_minutes = compute_travel_minutes(
-            line,
-            imp_a=line.from_city.importance,
-            imp_b=line.to_city.importance,
-            distance_miles=distance_miles,
-        )
-
-        for i in range(5):
-            dep_time = next_dep_abs + i * freq
-            while dep_time in used_departure_minutes:
-                dep_time += 5
-            used_departure_minutes.add(dep_time)
-            candidates.append({
-                "departure_minutes": dep_time,
-                "from_city": city,
-                "to_city": line.from_city,
+                "to_city": to_city,
                 "line": line,
                 "travel_minutes": travel_minutes,
                 "distance_units": distance_miles,
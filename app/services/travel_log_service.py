@@ -0,0 +1,149 @@
+# services/travel_log_service.py
+#
+# Čtení travel logu agenta:
+# - keyset (cursor) stránkování podle (created_at, id) – žádný OFFSET, stránka
+#   hluboko v historii stojí stejně jako první
+# - filtry game_week / game_day_index / město (odkud nebo kam)
+# - projekce jen potřebných sloupců bez hydratace ORM objektů
+# - NDJSON export celé historie po stránkách (stream)
+
+from __future__ import annotations
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import String, select, tuple_, type_coerce
+
+from app.extensions import db
+from app.models.agent_travel_log import AgentTravelLog
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 200
+EXPORT_PAGE_SIZE = 1000
+
+# stejné klíče a pořadí jako AgentTravelLog.serialize()
+PAYLOAD_COLUMNS = (
+    AgentTravelLog.id,
+    AgentTravelLog.agent_id,
+    AgentTravelLog.from_city_id,
+    AgentTravelLog.to_city_id,
+    AgentTravelLog.action,
+    AgentTravelLog.game_minutes,
+    AgentTravelLog.game_week,
+    AgentTravelLog.game_day_index,
+    AgentTravelLog.game_day_label,
+    AgentTravelLog.game_time_label,
+    AgentTravelLog.recorded_at,
+    AgentTravelLog.created_at,
+)
+
+
+class InvalidCursor(ValueError):
+    """Cursor z requestu nejde dekódovat."""
+
+
+def _is_sqlite() -> bool:
+    return db.session.get_bind().dialect.name == "sqlite"
+
+
+def _created_key():
+    """
+    Sloupec created_at pro porovnání s cursorem.
+
+    SQLite ukládá server_default CURRENT_TIMESTAMP bez mikrosekund, ale DateTime
+    parametr váže s nimi – stejný okamžik by se pak textově nerovnal. Na SQLite
+    se proto klíč čte i porovnává jako surový uložený text (tím se i řadí).
+    """
+    if _is_sqlite():
+        return type_coerce(AgentTravelLog.created_at, String)
+    return AgentTravelLog.created_at
+
+
+def encode_cursor(created_key: Any, log_id: int) -> str:
+    if isinstance(created_key, datetime):
+        created_key = created_key.isoformat()
+    raw = json.dumps([created_key, log_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_key, log_id = json.loads(raw)
+        if not isinstance(created_key, str) or not isinstance(log_id, int):
+            raise ValueError(cursor)
+        if not _is_sqlite():
+            created_key = datetime.fromisoformat(created_key)
+    except (ValueError, TypeError) as exc:
+        raise InvalidCursor(cursor) from exc
+    return created_key, log_id
+
+
+def _row_payload(row) -> Dict[str, Any]:
+    payload = dict(row._mapping)
+    payload.pop("created_key", None)
+    for key in ("recorded_at", "created_at"):
+        value = payload[key]
+        payload[key] = value.isoformat() if value else None
+    return payload
+
+
+def fetch_travel_log_page(
+    agent_id: int,
+    *,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    game_week: Optional[int] = None,
+    game_day_index: Optional[int] = None,
+    city_id: Optional[int] = None,
+    newest_first: bool = True,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Jedna stránka logu agenta a cursor další stránky (None = konec).
+    Vyhodí InvalidCursor, pokud cursor nejde dekódovat.
+    """
+    created_key = _created_key()
+    key = tuple_(created_key, AgentTravelLog.id)
+    statement = select(*PAYLOAD_COLUMNS, created_key.label("created_key")).where(AgentTravelLog.agent_id == agent_id)
+
+    if cursor:
+        after = tuple_(*decode_cursor(cursor))
+        statement = statement.where(key < after if newest_first else key > after)
+    if game_week is not None:
+        statement = statement.where(AgentTravelLog.game_week == game_week)
+    if game_day_index is not None:
+        statement = statement.where(AgentTravelLog.game_day_index == game_day_index)
+    if city_id is not None:
+        statement = statement.where(
+            (AgentTravelLog.from_city_id == city_id) | (AgentTravelLog.to_city_id == city_id)
+        )
+
+    if newest_first:
+        statement = statement.order_by(created_key.desc(), AgentTravelLog.id.desc())
+    else:
+        statement = statement.order_by(created_key.asc(), AgentTravelLog.id.asc())
+
+    # o řádek víc – pozná se tím, jestli existuje další stránka
+    rows = db.session.execute(statement.limit(limit + 1)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_key, rows[-1].id)
+    return [_row_payload(row) for row in rows], next_cursor
+
+
+def iter_travel_log_ndjson(agent_id: int, **filters: Any) -> Iterator[str]:
+    """Celá historie agenta (od nejstarších) jako NDJSON, načítaná po stránkách."""
+    dumps = current_app.json.dumps
+    cursor = None
+    while True:
+        logs, cursor = fetch_travel_log_page(
+            agent_id, limit=EXPORT_PAGE_SIZE, cursor=cursor, newest_first=False, **filters
+        )
+        if logs:
+            yield "".join(dumps(log, separators=(",", ":")) + "\n" for log in logs)
+        if cursor is None:
+            return
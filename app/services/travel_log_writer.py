@@ -0,0 +1,254 @@
+# services/travel_log_writer.py
+#
+# Zápis travel logu mimo request:
+# - request jen připraví řádek a po commitu ho přidá do bufferu
+# - vlákno na pozadí buffer zapisuje hromadným INSERTem, jakmile má
+#   TRAVEL_LOG_BATCH_SIZE řádků nebo uplyne TRAVEL_LOG_FLUSH_INTERVAL
+# - se stejnou dávkou (v téže transakci) se přičtou souhrny travel_stats_service
+# - čtení logu volá flush_travel_log(), takže vidí i ještě nezapsané řádky
+# - při ukončení procesu (atexit) se buffer dopíše; když DB nejde, řádky se
+#   uloží do TRAVEL_LOG_SPILL_PATH (NDJSON) a po dalším startu se doplní
+# TRAVEL_LOG_ASYNC=0 = řádek se zapíše ve stejné transakci jako request.
+
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from flask import Flask, current_app
+from sqlalchemy import event, insert
+
+from app.extensions import db
+from app.models.agent_travel_log import AgentTravelLog
+from app.query_counter import uncounted
+from app.services.travel_stats_service import apply_travel_rollups
+
+EXTENSION_KEY = "travel_log_writer"
+DATETIME_FIELDS = ("created_at", "recorded_at")
+# po chybě zápisu se další pokus odkládá až na tuto dobu (s)
+MAX_RETRY_DELAY = 5.0
+
+logger = logging.getLogger(__name__)
+
+
+class TravelLogWriter:
+    """Buffer řádků agent_travel_log zapisovaný po dávkách vláknem na pozadí."""
+
+    def __init__(self, app: Flask, batch_size: int, flush_interval: float, spill_path: Optional[str]) -> None:
+        self.app = app
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spill_path = spill_path
+        self._pending: List[Dict[str, Any]] = []
+        self._cond = threading.Condition()
+        # zapisuje vždy jen jeden (vlákno na pozadí nebo flush z requestu)
+        self._write_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self._atexit_registered = False
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def append(self, row: Dict[str, Any]) -> None:
+        with self._cond:
+            self._pending.append(row)
+            closed = self._closed
+            if not closed:
+                self._ensure_thread()
+                if len(self._pending) >= self.batch_size:
+                    self._cond.notify()
+        if closed:
+            # po close() už vlákno neběží – zapsat hned
+            self.flush()
+
+    def flush(self) -> int:
+        """Synchronně zapíše všechno z bufferu; vrací počet zapsaných řádků."""
+        with self._write_lock:
+            with self._cond:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+            try:
+                self._write(batch)
+            except Exception:
+                with self._cond:
+                    self._pending[:0] = batch
+                raise
+            return len(batch)
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Zastaví vlákno a dopíše buffer; co nejde zapsat, skončí ve spill souboru."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("travel log: final flush failed, spilling %d rows", self.pending)
+            with self._cond:
+                batch, self._pending = self._pending, []
+            self._spill(batch)
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="travel-log-writer", daemon=True)
+        self._thread.start()
+        if not self._atexit_registered:
+            atexit.register(self.close)
+            self._atexit_registered = True
+
+    def _run(self) -> None:
+        self._replay_spill()
+        delay = self.flush_interval
+        while True:
+            with self._cond:
+                deadline = time.monotonic() + delay
+                while not self._closed and len(self._pending) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if self._closed:
+                    return
+            try:
+                self.flush()
+                delay = self.flush_interval
+            except Exception:
+                logger.exception("travel log: batch insert failed, %d rows kept for retry", self.pending)
+                delay = min(max(delay * 2, self.flush_interval), MAX_RETRY_DELAY)
+
+    def _write(self, batch: List[Dict[str, Any]]) -> None:
+        # dávka patří bufferu, ne requestu, který zrovna volá flush – nepočítat mu ji do rozpočtu
+        with self.app.app_context(), uncounted():
+            try:
+                db.session.execute(insert(AgentTravelLog), batch)
+                apply_travel_rollups(batch)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            finally:
+                db.session.remove()
+
+    def _spill(self, batch: List[Dict[str, Any]]) -> None:
+        if not batch:
+            return
+        if not self.spill_path:
+            logger.error("travel log: %d rows lost (no TRAVEL_LOG_SPILL_PATH)", len(batch))
+            return
+        with open(self.spill_path, "a", encoding="utf-8") as fh:
+            for row in batch:
+                encoded = {
+                    key: value.isoformat() if key in DATETIME_FIELDS and value else value
+                    for key, value in row.items()
+                }
+                fh.write(json.dumps(encoded) + "\n")
+
+    def _replay_spill(self) -> None:
+        if not self.spill_path or not os.path.exists(self.spill_path):
+            return
+        replaying = f"{self.spill_path}.{os.getpid()}.replay"
+        try:
+            os.replace(self.spill_path, replaying)
+        except FileNotFoundError:
+            return  # jiný worker byl rychlejší
+        with open(replaying, encoding="utf-8") as fh:
+            rows = [json.loads(line) for line in fh if line.strip()]
+        for row in rows:
+            for key in DATETIME_FIELDS:
+                if row.get(key):
+                    row[key] = datetime.fromisoformat(row[key])
+        with self._cond:
+            self._pending[:0] = rows
+        os.remove(replaying)
+        logger.info("travel log: replaying %d spilled rows", len(rows))
+
+
+def build_travel_row(agent_id: int, from_city_id: Optional[int], to_city_id: int, clock: Dict[str, Any]) -> Dict[str, Any]:
+    """Řádek agent_travel_log; časy se nastaví hned, ne až při zápisu dávky."""
+    now = datetime.utcnow()
+    return {
+        "agent_id": agent_id,
+        "from_city_id": from_city_id,
+        "to_city_id": to_city_id,
+        "action": "travel",
+        "game_minutes": clock["minutes"],
+        "game_week": clock["week_index"],
+        "game_day_index": clock["day_index"],
+        "game_day_label": clock["day_label"],
+        "game_time_label": clock["time_label"],
+        "created_at": now,
+        "recorded_at": now,
+    }
+
+
+def travel_row_payload(row: Dict[str, Any], log_id: Optional[int] = None) -> Dict[str, Any]:
+    """Stejný tvar jako AgentTravelLog.serialize(); id je None, dokud řádek čeká v bufferu."""
+    payload = {"id": log_id, **row}
+    for key in DATETIME_FIELDS:
+        payload[key] = row[key].isoformat() if row[key] else None
+    return payload
+
+
+def get_travel_log_writer() -> Optional[TravelLogWriter]:
+    return current_app.extensions.get(EXTENSION_KEY)
+
+
+def record_travel(row: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Zapíše řádek travel logu k aktuální transakci requestu a vrátí jeho payload.
+
+    Asynchronně se řádek dostane do bufferu až po úspěšném commitu (rollback
+    ho zahodí); synchronně se přidá do session a flush mu přidělí id.
+    """
+    writer = get_travel_log_writer()
+    if writer is None:
+        log = AgentTravelLog(**row)
+        db.session.add(log)
+        db.session.flush()
+        apply_travel_rollups([row])
+        return travel_row_payload(row, log.id)
+
+    pending = [row]
+
+    def _on_commit(session) -> None:
+        if pending:
+            writer.append(pending.pop())
+
+    def _on_rollback(session) -> None:
+        pending.clear()
+
+    session = db.session()
+    event.listen(session, "after_commit", _on_commit, once=True)
+    event.listen(session, "after_rollback", _on_rollback, once=True)
+    return travel_row_payload(row)
+
+
+def flush_travel_log() -> None:
+    """Dopíše buffer – před čtením logu, aby request viděl vlastní zápisy."""
+    writer = get_travel_log_writer()
+    if writer is not None and writer.pending:
+        writer.flush()
+
+
+def init_travel_log_writer(app: Flask) -> None:
+    """Zapne asynchronní zápis travel logu, pokud to povoluje TRAVEL_LOG_ASYNC."""
+    if not app.config.get("TRAVEL_LOG_ASYNC"):
+        return
+    app.extensions[EXTENSION_KEY] = TravelLogWriter(
+        app,
+        batch_size=app.config.get("TRAVEL_LOG_BATCH_SIZE", 200),
+        flush_interval=app.config.get("TRAVEL_LOG_FLUSH_INTERVAL", 0.5),
+        spill_path=app.config.get("TRAVEL_LOG_SPILL_PATH"),
+    )
@@ -0,0 +1,160 @@
+# services/travel_stats_service.py
+#
+# Souhrny travel logu (models/travel_stats.py):
+# - apply_travel_rollups() přičte dávku řádků logu – volá se ve stejné
+#   transakci jako zápis logu (travel_log_writer), takže souhrn s logem nerozjede
+# - jedna dávka = jeden upsert na tabulku (INSERT … ON CONFLICT DO UPDATE,
+#   SQLite i PostgreSQL), řádky se nejdřív sečtou v Pythonu
+# - get_agent_stats() čte jen souhrny: top N podle indexu, žádný scan logu
+# - clear_travel_rollups() je smaže při resetu agenta (total_trips = 0)
+
+from __future__ import annotations
+
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Sequence
+
+from sqlalchemy import case, delete, func, select
+from sqlalchemy.orm import aliased
+
+from app.database import dialect_insert
+from app.extensions import db
+from app.models.agent import Agent
+from app.models.city import City
+from app.models.travel_stats import AgentCityVisit, AgentLineUsage, AgentWeekActivity
+
+TOP_LIMIT = 10
+WEEKS_LIMIT = 12
+
+
+def _upsert(model, rows: List[Dict[str, Any]], keys: Sequence[str], add: Sequence[str], greatest: Sequence[str] = ()) -> None:
+    """Vloží řádky; u existujícího klíče přičte sloupce `add` a u `greatest` nechá větší hodnotu."""
+    if not rows:
+        return
+    table = model.__table__
+    statement = dialect_insert()(table)
+    excluded = statement.excluded
+    updates = {column: table.c[column] + excluded[column] for column in add}
+    for column in greatest:
+        current = table.c[column]
+        updates[column] = case(
+            (current.is_(None), excluded[column]),
+            (excluded[column] > current, excluded[column]),
+            else_=current,
+        )
+    db.session.execute(statement.on_conflict_do_update(index_elements=list(keys), set_=updates), rows)
+
+
+def apply_travel_rollups(rows: Iterable[Dict[str, Any]]) -> None:
+    """Přičte řádky agent_travel_log (dicty jako z build_travel_row) do souhrnných tabulek."""
+    visits: Counter = Counter()
+    last_visit: Dict[tuple, datetime] = {}
+    lines: Counter = Counter()
+    weeks: Counter = Counter()
+    last_minutes: Dict[tuple, int] = {}
+
+    for row in rows:
+        agent_id = row["agent_id"]
+        city_key = (agent_id, row["to_city_id"])
+        visits[city_key] += 1
+        created_at = row.get("created_at")
+        if created_at and (city_key not in last_visit or created_at > last_visit[city_key]):
+            last_visit[city_key] = created_at
+
+        from_city_id = row.get("from_city_id")
+        if from_city_id is not None and from_city_id != row["to_city_id"]:
+            a, b = sorted((from_city_id, row["to_city_id"]))
+            lines[(agent_id, a, b)] += 1
+
+        week_key = (agent_id, row["game_week"])
+        weeks[week_key] += 1
+        last_minutes[week_key] = max(last_minutes.get(week_key, row["game_minutes"]), row["game_minutes"])
+
+    _upsert(
+        AgentCityVisit,
+        [
+            {"agent_id": agent_id, "city_id": city_id, "visits": count, "last_visited_at": last_visit.get((agent_id, city_id))}
+            for (agent_id, city_id), count in visits.items()
+        ],
+        keys=("agent_id", "city_id"),
+        add=("visits",),
+        greatest=("last_visited_at",),
+    )
+    _upsert(
+        AgentLineUsage,
+        [
+            {"agent_id": agent_id, "city_a_id": a, "city_b_id": b, "trips": count}
+            for (agent_id, a, b), count in lines.items()
+        ],
+        keys=("agent_id", "city_a_id", "city_b_id"),
+        add=("trips",),
+    )
+    _upsert(
+        AgentWeekActivity,
+        [
+            {"agent_id": agent_id, "game_week": week, "trips": count, "last_game_minutes": last_minutes[(agent_id, week)]}
+            for (agent_id, week), count in weeks.items()
+        ],
+        keys=("agent_id", "game_week"),
+        add=("trips",),
+        greatest=("last_game_minutes",),
+    )
+
+
+def clear_travel_rollups(agent_id: int) -> None:
+    """Smaže souhrny agenta (nová hra po resetu); commit řeší volající."""
+    for model in (AgentCityVisit, AgentLineUsage, AgentWeekActivity):
+        db.session.execute(delete(model).where(model.agent_id == agent_id))
+
+
+def get_agent_stats(agent: Agent, top: int = TOP_LIMIT, weeks: int = WEEKS_LIMIT) -> Dict[str, Any]:
+    """Statistiky cest agenta ze souhrnů – nejnavštěvovanější města, spojení a poslední týdny."""
+    top_cities = db.session.execute(
+        select(AgentCityVisit.city_id, City.name, AgentCityVisit.visits, AgentCityVisit.last_visited_at)
+        .join(City, City.id == AgentCityVisit.city_id)
+        .where(AgentCityVisit.agent_id == agent.id)
+        .order_by(AgentCityVisit.visits.desc(), AgentCityVisit.city_id)
+        .limit(top)
+    ).all()
+    cities_visited = db.session.execute(
+        select(func.count()).select_from(AgentCityVisit).where(AgentCityVisit.agent_id == agent.id)
+    ).scalar_one()
+
+    city_a, city_b = aliased(City), aliased(City)
+    top_lines = db.session.execute(
+        select(AgentLineUsage.city_a_id, city_a.name, AgentLineUsage.city_b_id, city_b.name, AgentLineUsage.trips)
+        .join(city_a, city_a.id == AgentLineUsage.city_a_id)
+        .join(city_b, city_b.id == AgentLineUsage.city_b_id)
+        .where(AgentLineUsage.agent_id == agent.id)
+        .order_by(AgentLineUsage.trips.desc(), AgentLineUsage.city_a_id, AgentLineUsage.city_b_id)
+        .limit(top)
+    ).all()
+
+    recent_weeks = db.session.execute(
+        select(AgentWeekActivity.game_week, AgentWeekActivity.trips, AgentWeekActivity.last_game_minutes)
+        .where(AgentWeekActivity.agent_id == agent.id)
+        .order_by(AgentWeekActivity.game_week.desc())
+        .limit(weeks)
+    ).all()
+
+    return {
+        "total_trips": agent.total_trips or 0,
+        "cities_visited": cities_visited,
+        "top_cities": [
+            {
+                "city_id": city_id,
+                "city_name": name,
+                "visits": visits,
+                "last_visited_at": last_visited_at.isoformat() if last_visited_at else None,
+            }
+            for city_id, name, visits, last_visited_at in top_cities
+        ],
+        "top_lines": [
+            {"city_a_id": a_id, "city_a_name": a_name, "city_b_id": b_id, "city_b_name": b_name, "trips": trips}
+            for a_id, a_name, b_id, b_name, trips in top_lines
+        ],
+        "weeks": [
+            {"game_week": week, "trips": trips, "last_game_minutes": minutes}
+            for week, trips, minutes in recent_weeks
+        ],
+    }
@@ -286,12 +286,9 @@ export function createAgentService({ config, state, dom, time, ui }) {
     }
   }
 
-  async function loadAgentAndLevels() {
-    try {
-      const res = await fetch("/api/agent");
-      if (!res.ok) throw new Error("Failed to fetch agent");
-      const data = await res.json();
-
+  // data = { agent, levels } – z /api/agent nebo ze sekcí /api/dashboard
+  function applyAgentPayload(data) {
+    if (data) {
       if (Array.isArray(data.levels) && data.levels.length > 0) {
         agentState.levelConfig = normalizeLevelConfig(data.levels);
       } else if (!agentState.levelConfig || agentState.levelConfig.length === 0) {
@@ -314,13 +311,23 @@ export function createAgentService({ config, state, dom, time, ui }) {
         agentState.currentCityName = data.agent.current_city_name ?? null;
         agentState.serverKnownCityId = agentState.currentCityId;
       }
-    } catch (err) {
-      console.error("Agent load failed, using defaults:", err);
     }
 
     updateAgentHeader();
   }
 
+  async function loadAgentAndLevels() {
+    let data = null;
+    try {
+      const res = await fetch("/api/agent");
+      if (!res.ok) throw new Error("Failed to fetch agent");
+      data = await res.json();
+    } catch (err) {
+      console.error("Agent load failed, using defaults:", err);
+    }
+    applyAgentPayload(data);
+  }
+
   function persistAgentLocation(cityId) {
     if (!cityId || cityId === agentState.serverKnownCityId) {
       return;
@@ -396,6 +403,7 @@ export function createAgentService({ config, state, dom, time, ui }) {
     enqueueXpReward,
     flushPendingXpRewards,
     resetAgentState,
+    applyAgentPayload,
     loadAgentAndLevels,
     setAgentPositionToCity,
     persistAgentLocation,
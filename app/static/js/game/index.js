@@ -255,7 +255,7 @@ export function initGame() {
       await agent.resetAgentState();
     }
 
-    await agent.loadAgentAndLevels();
+    await tasks.loadDashboard();
     const restoredGameTime = time.loadPersistedGameMinutes();
     if (!restoredGameTime) {
       state.time.lastSavedGameMinutes = Math.max(0, Math.round(state.time.gameMinutes ?? 0));
@@ -356,6 +356,5 @@ export function initGame() {
 
   tasks.renderTaskCard();
   tasks.renderTaskDetailPanel();
-  tasks.loadAgentTasks();
   init();
 }
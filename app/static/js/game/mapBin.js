@@ -0,0 +1,79 @@
+// Dekodér /api/map.bin – rozložení viz app/services/map_binary_service.py.
+// Pole jsou pohledy přímo nad ArrayBufferem (bez kopírování a bez JSON.parse).
+
+const MAP_BIN_MAGIC = "AUSM";
+const MAP_BIN_VERSION = 1;
+
+export function decodeMapBin(buffer) {
+  const view = new DataView(buffer);
+  const magic = String.fromCharCode(
+    view.getUint8(0),
+    view.getUint8(1),
+    view.getUint8(2),
+    view.getUint8(3),
+  );
+  if (magic !== MAP_BIN_MAGIC) {
+    throw new Error("map.bin: neplatná hlavička");
+  }
+  const version = view.getUint16(4, true);
+  if (version !== MAP_BIN_VERSION) {
+    throw new Error(`map.bin: nepodporovaná verze ${version}`);
+  }
+
+  const headerSize = view.getUint16(6, true);
+  const cityCount = view.getUint32(8, true);
+  const lineCount = view.getUint32(12, true);
+  const regionCount = view.getUint32(16, true);
+  const lineTypeCount = view.getUint32(20, true);
+  const stringCount = view.getUint32(24, true);
+  const stringBytes = view.getUint32(28, true);
+
+  let pos = headerSize;
+  function take(ArrayType, count) {
+    const array = new ArrayType(buffer, pos, count);
+    pos += Math.ceil(array.byteLength / 4) * 4;
+    return array;
+  }
+
+  const cityIds = take(Int32Array, cityCount);
+  const px = take(Float32Array, cityCount);
+  const py = take(Float32Array, cityCount);
+  const lineCities = take(Uint32Array, lineCount * 2);
+  const lineDistance = take(Float32Array, lineCount);
+  const lineFrequency = take(Uint16Array, lineCount);
+  const cityRegion = take(Uint16Array, cityCount);
+  const importance = take(Uint8Array, cityCount);
+  const lineType = take(Uint8Array, lineCount);
+  const offsets = take(Uint32Array, stringCount + 1);
+  const bytes = new Uint8Array(buffer, pos, stringBytes);
+
+  const decoder = new TextDecoder();
+  const strings = new Array(stringCount);
+  for (let i = 0; i < stringCount; i++) {
+    strings[i] = decoder.decode(bytes.subarray(offsets[i], offsets[i + 1]));
+  }
+
+  return {
+    version,
+    cityIds,
+    px,
+    py,
+    importance,
+    cityRegion,
+    cityNames: strings.slice(0, cityCount),
+    regions: strings.slice(cityCount, cityCount + regionCount),
+    lineTypes: strings.slice(cityCount + regionCount, cityCount + regionCount + lineTypeCount),
+    lineCities,
+    lineDistance,
+    lineFrequency,
+    lineType,
+  };
+}
+
+export async function fetchMapBin(url = "/api/map.bin") {
+  const res = await fetch(url);
+  if (!res.ok) {
+    throw new Error(`map.bin: HTTP ${res.status}`);
+  }
+  return decodeMapBin(await res.arrayBuffer());
+}
@@ -5,6 +5,8 @@ const DEFAULT_LAB_STORY_CHARACTER = {
   alt: "Dr. Elias Rook",
 };
 
+const DASHBOARD_FIELDS = "agent,levels,tasks,story_dialogs";
+
 export function createTasksService({ state, dom, time, agent, map, ui }) {
   const taskState = state.tasks;
   const storyState = state.story;
@@ -165,10 +167,7 @@ export function createTasksService({ state, dom, time, agent, map, ui }) {
         if (xpAwarded) {
           agent.grantTravelXp(xpAwarded);
         }
-        await loadAgentTasks();
-        if (typeof agent?.loadAgentAndLevels === "function") {
-          await agent.loadAgentAndLevels();
-        }
+        await loadDashboard();
       }, 650);
     } catch (err) {
       console.error("Reward claim failed:", err);
@@ -212,17 +211,14 @@ export function createTasksService({ state, dom, time, agent, map, ui }) {
           agent.enqueueXpReward(data.xp_awarded);
           shouldReloadTasks = true;
         }
-    if (shouldReloadTasks) {
-      await loadAgentTasks();
-    } else {
-      renderTaskCard();
-      renderTaskDetailPanel();
-    }
-    if (typeof agent?.loadAgentAndLevels === "function") {
-      await agent.loadAgentAndLevels();
-    }
-        if (typeof agent?.loadAgentAndLevels === "function") {
-          await agent.loadAgentAndLevels();
+        if (shouldReloadTasks) {
+          await loadDashboard();
+        } else {
+          renderTaskCard();
+          renderTaskDetailPanel();
+          if (typeof agent?.loadAgentAndLevels === "function") {
+            await agent.loadAgentAndLevels();
+          }
         }
       } catch (err) {
         console.error("Objective completion failed:", err);
@@ -719,6 +715,10 @@ export function createTasksService({ state, dom, time, agent, map, ui }) {
     return storyState.dialogs.find((dialog) => dialog.panel === panel);
   }
 
+  function normalizeStoryDialogs(dialogs) {
+    return Array.isArray(dialogs) ? dialogs : [];
+  }
+
   async function loadStoryDialogs(force = false) {
     if (storyState.loading) return storyState.promise;
     if (!force && storyState.dialogs.length > 0) {
@@ -731,7 +731,7 @@ export function createTasksService({ state, dom, time, agent, map, ui }) {
         const res = await fetch("/api/tasks/story-dialogs");
         if (!res.ok) throw new Error("Failed to fetch story dialogs");
         const data = await res.json();
-        storyState.dialogs = Array.isArray(data?.dialogs) ? data.dialogs : [];
+        storyState.dialogs = normalizeStoryDialogs(data?.dialogs);
       } catch (err) {
         console.error("Story dialog load failed:", err);
         storyState.dialogs = [];
@@ -792,18 +792,8 @@ export function createTasksService({ state, dom, time, agent, map, ui }) {
     }
   }
 
-  async function loadAgentTasks() {
-    let tasks = [];
-    try {
-      const res = await fetch("/api/tasks");
-      if (!res.ok) throw new Error("Failed to fetch tasks");
-      const data = await res.json();
-      tasks = Array.isArray(data?.tasks) ? data.tasks : [];
-    } catch (err) {
-      console.error("Task load failed, using empty list:", err);
-    }
-
-    taskState.list = tasks.map((task) => normalizeTaskPayload(task)).filter(Boolean);
+  function applyTaskList(tasks) {
+    taskState.list = (Array.isArray(tasks) ? tasks : []).map((task) => normalizeTaskPayload(task)).filter(Boolean);
     if (!taskState.list.length) {
       taskState.activeTaskId = null;
     } else {
@@ -825,10 +815,64 @@ export function createTasksService({ state, dom, time, agent, map, ui }) {
     renderTaskCard();
     renderTaskDetailPanel();
     notifyTaskLocationChange();
+  }
+
+  async function loadAgentTasks() {
+    let tasks = [];
+    try {
+      const res = await fetch("/api/tasks");
+      if (!res.ok) throw new Error("Failed to fetch tasks");
+      const data = await res.json();
+      tasks = Array.isArray(data?.tasks) ? data.tasks : [];
+    } catch (err) {
+      console.error("Task load failed, using empty list:", err);
+    }
+
+    applyTaskList(tasks);
     await loadStoryDialogs(true);
     maybeShowPendingTaskCelebration();
   }
 
+  // agent, úkoly i dialogy jedním requestem (start hry, po splnění kroku / vyzvednutí odměny)
+  // bez tokenu / session (a bez režimu jednoho hráče) server agenta nevrátí –
+  // založí se nový a váže se na session cookie
+  async function createSessionAgent() {
+    const res = await fetch("/api/agents", {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: "{}",
+    });
+    if (!res.ok) throw new Error("Failed to create agent");
+  }
+
+  async function loadDashboard({ allowCreate = true } = {}) {
+    let data;
+    try {
+      const res = await fetch(`/api/dashboard?fields=${DASHBOARD_FIELDS}`);
+      if (!res.ok) throw new Error("Failed to fetch dashboard");
+      data = await res.json();
+      if (allowCreate && data?.agent && data.agent.id == null) {
+        await createSessionAgent();
+        return loadDashboard({ allowCreate: false });
+      }
+    } catch (err) {
+      console.error("Dashboard load failed, loading sections separately:", err);
+      await loadAgentTasks();
+      if (typeof agent?.loadAgentAndLevels === "function") {
+        await agent.loadAgentAndLevels();
+      }
+      return;
+    }
+
+    if (typeof agent?.applyAgentPayload === "function") {
+      agent.applyAgentPayload(data);
+    }
+    applyTaskList(data?.tasks);
+    storyState.dialogs = normalizeStoryDialogs(data?.story_dialogs);
+    renderStoryDialogs();
+    maybeShowPendingTaskCelebration();
+  }
+
   function initTaskEvents() {
     if (dom.labStoryConfirmEl) {
       dom.labStoryConfirmEl.addEventListener("click", (e) => {
@@ -926,6 +970,7 @@ export function createTasksService({ state, dom, time, agent, map, ui }) {
     notifyTaskLocationChange,
     maybeShowPendingTaskCelebration,
     loadAgentTasks,
+    loadDashboard,
     loadStoryDialogs,
     maybeShowStoryOverlay,
     completeTaskObjective,
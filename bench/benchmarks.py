@@ -0,0 +1,261 @@
+# bench/benchmarks.py
+#
+# Registr benchmarků a jejich měření:
+# - každý benchmark je továrna, která si připraví data (mimo měření)
+#   a vrátí funkci pro jednu iteraci
+# - mezi iteracemi se zahodí session, aby se ORM identity map nepřenášela
+#   z jednoho "requestu" do dalšího
+# - výsledek = p50/p95/p99/průměr v ms, propustnost (iterace/s) a SQL dotazy na iteraci
+
+from __future__ import annotations
+
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+from flask import Flask
+
+from app.domain.agent.task_config import AGENT_TASK_TEMPLATES, resolve_template_for_agent
+from app.domain.agent.task_registry import QuestTemplateRegistry
+from app.extensions import db
+from app.models.agent import Agent
+from app.models.city import City
+from app.query_counter import count_queries
+from app.services.agent_service import agent_query
+from app.services.lab_service import build_lab_overview
+from app.services.material_service import maybe_refresh_material_state, refresh_material_states
+from app.services.rail_network_service import get_rail_network
+from app.services.task_service import advance_task_pipeline, list_task_payloads
+from app.services.timetable_service import MINUTES_PER_DAY, compute_next_departures
+
+# kolik různých agentů / měst se v benchmarku střídá
+SAMPLE_SIZE = 50
+# velikost syntetického katalogu úkolů pro quest_templates
+QUEST_CATALOG_SIZE = 5000
+
+
+class BenchContext:
+    """Sdílený stav pro továrny benchmarků – aplikace a deterministický RNG."""
+
+    def __init__(self, app: Flask, seed: int = 0) -> None:
+        self.app = app
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.city_ids: List[int] = [row[0] for row in db.session.execute(db.select(City.id).order_by(City.id))]
+        self.agent_ids: List[int] = [row[0] for row in db.session.execute(db.select(Agent.id).order_by(Agent.id))]
+
+    def sample(self, ids: List[int], size: int = SAMPLE_SIZE) -> List[int]:
+        if not ids:
+            raise BenchmarkSkipped("no rows to benchmark against – run `flask bench generate-map` first")
+        return self.rng.sample(ids, min(size, len(ids)))
+
+
+class BenchmarkSkipped(Exception):
+    """Benchmark nejde v aktuální DB spustit (např. chybí agenti)."""
+
+
+BenchFactory = Callable[[BenchContext], Callable[[int], Any]]
+BENCHMARKS: Dict[str, BenchFactory] = {}
+
+
+def benchmark(name: str) -> Callable[[BenchFactory], BenchFactory]:
+    def decorator(factory: BenchFactory) -> BenchFactory:
+        BENCHMARKS[name] = factory
+        return factory
+
+    return decorator
+
+
+@benchmark("compute_next_departures")
+def _bench_next_departures(ctx: BenchContext):
+    network = get_rail_network()
+    cities = [network.city(city_id) for city_id in ctx.sample(ctx.city_ids, 1000)]
+    minutes = [ctx.rng.randrange(MINUTES_PER_DAY) for _ in range(1000)]
+
+    def run(i: int):
+        return compute_next_departures(cities[i % len(cities)], minutes[i % len(minutes)], limit=30)
+
+    return run
+
+
+def _endpoint(ctx: BenchContext, url: str):
+    client = ctx.app.test_client()
+
+    def run(i: int):
+        response = client.get(url)
+        if response.status_code != 200:
+            raise RuntimeError(f"{url} returned {response.status_code}")
+        return response
+
+    return run
+
+
+@benchmark("api_cities")
+def _bench_api_cities(ctx: BenchContext):
+    return _endpoint(ctx, "/api/cities")
+
+
+@benchmark("api_trainlines")
+def _bench_api_trainlines(ctx: BenchContext):
+    return _endpoint(ctx, "/api/trainlines")
+
+
+def _load_agent(agent_id: int) -> Agent:
+    # stejně jako endpointy – agent i s městy jedním dotazem
+    return agent_query().filter(Agent.id == agent_id).one()
+
+
+@benchmark("list_task_payloads")
+def _bench_task_payloads(ctx: BenchContext):
+    agent_ids = ctx.sample(ctx.agent_ids)
+    # syntetičtí agenti úkoly nemají – přidělení (zápis) do měření nepatří
+    for agent_id in agent_ids:
+        advance_task_pipeline(db.session.get(Agent, agent_id))
+    db.session.remove()
+
+    def run(i: int):
+        return list_task_payloads(_load_agent(agent_ids[i % len(agent_ids)]))
+
+    return run
+
+
+@benchmark("build_lab_overview")
+def _bench_lab_overview(ctx: BenchContext):
+    agent_ids = ctx.sample(ctx.agent_ids)
+
+    def run(i: int):
+        return build_lab_overview(_load_agent(agent_ids[i % len(agent_ids)]))
+
+    return run
+
+
+@benchmark("maybe_refresh_material_state")
+def _bench_material_refresh(ctx: BenchContext):
+    city_ids = ctx.sample(ctx.city_ids)
+    start = datetime.now()
+
+    def run(i: int):
+        # každá iterace je "další den", takže se stav vždy přepočítá;
+        # nic se necommituje – session se po iteraci zahodí
+        city = db.session.get(City, city_ids[i % len(city_ids)])
+        return maybe_refresh_material_state(city, now=start + timedelta(days=i + 1))
+
+    return run
+
+
+@benchmark("refresh_material_states")
+def _bench_material_refresh_all(ctx: BenchContext):
+    if not ctx.city_ids:
+        raise BenchmarkSkipped("no cities – run `flask bench generate-map` first")
+    start = datetime.now()
+
+    def run(i: int):
+        # denní obnova všech měst najednou; jako výše se nic necommituje
+        return refresh_material_states(now=start + timedelta(days=i + 1), seed=ctx.seed)
+
+    return run
+
+
+@benchmark("quest_templates")
+def _bench_quest_templates(ctx: BenchContext):
+    # katalog s tisíci úkoly (kopie skutečných šablon s novými id); bez DB
+    catalog = [
+        {**template, "id": f"{template['id']}-{idx:05d}"}
+        for idx in range(QUEST_CATALOG_SIZE // len(AGENT_TASK_TEMPLATES))
+        for template in AGENT_TASK_TEMPLATES
+    ]
+    registry = QuestTemplateRegistry(catalog)
+    task_ids = [template["id"] for template in ctx.rng.sample(catalog, min(1000, len(catalog)))]
+    placeholders = {
+        "rook_city": "Denver",
+        "hq_city": "Chicago",
+        "market_lead_city": "Dallas",
+        "workshop_city": "Boston",
+        "target_city": "Seattle",
+    }
+
+    def run(i: int):
+        # to, co dělá serialize_active_task: najít šablonu a dosadit placeholdery
+        return registry.get(task_ids[i % len(task_ids)]).render(placeholders)
+
+    return run
+
+
+@benchmark("resolve_placeholders")
+def _bench_resolve_placeholders(ctx: BenchContext):
+    agent_ids = ctx.sample(ctx.agent_ids)
+    templates = [template for template in AGENT_TASK_TEMPLATES if template.get("dynamic_placeholders")]
+    # katalog měst se staví jednou se sítí – do měření nepatří
+    get_rail_network()
+
+    def run(i: int):
+        # to, co dělá assign_task: vylosovat města pro všechny úkoly agenta
+        agent = _load_agent(agent_ids[i % len(agent_ids)])
+        region_code = agent.current_city.region.code if agent.current_city and agent.current_city.region else None
+        return [
+            resolve_template_for_agent(
+                template,
+                agent_region_code=region_code,
+                agent_city=agent.current_city,
+                hq_city=agent.hq_city,
+                agent_id=agent.id,
+            )
+            for template in templates
+        ]
+
+    return run
+
+
+def summarize(latencies_s: List[float]) -> Dict[str, float]:
+    """Percentily a propustnost z naměřených dob jedné iterace (v sekundách)."""
+    samples = np.asarray(latencies_s, dtype=np.float64) * 1000.0
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    total_s = float(samples.sum()) / 1000.0
+    return {
+        "iterations": int(samples.size),
+        "p50_ms": round(float(p50), 4),
+        "p95_ms": round(float(p95), 4),
+        "p99_ms": round(float(p99), 4),
+        "mean_ms": round(float(samples.mean()), 4),
+        "min_ms": round(float(samples.min()), 4),
+        "max_ms": round(float(samples.max()), 4),
+        "throughput_per_s": round(samples.size / total_s, 2) if total_s > 0 else None,
+    }
+
+
+def run_benchmark(ctx: BenchContext, name: str, iterations: int, warmup: int) -> Dict[str, Any]:
+    """Spustí jeden benchmark; příprava a úklid session se do času nepočítají."""
+    # vlastní RNG pro každý benchmark – výběr dat nezávisí na tom, co běželo před ním
+    ctx.rng = random.Random(f"{ctx.seed}:{name}")
+    run = BENCHMARKS[name](ctx)
+    for i in range(warmup):
+        run(i)
+        db.session.remove()
+
+    latencies: List[float] = []
+    with count_queries() as queries:
+        for i in range(iterations):
+            started = time.perf_counter()
+            run(warmup + i)
+            latencies.append(time.perf_counter() - started)
+            db.session.remove()
+    result = summarize(latencies)
+    result["queries_per_iteration"] = round(queries.count / max(iterations, 1), 2)
+    return result
+
+
+def run_benchmarks(
+    ctx: BenchContext,
+    names: Optional[List[str]] = None,
+    iterations: int = 200,
+    warmup: int = 10,
+) -> Dict[str, Dict[str, Any]]:
+    results: Dict[str, Dict[str, Any]] = {}
+    for name in names or list(BENCHMARKS):
+        try:
+            results[name] = run_benchmark(ctx, name, iterations, warmup)
+        except BenchmarkSkipped as exc:
+            results[name] = {"skipped": str(exc)}
+    return results
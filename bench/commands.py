@@ -0,0 +1,245 @@
+# bench/commands.py
+#
+# CLI skupina `flask bench`:
+#   flask bench generate-map --cities 5000 --lines 15000 --agents 200
+#   flask bench run --iterations 200 --output bench.json
+#   flask bench compare base.json bench.json
+#   flask bench query-plans --rows 100000
+#   flask bench market-stress --threads 8 --requests 2000
+#   flask bench read-only-check
+# Výstup `run` je JSON, takže jde uložit pro každý commit a porovnat.
+
+from __future__ import annotations
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+from typing import Optional
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import create_engine
+
+from app.database import describe_engine
+from app.extensions import db
+from app.models.train_line import TrainLine
+from app.services.rail_network_service import invalidate_rail_network
+from bench.benchmarks import BENCHMARKS, BenchContext, run_benchmarks
+from bench.market_stress import run_market_stress
+from bench.query_plans import run_query_plans
+from bench.read_only_check import run_read_only_check
+from bench.synthetic_map import generate_synthetic_map
+from seeds.bulk import SeedTimer
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=current_app.root_path,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip() or None
+
+
+def _row_count(model) -> int:
+    return db.session.execute(db.select(db.func.count()).select_from(model)).scalar_one()
+
+
+def register_bench_commands(app):
+    bench = AppGroup("bench", help="Synthetic maps and performance benchmarks.")
+
+    @bench.command("generate-map")
+    @click.option("--cities", default=5000, show_default=True, help="Number of cities (N).")
+    @click.option("--lines", default=15000, show_default=True, help="Number of train lines (M).")
+    @click.option("--agents", default=100, show_default=True, help="Number of agents (K).")
+    @click.option("--seed", default=0, show_default=True, help="Random seed – same seed, same map.")
+    @click.confirmation_option(prompt="This deletes all cities, lines and agents in the database. Continue?")
+    def generate_map(cities: int, lines: int, agents: int, seed: int):
+        """Replace the map with a synthetic one (N cities, M lines, K agents)."""
+        print(f"Generating synthetic map ({cities} cities, {lines} lines, {agents} agents, seed {seed})...")
+        timer = SeedTimer()
+
+        counts = generate_synthetic_map(cities, lines, agents, seed=seed)
+
+        db.session.commit()
+        invalidate_rail_network()
+        timer.report("syntetická mapa", counts["cities"] + counts["lines"] + counts["agents"])
+        print(f"✅ {counts['cities']} měst, {counts['lines']} linek, {counts['agents']} agentů")
+
+    @bench.command("run")
+    @click.option(
+        "--only",
+        "names",
+        multiple=True,
+        type=click.Choice(sorted(BENCHMARKS)),
+        help="Run only the given benchmark (repeatable).",
+    )
+    @click.option("--iterations", default=200, show_default=True, help="Measured iterations per benchmark.")
+    @click.option("--warmup", default=10, show_default=True, help="Unmeasured warm-up iterations.")
+    @click.option("--seed", default=0, show_default=True, help="Seed for picking cities / agents.")
+    @click.option("--output", type=click.Path(dir_okay=False, writable=True), help="Write JSON here instead of stdout.")
+    def run(names, iterations: int, warmup: int, seed: int, output: Optional[str]):
+        """Run benchmarks and report p50/p95/p99 latency and throughput as JSON."""
+        ctx = BenchContext(current_app._get_current_object(), seed=seed)
+        report = {
+            "meta": {
+                "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "git_commit": _git_commit(),
+                "python": platform.python_version(),
+                "database": describe_engine(db.engine),
+                "cities": len(ctx.city_ids),
+                "lines": _row_count(TrainLine),
+                "agents": len(ctx.agent_ids),
+                "iterations": iterations,
+                "warmup": warmup,
+                "seed": seed,
+            },
+            "results": run_benchmarks(ctx, list(names) or None, iterations=iterations, warmup=warmup),
+        }
+
+        text = json.dumps(report, indent=2, ensure_ascii=False)
+        if output:
+            with open(output, "w", encoding="utf-8") as fh:
+                fh.write(text + "\n")
+            click.echo(f"Benchmark report written to {output}", err=True)
+        else:
+            click.echo(text)
+
+    @bench.command("query-plans")
+    @click.option("--rows", default=100_000, show_default=True, help="Rows per hot table.")
+    @click.option("--repeat", default=200, show_default=True, help="Timed executions per query and phase.")
+    @click.option("--seed", default=0, show_default=True, help="Random seed for data and parameters.")
+    @click.option(
+        "--url",
+        help="Scratch database URL (all tables are dropped!). Default: a temporary SQLite file.",
+    )
+    @click.option("--output", type=click.Path(dir_okay=False, writable=True), help="Also write the JSON report here.")
+    def query_plans(rows: int, repeat: int, seed: int, url: Optional[str], output: Optional[str]):
+        """EXPLAIN plans and median latency of the hot lookups, without and with indexes."""
+        scratch_dir = None
+        if url is None:
+            scratch_dir = tempfile.mkdtemp(prefix="bench-plans-")
+            url = "sqlite:///" + os.path.join(scratch_dir, "plans.db")
+        engine = create_engine(url)
+        try:
+            report = run_query_plans(engine, rows=rows, repeat=repeat, seed=seed)
+        finally:
+            engine.dispose()
+            if scratch_dir:
+                for name in os.listdir(scratch_dir):
+                    os.remove(os.path.join(scratch_dir, name))
+                os.rmdir(scratch_dir)
+
+        for name, result in report["queries"].items():
+            before, after = result["without_indexes"], result["with_indexes"]
+            click.echo(f"{name}: {before['median_ms']:.3f} ms -> {after['median_ms']:.3f} ms (x{result['speedup']})")
+            click.echo(f"    without: {before['plan']}")
+            click.echo(f"    with:    {after['plan']}")
+        if output:
+            with open(output, "w", encoding="utf-8") as fh:
+                fh.write(json.dumps(report, indent=2, ensure_ascii=False) + "\n")
+            click.echo(f"Query plan report written to {output}", err=True)
+
+    @bench.command("market-stress")
+    @click.option("--agents", default=20, show_default=True, help="Agents trading in the same city.")
+    @click.option("--threads", default=8, show_default=True, help="Concurrent request threads.")
+    @click.option("--requests", default=2000, show_default=True, help="Total collect/buy requests.")
+    @click.option("--stock", default=500, show_default=True, help="Starting info and market stock of the city.")
+    @click.option("--seed", default=0, show_default=True, help="Random seed for the request mix.")
+    @click.option(
+        "--url",
+        help="Scratch database URL (all tables are dropped!). Default: a temporary SQLite file.",
+    )
+    def market_stress(agents: int, threads: int, requests: int, stock: int, seed: int, url: Optional[str]):
+        """Hammer material collect/buy from many threads; exits 1 if stock or money went inconsistent."""
+        scratch_dir = None
+        if url is None:
+            scratch_dir = tempfile.mkdtemp(prefix="bench-market-")
+            url = "sqlite:///" + os.path.join(scratch_dir, "market.db")
+        else:
+            engine = create_engine(url)
+            db.metadata.drop_all(engine)
+            engine.dispose()
+        try:
+            report = run_market_stress(url, agents=agents, threads=threads, requests=requests, stock=stock, seed=seed)
+        finally:
+            if scratch_dir:
+                for name in os.listdir(scratch_dir):
+                    os.remove(os.path.join(scratch_dir, name))
+                os.rmdir(scratch_dir)
+
+        click.echo(json.dumps(report, indent=2, ensure_ascii=False))
+        if report["problems"]:
+            sys.exit(1)
+
+    @bench.command("read-only-check")
+    @click.option("--cities", default=50, show_default=True, help="Cities in the synthetic scratch map.")
+    @click.option("--seed", default=0, show_default=True, help="Random seed for the scratch map.")
+    @click.option(
+        "--url",
+        help="Scratch database URL (all tables are dropped!). Default: a temporary SQLite file.",
+    )
+    def read_only_check(cities: int, seed: int, url: Optional[str]):
+        """GET the task / story-dialog / dashboard endpoints; exits 1 if any of them writes to the database."""
+        scratch_dir = None
+        if url is None:
+            scratch_dir = tempfile.mkdtemp(prefix="bench-read-only-")
+            url = "sqlite:///" + os.path.join(scratch_dir, "read_only.db")
+        else:
+            engine = create_engine(url)
+            db.metadata.drop_all(engine)
+            engine.dispose()
+        try:
+            report = run_read_only_check(url, cities=cities, seed=seed)
+        finally:
+            if scratch_dir:
+                for name in os.listdir(scratch_dir):
+                    os.remove(os.path.join(scratch_dir, name))
+                os.rmdir(scratch_dir)
+
+        click.echo(json.dumps(report, indent=2, ensure_ascii=False))
+        if report["problems"]:
+            sys.exit(1)
+
+    @bench.command("compare")
+    @click.argument("baseline", type=click.File("r", encoding="utf-8"))
+    @click.argument("current", type=click.File("r", encoding="utf-8"))
+    @click.option(
+        "--threshold",
+        default=0.10,
+        show_default=True,
+        help="Relative p50 slowdown that counts as a regression.",
+    )
+    def compare(baseline, current, threshold: float):
+        """Compare two `bench run` reports; exits 1 if any p50 regressed."""
+        base = json.load(baseline)["results"]
+        new = json.load(current)["results"]
+
+        regressed = False
+        click.echo(f"{'benchmark':32} {'p50 base':>10} {'p50 new':>10} {'p95 base':>10} {'p95 new':>10} {'change':>8}")
+        for name in sorted(set(base) & set(new)):
+            old_row, new_row = base[name], new[name]
+            if "p50_ms" not in old_row or "p50_ms" not in new_row:
+                click.echo(f"{name:32} {'skipped':>10}")
+                continue
+            change = new_row["p50_ms"] / old_row["p50_ms"] - 1 if old_row["p50_ms"] else 0.0
+            flag = " !" if change > threshold else ""
+            regressed = regressed or change > threshold
+            click.echo(
+                f"{name:32} {old_row['p50_ms']:>10.3f} {new_row['p50_ms']:>10.3f} "
+                f"{old_row['p95_ms']:>10.3f} {new_row['p95_ms']:>10.3f} {change:>+7.1%}{flag}"
+            )
+        if regressed:
+            sys.exit(1)
+
+    app.cli.add_command(bench)
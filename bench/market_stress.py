@@ -0,0 +1,164 @@
+# bench/market_stress.py
+#
+# Zátěžový test trhu s materiálem (collect / buy) při souběžných requestech:
+# - scratch aplikace nad vlastní DB (výchozí dočasné SQLite, mimo data.db)
+# - jedno město s danou zásobou, K agentů s penězi a tokenem
+# - T vláken posílá náhodně collect / buy za náhodné agenty (i za stejného
+#   agenta souběžně) přes skutečné endpointy
+# - na konci se ověří, že se nic neprodalo dvakrát: zásoba města + co agenti
+#   získali = původní zásoba, peníze sedí na korunu, nic není záporné
+
+from __future__ import annotations
+
+import random
+import statistics
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Any, Dict, List
+
+from app.extensions import db
+from app.models.agent import Agent
+from app.models.city import City
+from app.models.region import Region
+from app.services.agent_service import create_agent, issue_agent_token
+
+STARTING_MONEY = 10_000
+PRICE = 100
+
+
+def _prepare(agents: int, stock: int) -> Dict[str, Any]:
+    db.create_all()
+    region = Region(code="bench", name="Bench")
+    city = City(
+        name="Bench Market",
+        region=region,
+        importance=1,
+        material_info_qty=stock,
+        market_material_qty=stock,
+        market_material_price=PRICE,
+        # dnešní stav – plánovač ani debug refresh ho nepřepíšou
+        material_refreshed_at=datetime.now(),
+    )
+    db.session.add(city)
+    db.session.flush()
+    tokens = {}
+    for idx in range(agents):
+        agent = create_agent(codename=f"stress-{idx:03d}", city=city)
+        agent.add_to_inventory("money", STARTING_MONEY)
+        # každý agent unese dvojnásobek férového podílu – o zásobu se soupeří
+        agent.material_max = max(2 * stock // agents, 1)
+        db.session.flush()
+        tokens[agent.id] = issue_agent_token(agent.id)
+    db.session.commit()
+    return {"city_id": city.id, "tokens": tokens}
+
+
+def _check(city_id: int, stock: int, gained: Dict[int, Counter]) -> List[str]:
+    """Porovná stav DB s tím, co endpointy hlásily; vrací seznam porušení."""
+    problems = []
+    city = db.session.get(City, city_id)
+    collected = sum(counter["collected"] for counter in gained.values())
+    purchased = sum(counter["purchased"] for counter in gained.values())
+    if city.material_info_qty < 0 or city.market_material_qty < 0:
+        problems.append(f"negative city stock: info={city.material_info_qty} market={city.market_material_qty}")
+    if city.material_info_qty + collected != stock:
+        problems.append(f"info stock {city.material_info_qty} + collected {collected} != {stock}")
+    if city.market_material_qty + purchased != stock:
+        problems.append(f"market stock {city.market_material_qty} + purchased {purchased} != {stock}")
+    for agent in Agent.query.all():
+        counter = gained.get(agent.id, Counter())
+        expected_material = counter["collected"] + counter["purchased"]
+        money = Agent.normalize_inventory(agent.inventory)["money"]
+        if agent.material_current != expected_material:
+            problems.append(f"agent {agent.id}: material {agent.material_current} != {expected_material}")
+        if agent.material_current > agent.material_max:
+            problems.append(f"agent {agent.id}: material {agent.material_current} over max {agent.material_max}")
+        if money != STARTING_MONEY - counter["spent"]:
+            problems.append(f"agent {agent.id}: money {money} != {STARTING_MONEY - counter['spent']}")
+    return problems
+
+
+def run_market_stress(url: str, agents: int, threads: int, requests: int, stock: int, seed: int = 0) -> Dict[str, Any]:
+    """Pustí `requests` souběžných collect/buy na jedno město a ověří konzistenci výsledku."""
+    # až tady – app importuje bench.commands a ty importují tento modul
+    from app import create_app
+
+    app = create_app(
+        {
+            "SQLALCHEMY_DATABASE_URI": url,
+            "TRAVEL_LOG_ASYNC": False,
+            "MATERIAL_REFRESH_SCHEDULER": False,
+            "AGENT_FALLBACK_TO_PRIMARY": False,
+            # scratch DB a test client – bez SECRET_KEY stačí náhodný klíč (tokeny jsou jen pro tento běh)
+            "TESTING": True,
+        }
+    )
+    with app.app_context():
+        setup = _prepare(agents, stock)
+    agent_ids = sorted(setup["tokens"])
+
+    lock = threading.Lock()
+    statuses: Counter = Counter()
+    gained: Dict[int, Counter] = defaultdict(Counter)
+    latencies: List[float] = []
+    remaining = [requests]
+
+    def worker(worker_idx: int) -> None:
+        rng = random.Random(f"{seed}:{worker_idx}")
+        client = app.test_client()
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            agent_id = rng.choice(agent_ids)
+            headers = {"Authorization": f"Bearer {setup['tokens'][agent_id]}"}
+            started = time.perf_counter()
+            if rng.random() < 0.5:
+                action = "collect"
+                response = client.post(f"/api/cities/{setup['city_id']}/materials/collect", headers=headers)
+            else:
+                action = "buy"
+                response = client.post(
+                    f"/api/cities/{setup['city_id']}/materials/buy",
+                    headers=headers,
+                    json={"quantity": rng.randint(1, 3)},
+                )
+            elapsed = time.perf_counter() - started
+            body = response.get_json(silent=True) or {}
+            with lock:
+                latencies.append(elapsed)
+                statuses[f"{action} {response.status_code} {body.get('error', 'ok')}"] += 1
+                if response.status_code == 200:
+                    if action == "collect":
+                        gained[agent_id]["collected"] += body["collected_qty"]
+                    else:
+                        gained[agent_id]["purchased"] += body["purchased_qty"]
+                        gained[agent_id]["spent"] += body["total_cost"]
+
+    started = time.perf_counter()
+    pool = [threading.Thread(target=worker, args=(idx,)) for idx in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    with app.app_context():
+        problems = _check(setup["city_id"], stock, gained)
+        db.session.remove()
+        db.engine.dispose()
+
+    return {
+        "agents": agents,
+        "threads": threads,
+        "requests": requests,
+        "stock": stock,
+        "wall_s": round(wall, 3),
+        "throughput_per_s": round(requests / wall, 1) if wall else None,
+        "p50_ms": round(statistics.median(latencies) * 1000, 3) if latencies else None,
+        "statuses": dict(sorted(statuses.items())),
+        "problems": problems,
+    }
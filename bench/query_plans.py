@@ -0,0 +1,192 @@
+# bench/query_plans.py
+#
+# Plány a časy "horkých" dotazů bez indexů a s nimi:
+# - scratch DB (výchozí dočasné SQLite, mimo data.db) se schématem z modelů
+# - do tabulek train_lines, active_tasks, agent_travel_log, lab_action_states
+#   a cities se nasype N syntetických řádků
+# - pro každý tvar dotazu (stejný jako v services / controllerech) se vypíše
+#   EXPLAIN plán a medián doby dotazu – nejdřív bez indexů, pak s indexy z modelů
+
+from __future__ import annotations
+
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.engine import Connection, Engine
+
+from app.extensions import db
+from app.models.active_task import ActiveTask
+from app.models.agent_travel_log import AgentTravelLog
+from app.models.city import City
+from app.models.lab_action import LabActionState
+from app.models.train_line import TrainLine
+
+HOT_TABLES = ("cities", "train_lines", "active_tasks", "agent_travel_log", "lab_action_states")
+TASK_IDS = [f"mission-bench-{idx:02d}" for idx in range(30)]
+STATUSES = ("active", "completed", "rewarded")
+LAB_ACTIONS = 50
+# kolik různých parametrů se při měření střídá (ať se neměří jeden výsledek z cache)
+PARAM_SAMPLES = 50
+
+
+def _hot_indexes() -> List[Any]:
+    return [index for name in HOT_TABLES for index in db.metadata.tables[name].indexes]
+
+
+def fill_scratch_db(engine: Engine, rows: int, rng: random.Random) -> Dict[str, Any]:
+    """Založí schéma z modelů (bez indexů horkých tabulek) a nasype `rows` řádků do každé."""
+    db.metadata.drop_all(engine)
+    db.metadata.create_all(engine)
+    agents = max(rows // 20, 1)
+    started = datetime(2025, 1, 1)
+
+    with engine.begin() as conn:
+        for index in _hot_indexes():
+            index.drop(conn)
+
+        conn.execute(City.__table__.insert(), [
+            {"id": idx, "name": f"Bench City {idx:07d}", "region_id": 1 + idx % 9, "importance": 1 + idx % 3}
+            for idx in range(1, rows + 1)
+        ])
+        conn.execute(TrainLine.__table__.insert(), [
+            {
+                "from_city_id": rng.randint(1, rows),
+                "to_city_id": rng.randint(1, rows),
+                "line_type": "regional",
+                "frequency_minutes": 30,
+                "is_active": rng.random() < 0.95,
+            }
+            for _ in range(rows)
+        ])
+        conn.execute(ActiveTask.__table__.insert(), [
+            {
+                "agent_id": rng.randint(1, agents),
+                "task_id": rng.choice(TASK_IDS),
+                "status": rng.choice(STATUSES),
+                "created_at": started + timedelta(seconds=idx),
+            }
+            for idx in range(rows)
+        ])
+        conn.execute(AgentTravelLog.__table__.insert(), [
+            {
+                "agent_id": rng.randint(1, agents),
+                "to_city_id": rng.randint(1, rows),
+                "game_minutes": idx,
+                "game_week": 0,
+                "game_day_index": 0,
+                "game_day_label": "Po",
+                "game_time_label": "00:00",
+                "created_at": started + timedelta(seconds=idx),
+                "recorded_at": started + timedelta(seconds=idx),
+            }
+            for idx in range(rows)
+        ])
+        # unikátní (lab_action_id, agent_id) – každý agent má všechny akce
+        conn.execute(LabActionState.__table__.insert(), [
+            {"lab_action_id": 1 + idx % LAB_ACTIONS, "agent_id": 1 + idx // LAB_ACTIONS}
+            for idx in range(rows)
+        ])
+
+    return {"rows": rows, "agents": agents}
+
+
+def query_shapes(rng: random.Random, rows: int, agents: int) -> Dict[str, Callable[[], Any]]:
+    """Tvary dotazů z aplikace; každé volání vrátí select s jinými (náhodnými) parametry."""
+
+    def city_id() -> int:
+        return rng.randint(1, rows)
+
+    def agent_id() -> int:
+        return rng.randint(1, agents)
+
+    def city_name() -> str:
+        return f"Bench City {city_id():07d}"
+
+    def lines_of_city():
+        anchor = city_id()
+        return select(TrainLine).where(
+            TrainLine.is_active == True,  # noqa: E712 – stejně jako v task_config
+            or_(TrainLine.from_city_id == anchor, TrainLine.to_city_id == anchor),
+        )
+
+    return {
+        # task_config: sousedé kotvícího města
+        "train_lines_of_city": lines_of_city,
+        # task_service: úkol agenta podle task_id
+        "active_task_by_task_id": lambda: (
+            select(ActiveTask)
+            .where(ActiveTask.agent_id == agent_id(), ActiveTask.task_id == rng.choice(TASK_IDS))
+            .limit(1)
+        ),
+        # task_service.get_active_task
+        "active_task_by_status": lambda: (
+            select(ActiveTask).where(ActiveTask.agent_id == agent_id(), ActiveTask.status == "active").limit(1)
+        ),
+        # task_service: všechny úkoly agenta
+        "active_tasks_of_agent": lambda: (
+            select(ActiveTask).where(ActiveTask.agent_id == agent_id()).order_by(ActiveTask.created_at.asc())
+        ),
+        # /api/agent/travel-log
+        "travel_log_latest": lambda: (
+            select(AgentTravelLog)
+            .where(AgentTravelLog.agent_id == agent_id())
+            .order_by(AgentTravelLog.created_at.desc())
+            .limit(25)
+        ),
+        # lab_service: stavy akcí agenta
+        "lab_states_of_agent": lambda: select(LabActionState).where(LabActionState.agent_id == agent_id()),
+        # task_config: placeholder města podle jména
+        "city_by_name": lambda: select(City).where(City.name == city_name()).limit(1),
+        # task_service: HQ město bez ohledu na velikost písmen
+        "city_by_name_ci": lambda: (
+            select(City).where(func.lower(City.name) == func.lower(city_name().upper())).limit(1)
+        ),
+    }
+
+
+def explain(conn: Connection, statement) -> str:
+    sql = str(statement.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+    if conn.dialect.name == "sqlite":
+        return "; ".join(row[3] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}"))
+    return "; ".join(row[0].strip() for row in conn.exec_driver_sql(f"EXPLAIN {sql}"))
+
+
+def _measure(conn: Connection, statements: List[Any], repeat: int) -> float:
+    durations = []
+    for idx in range(repeat):
+        statement = statements[idx % len(statements)]
+        started = time.perf_counter()
+        conn.execute(statement).fetchall()
+        durations.append(time.perf_counter() - started)
+    return statistics.median(durations) * 1000
+
+
+def run_query_plans(engine: Engine, rows: int, repeat: int, seed: int = 0) -> Dict[str, Any]:
+    """Naplní scratch DB a změří každý tvar dotazu bez indexů a s nimi."""
+    rng = random.Random(seed)
+    info = fill_scratch_db(engine, rows, rng)
+    shapes = query_shapes(rng, rows, info["agents"])
+    statements = {name: [build() for _ in range(PARAM_SAMPLES)] for name, build in shapes.items()}
+
+    results: Dict[str, Dict[str, Any]] = {name: {} for name in shapes}
+    for phase in ("without_indexes", "with_indexes"):
+        with engine.begin() as conn:
+            if phase == "with_indexes":
+                for index in _hot_indexes():
+                    index.create(conn)
+            conn.exec_driver_sql("ANALYZE")
+        with engine.connect() as conn:
+            for name, samples in statements.items():
+                results[name][phase] = {
+                    "plan": explain(conn, samples[0]),
+                    "median_ms": round(_measure(conn, samples, repeat), 4),
+                }
+
+    for result in results.values():
+        without, with_ = result["without_indexes"]["median_ms"], result["with_indexes"]["median_ms"]
+        result["speedup"] = round(without / with_, 1) if with_ else None
+    return {"rows": rows, "repeat": repeat, "database": engine.dialect.name, "queries": results}
@@ -0,0 +1,85 @@
+# bench/read_only_check.py
+#
+# Kontrola, že čtecí endpointy úkolů nic nezapisují (GET jde cachovat / číst z repliky):
+# - scratch aplikace nad vlastní DB (výchozí dočasné SQLite, mimo data.db)
+# - malá syntetická mapa, agent s přiděleným úkolem a čerstvý agent bez úkolů
+# - každý GET běží uvnitř assert_read_only(); INSERT / UPDATE / DELETE = problém
+# - zápisy se hlídají vždy, nezávisle na SQL_QUERY_COUNTING a strict režimu
+
+from __future__ import annotations
+
+from typing import Any, Dict, List
+
+from app.extensions import db
+from app.query_counter import ReadOnlyViolation, assert_read_only
+from app.services.agent_service import create_agent, issue_agent_token
+from app.services.rail_network_service import invalidate_rail_network
+from app.services.task_service import advance_task_pipeline
+from bench.synthetic_map import generate_synthetic_map
+
+READ_ONLY_PATHS = (
+    "/api/tasks",
+    "/api/tasks/story-dialogs",
+    "/api/dashboard",
+)
+
+
+def _prepare(cities: int, seed: int) -> Dict[str, str]:
+    db.create_all()
+    generate_synthetic_map(cities, cities * 3, 0, seed=seed)
+    db.session.commit()
+    invalidate_rail_network()
+
+    tokens = {}
+    with_tasks = create_agent(codename="read-only-tasks")
+    fresh = create_agent(codename="read-only-fresh")
+    db.session.commit()
+    # úkol se přiděluje událostí (založení agenta, claim, reset) – tady explicitně
+    advance_task_pipeline(with_tasks)
+    tokens["with_tasks"] = issue_agent_token(with_tasks.id)
+    tokens["fresh"] = issue_agent_token(fresh.id)
+    return tokens
+
+
+def run_read_only_check(url: str, cities: int = 50, seed: int = 0) -> Dict[str, Any]:
+    """Projde READ_ONLY_PATHS za oba agenty (dvakrát – i opakovaný polling) a vrátí nalezené zápisy."""
+    # až tady – app importuje bench.commands a ty importují tento modul
+    from app import create_app
+
+    app = create_app(
+        {
+            "SQLALCHEMY_DATABASE_URI": url,
+            "TRAVEL_LOG_ASYNC": False,
+            "MATERIAL_REFRESH_SCHEDULER": False,
+            "AGENT_FALLBACK_TO_PRIMARY": False,
+            # scratch DB a test client – bez SECRET_KEY stačí náhodný klíč (tokeny jsou jen pro tento běh)
+            "TESTING": True,
+        }
+    )
+    with app.app_context():
+        tokens = _prepare(cities, seed)
+
+    client = app.test_client()
+    checked: List[Dict[str, Any]] = []
+    problems: List[str] = []
+    for agent_label, token in tokens.items():
+        headers = {"Authorization": f"Bearer {token}"}
+        for attempt in range(2):
+            for path in READ_ONLY_PATHS:
+                label = f"{agent_label} GET {path} #{attempt + 1}"
+                with app.app_context():
+                    try:
+                        with assert_read_only() as counter:
+                            response = client.get(path, headers=headers)
+                    except ReadOnlyViolation as exc:
+                        problems.append(f"{label}: {exc}")
+                        continue
+                if response.status_code != 200:
+                    problems.append(f"{label}: HTTP {response.status_code}")
+                checked.append({"request": label, "status": response.status_code, "queries": counter.count})
+
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+    return {"checked": checked, "problems": problems}
@@ -0,0 +1,224 @@
+# bench/synthetic_map.py
+#
+# Generátor syntetické mapy pro benchmarky:
+# - N měst rozházených po bounding boxu USA (px/py/grid dopočítané lineární
+#   regresí z reálných měst v cities_seed, takže sedí do mapy na frontendu)
+# - M linek mezi prostorově blízkými městy (pořadí podle Mortonova kódu),
+#   typ a frekvence stejně jako v generate-trainlines
+# - K agentů rozmístěných po náhodných městech
+# Všechno je deterministické podle seedu, aby šly výsledky porovnávat mezi commity.
+
+from __future__ import annotations
+
+from typing import Dict
+
+import numpy as np
+from sqlalchemy import delete
+
+from app.extensions import db
+from app.models.active_task import ActiveTask
+from app.models.agent import Agent
+from app.models.agent_inventory_item import AgentInventoryItem
+from app.models.agent_task_progress import AgentTaskProgress
+from app.models.agent_travel_log import AgentTravelLog
+from app.models.city import City
+from app.models.lab_action import LabActionState
+from app.models.region import Region
+from app.models.train_line import TrainLine
+from app.models.travel_stats import AgentCityVisit, AgentLineUsage, AgentWeekActivity
+from app.services.timetable_service import DISTANCE_SCALE, EARTH_RADIUS_MI
+from seeds.bulk import bulk_insert
+from seeds.cities_seed import CITIES, REGIONS, seed_regions_and_cities
+from seeds.trainlines_seed import _compute_frequency, _compute_line_type
+
+# kontinentální USA
+LAT_RANGE = (25.0, 49.0)
+LON_RANGE = (-124.5, -67.0)
+
+# podíl měst podle důležitosti – jako v reálné mapě (10 / 32 / 50)
+IMPORTANCE_WEIGHTS = np.array([0.11, 0.35, 0.54])
+
+# maximální vzdálenost (v pořadí Mortonovy křivky) mezi spojenými městy
+NEIGHBOR_WINDOW = 8
+
+# tabulky, které odkazují na agenty / města – mažou se před generováním
+WIPE_ORDER = (
+    ActiveTask,
+    AgentTaskProgress,
+    AgentTravelLog,
+    AgentCityVisit,
+    AgentLineUsage,
+    AgentWeekActivity,
+    LabActionState,
+    AgentInventoryItem,
+    Agent,
+    TrainLine,
+    City,
+    Region,
+)
+
+
+def _projection() -> Dict[str, np.ndarray]:
+    """Koeficienty lat/lon → px/py a px/py → grid z reálných měst (polyfit 1. stupně)."""
+    lat = np.array([c["lat"] for c in CITIES])
+    lon = np.array([c["lon"] for c in CITIES])
+    px = np.array([c["px"] for c in CITIES])
+    py = np.array([c["py"] for c in CITIES])
+    return {
+        "px": np.polyfit(lon, px, 1),
+        "py": np.polyfit(lat, py, 1),
+        "grid_x": np.polyfit(px, np.array([c["grid_x"] for c in CITIES]), 1),
+        "grid_y": np.polyfit(py, np.array([c["grid_y"] for c in CITIES]), 1),
+    }
+
+
+def _morton_order(x: np.ndarray, y: np.ndarray, bits: int = 10) -> np.ndarray:
+    """Seřadí body podle Z-křivky – sousedé v pořadí jsou sousedé i na mapě."""
+    scale = (1 << bits) - 1
+    xi = ((x - x.min()) / max(np.ptp(x), 1e-9) * scale).astype(np.uint64)
+    yi = ((y - y.min()) / max(np.ptp(y), 1e-9) * scale).astype(np.uint64)
+    code = np.zeros_like(xi)
+    for bit in range(bits):
+        code |= ((xi >> np.uint64(bit)) & np.uint64(1)) << np.uint64(2 * bit)
+        code |= ((yi >> np.uint64(bit)) & np.uint64(1)) << np.uint64(2 * bit + 1)
+    return np.argsort(code, kind="stable")
+
+
+def _haversine(lat1, lon1, lat2, lon2) -> np.ndarray:
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return EARTH_RADIUS_MI * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def generate_cities(count: int, rng: np.random.Generator) -> list:
+    """Vrátí dicty ve formátu CITIES (vstup pro seed_regions_and_cities)."""
+    coeffs = _projection()
+    lat = rng.uniform(*LAT_RANGE, size=count)
+    lon = rng.uniform(*LON_RANGE, size=count)
+    px = np.polyval(coeffs["px"], lon)
+    py = np.polyval(coeffs["py"], lat)
+    grid_x = np.rint(np.polyval(coeffs["grid_x"], px)).astype(int)
+    grid_y = np.rint(np.polyval(coeffs["grid_y"], py)).astype(int)
+    importance = rng.choice([1, 2, 3], size=count, p=IMPORTANCE_WEIGHTS)
+    population = rng.integers(5_000, 2_000_000, size=count)
+
+    # region = nejbližší reálné město (stačí hrubě podle lat/lon)
+    ref_lat = np.array([c["lat"] for c in CITIES])
+    ref_lon = np.array([c["lon"] for c in CITIES])
+    ref_region = np.array([c["region"] for c in CITIES])
+    regions = np.empty(count, dtype=object)
+    for start in range(0, count, 4096):
+        chunk = slice(start, start + 4096)
+        d = (lat[chunk, None] - ref_lat[None, :]) ** 2 + (lon[chunk, None] - ref_lon[None, :]) ** 2
+        regions[chunk] = ref_region[np.argmin(d, axis=1)]
+
+    return [
+        {
+            "name": f"Bench City {idx + 1:06d}",
+            "region": regions[idx],
+            "importance": int(importance[idx]),
+            "lat": round(float(lat[idx]), 4),
+            "lon": round(float(lon[idx]), 4),
+            "px": round(float(px[idx]), 2),
+            "py": round(float(py[idx]), 2),
+            "grid_x": int(grid_x[idx]),
+            "grid_y": int(grid_y[idx]),
+            "population": int(population[idx]),
+        }
+        for idx in range(count)
+    ]
+
+
+def generate_line_pairs(lat: np.ndarray, lon: np.ndarray, count: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Vrátí pole (M, 2) indexů měst. Nejdřív řetěz přes všechna města v Mortonově
+    pořadí (síť je souvislá), zbytek jsou náhodné spoje v okně NEIGHBOR_WINDOW;
+    když okno nestačí, doberou se úplně náhodné dvojice.
+    """
+    n = len(lat)
+    if n < 2 or count <= 0:
+        return np.empty((0, 2), dtype=np.int64)
+    count = min(count, n * (n - 1) // 2)
+    order = _morton_order(lon, lat)
+
+    chain = np.sort(np.stack([order[:-1], order[1:]], axis=1), axis=1)[:count]
+    pairs = [chain]
+    seen = {(int(a), int(b)) for a, b in chain}
+    stalled = False
+    while len(seen) < count:
+        need = count - len(seen)
+        if stalled:
+            candidates = rng.integers(0, n, size=(need * 2, 2))
+        else:
+            pos = rng.integers(0, n - 1, size=need * 2)
+            step = rng.integers(1, NEIGHBOR_WINDOW + 1, size=need * 2)
+            candidates = np.stack([order[pos], order[np.minimum(pos + step, n - 1)]], axis=1)
+        fresh = []
+        for a, b in np.sort(candidates, axis=1):
+            key = (int(a), int(b))
+            if a != b and key not in seen:
+                seen.add(key)
+                fresh.append(key)
+                if len(seen) == count:
+                    break
+        stalled = len(fresh) * 4 < need
+        if fresh:
+            pairs.append(np.array(fresh, dtype=np.int64))
+    return np.concatenate(pairs)
+
+
+def wipe_map() -> None:
+    """Smaže města, linky, agenty a všechno, co na ně odkazuje (commit dělá volající)."""
+    for model in WIPE_ORDER:
+        db.session.execute(delete(model))
+
+
+def generate_synthetic_map(cities: int, lines: int, agents: int, seed: int = 0) -> Dict[str, int]:
+    """Přepíše mapu syntetickými daty v jedné transakci a vrátí počty řádků."""
+    rng = np.random.default_rng(seed)
+    wipe_map()
+
+    city_data = generate_cities(cities, rng)
+    seed_regions_and_cities(REGIONS, city_data)
+    db.session.flush()
+
+    rows = db.session.execute(
+        db.select(City.id, City.importance, City.lat, City.lon).order_by(City.id)
+    ).all()
+    city_ids = np.array([row.id for row in rows], dtype=np.int64)
+    importance = np.array([row.importance for row in rows], dtype=np.int64)
+    lat = np.array([row.lat for row in rows])
+    lon = np.array([row.lon for row in rows])
+
+    pairs = generate_line_pairs(lat, lon, lines, rng)
+    a, b = pairs[:, 0], pairs[:, 1]
+    distances = _haversine(lat[a], lon[a], lat[b], lon[b]) * DISTANCE_SCALE
+    line_rows = [
+        {
+            "from_city_id": int(city_ids[i]),
+            "to_city_id": int(city_ids[j]),
+            "line_type": _compute_line_type(int(importance[i]), int(importance[j])),
+            "frequency_minutes": _compute_frequency(int(importance[i]), int(importance[j])),
+            "distance_units": round(float(dist), 2),
+            "is_active": True,
+        }
+        for i, j, dist in zip(a, b, distances)
+    ]
+    bulk_insert(TrainLine, line_rows)
+
+    agent_cities = city_ids[rng.integers(0, len(city_ids), size=agents)] if len(city_ids) else []
+    agent_rows = [
+        {
+            "codename": f"Bench-{idx + 1:05d}",
+            "level": 1,
+            "xp": 0,
+            "energy_current": 5,
+            "energy_max": 5,
+            "current_city_id": int(city_id),
+            "hq_city_id": int(city_id),
+        }
+        for idx, city_id in enumerate(agent_cities)
+    ]
+    bulk_insert(Agent, agent_rows)
+
+    return {"regions": len(REGIONS), "cities": len(city_ids), "lines": len(line_rows), "agents": len(agent_rows)}
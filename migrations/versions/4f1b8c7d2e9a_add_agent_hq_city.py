@@ -16,14 +16,21 @@ branch_labels = None
 depends_on = None
 
 
+def _agents_schema(offline_default):
+    """Column and FK names of agents; offline (--sql) there is nothing to inspect."""
+    if op.get_context().as_sql:
+        return offline_default, offline_default
+    inspector = sa.inspect(op.get_bind())
+    columns = {col["name"] for col in inspector.get_columns("agents")}
+    fk_names = {fk.get("name") for fk in inspector.get_foreign_keys("agents")}
+    return columns, fk_names
+
+
 def upgrade():
-    bind = op.get_bind()
-    inspector = sa.inspect(bind)
-    columns = [col["name"] for col in inspector.get_columns("agents")]
+    columns, fk_names = _agents_schema(set())
     if "hq_city_id" not in columns:
         op.add_column("agents", sa.Column("hq_city_id", sa.Integer(), nullable=True))
 
-    fk_names = {fk.get("name") for fk in inspector.get_foreign_keys("agents")}
     if "fk_agents_hq_city_id" not in fk_names:
         with op.batch_alter_table("agents") as batch:
             batch.create_foreign_key(
@@ -35,13 +42,10 @@ def upgrade():
 
 
 def downgrade():
-    bind = op.get_bind()
-    inspector = sa.inspect(bind)
-    fk_names = {fk.get("name") for fk in inspector.get_foreign_keys("agents")}
+    columns, fk_names = _agents_schema({"hq_city_id", "fk_agents_hq_city_id"})
     if "fk_agents_hq_city_id" in fk_names:
         with op.batch_alter_table("agents") as batch:
             batch.drop_constraint("fk_agents_hq_city_id", type_="foreignkey")
 
-    columns = [col["name"] for col in inspector.get_columns("agents")]
     if "hq_city_id" in columns:
         op.drop_column("agents", "hq_city_id")
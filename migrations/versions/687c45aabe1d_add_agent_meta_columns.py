@@ -16,25 +16,50 @@ branch_labels = None
 depends_on = None
 
 
+META_COLUMNS = ("codename", "credits", "infection_level", "last_action_at")
+
+
+def _agents_schema():
+    """Column and unique-constraint names of agents.
+
+    c7a8f9b1c2d3 already creates these columns, so on a fresh database this
+    revision has nothing to do; offline (--sql) assume that fresh chain.
+    """
+    if op.get_context().as_sql:
+        return set(META_COLUMNS), set()
+    inspector = sa.inspect(op.get_bind())
+    columns = {col["name"] for col in inspector.get_columns("agents")}
+    uniques = {uq.get("name") for uq in inspector.get_unique_constraints("agents")}
+    return columns, uniques
+
+
 def upgrade():
-    # ### commands auto generated by Alembic - please adjust! ###
-    with op.batch_alter_table('agents', schema=None) as batch_op:
-        batch_op.add_column(sa.Column('codename', sa.String(length=100), nullable=True))
-        batch_op.add_column(sa.Column('credits', sa.Integer(), nullable=False, server_default=sa.text("0")))
-        batch_op.add_column(sa.Column('infection_level', sa.Integer(), nullable=False, server_default=sa.text("0")))
-        batch_op.add_column(sa.Column('last_action_at', sa.DateTime(), nullable=True))
-        batch_op.create_unique_constraint('uq_agents_codename', ['codename'])
+    columns, _ = _agents_schema()
+    if set(META_COLUMNS) <= columns:
+        return
 
-    # ### end Alembic commands ###
+    with op.batch_alter_table('agents', schema=None) as batch_op:
+        if 'codename' not in columns:
+            batch_op.add_column(sa.Column('codename', sa.String(length=100), nullable=True))
+        if 'credits' not in columns:
+            batch_op.add_column(sa.Column('credits', sa.Integer(), nullable=False, server_default=sa.text("0")))
+        if 'infection_level' not in columns:
+            batch_op.add_column(sa.Column('infection_level', sa.Integer(), nullable=False, server_default=sa.text("0")))
+        if 'last_action_at' not in columns:
+            batch_op.add_column(sa.Column('last_action_at', sa.DateTime(), nullable=True))
+        if 'codename' not in columns:
+            batch_op.create_unique_constraint('uq_agents_codename', ['codename'])
 
 
 def downgrade():
-    # ### commands auto generated by Alembic - please adjust! ###
+    # only undo what upgrade() added (the named constraint marks that case)
+    columns, uniques = _agents_schema()
+    if 'uq_agents_codename' not in uniques:
+        return
+
     with op.batch_alter_table('agents', schema=None) as batch_op:
         batch_op.drop_constraint('uq_agents_codename', type_='unique')
         batch_op.drop_column('last_action_at')
         batch_op.drop_column('infection_level')
         batch_op.drop_column('credits')
         batch_op.drop_column('codename')
-
-    # ### end Alembic commands ###
@@ -0,0 +1,38 @@
+"""add hot lookup indexes
+
+Revision ID: 6a2d9c4e8b1f
+Revises: 4f1b8c7d2e9a
+Create Date: 2026-10-17 10:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "6a2d9c4e8b1f"
+down_revision = "4f1b8c7d2e9a"
+branch_labels = None
+depends_on = None
+
+# ix_agent_travel_log_agent_id_created_at already exists (1f2e3d4c5b6a)
+INDEXES = (
+    ("ix_train_lines_from_city_id_is_active", "train_lines", ["from_city_id", "is_active"]),
+    ("ix_train_lines_to_city_id_is_active", "train_lines", ["to_city_id", "is_active"]),
+    ("ix_active_tasks_agent_id_task_id", "active_tasks", ["agent_id", "task_id"]),
+    ("ix_active_tasks_agent_id_status", "active_tasks", ["agent_id", "status"]),
+    ("ix_lab_action_states_agent_id_lab_action_id", "lab_action_states", ["agent_id", "lab_action_id"]),
+    ("ix_cities_name", "cities", ["name"]),
+    ("ix_cities_name_lower", "cities", [sa.text("lower(name)")]),
+)
+
+
+def upgrade():
+    # if_not_exists: databases created by db.create_all() already have them
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
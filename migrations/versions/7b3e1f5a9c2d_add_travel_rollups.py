@@ -0,0 +1,82 @@
+"""add travel rollups
+
+Revision ID: 7b3e1f5a9c2d
+Revises: 6a2d9c4e8b1f
+Create Date: 2026-10-17 12:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "7b3e1f5a9c2d"
+down_revision = "6a2d9c4e8b1f"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "agent_city_visits",
+        sa.Column("agent_id", sa.Integer(), sa.ForeignKey("agents.id"), primary_key=True),
+        sa.Column("city_id", sa.Integer(), sa.ForeignKey("cities.id"), primary_key=True),
+        sa.Column("visits", sa.Integer(), nullable=False),
+        sa.Column("last_visited_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_agent_city_visits_agent_id_visits", "agent_city_visits", ["agent_id", "visits"])
+
+    op.create_table(
+        "agent_line_usage",
+        sa.Column("agent_id", sa.Integer(), sa.ForeignKey("agents.id"), primary_key=True),
+        sa.Column("city_a_id", sa.Integer(), sa.ForeignKey("cities.id"), primary_key=True),
+        sa.Column("city_b_id", sa.Integer(), sa.ForeignKey("cities.id"), primary_key=True),
+        sa.Column("trips", sa.Integer(), nullable=False),
+    )
+    op.create_index("ix_agent_line_usage_agent_id_trips", "agent_line_usage", ["agent_id", "trips"])
+
+    op.create_table(
+        "agent_week_activity",
+        sa.Column("agent_id", sa.Integer(), sa.ForeignKey("agents.id"), primary_key=True),
+        sa.Column("game_week", sa.Integer(), primary_key=True),
+        sa.Column("trips", sa.Integer(), nullable=False),
+        sa.Column("last_game_minutes", sa.Integer(), nullable=True),
+    )
+
+    # backfill from the existing log (portable SQL, no LEAST/GREATEST)
+    op.execute(
+        """
+        INSERT INTO agent_city_visits (agent_id, city_id, visits, last_visited_at)
+        SELECT agent_id, to_city_id, COUNT(*), MAX(created_at)
+        FROM agent_travel_log
+        GROUP BY agent_id, to_city_id
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO agent_line_usage (agent_id, city_a_id, city_b_id, trips)
+        SELECT agent_id,
+               CASE WHEN from_city_id < to_city_id THEN from_city_id ELSE to_city_id END,
+               CASE WHEN from_city_id < to_city_id THEN to_city_id ELSE from_city_id END,
+               COUNT(*)
+        FROM agent_travel_log
+        WHERE from_city_id IS NOT NULL AND from_city_id <> to_city_id
+        GROUP BY 1, 2, 3
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO agent_week_activity (agent_id, game_week, trips, last_game_minutes)
+        SELECT agent_id, game_week, COUNT(*), MAX(game_minutes)
+        FROM agent_travel_log
+        GROUP BY agent_id, game_week
+        """
+    )
+
+
+def downgrade():
+    op.drop_table("agent_week_activity")
+    op.drop_index("ix_agent_line_usage_agent_id_trips", table_name="agent_line_usage")
+    op.drop_table("agent_line_usage")
+    op.drop_index("ix_agent_city_visits_agent_id_visits", table_name="agent_city_visits")
+    op.drop_table("agent_city_visits")
@@ -0,0 +1,74 @@
+"""move agent inventory from JSON to agent_inventory_items
+
+Revision ID: 8c4d2a6f1e3b
+Revises: 7b3e1f5a9c2d
+Create Date: 2026-10-17 14:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "8c4d2a6f1e3b"
+down_revision = "7b3e1f5a9c2d"
+branch_labels = None
+depends_on = None
+
+# one row per numeric JSON key; the JSON functions differ per backend
+COPY_FROM_JSON = {
+    "sqlite": """
+        INSERT INTO agent_inventory_items (agent_id, item, quantity)
+        SELECT agents.id, kv.key, CAST(kv.value AS INTEGER)
+        FROM agents, json_each(agents.inventory) AS kv
+        WHERE kv.type IN ('integer', 'real')
+    """,
+    "postgresql": """
+        INSERT INTO agent_inventory_items (agent_id, item, quantity)
+        SELECT agents.id, kv.key, CAST(kv.value #>> '{}' AS NUMERIC)::integer
+        FROM agents, json_each(agents.inventory) AS kv
+        WHERE json_typeof(kv.value) = 'number'
+    """,
+}
+
+COPY_TO_JSON = {
+    "sqlite": """
+        UPDATE agents SET inventory = COALESCE(
+            (SELECT json_group_object(item, quantity) FROM agent_inventory_items WHERE agent_id = agents.id),
+            '{}'
+        )
+    """,
+    "postgresql": """
+        UPDATE agents SET inventory = COALESCE(
+            (SELECT json_object_agg(item, quantity) FROM agent_inventory_items WHERE agent_id = agents.id),
+            '{}'::json
+        )
+    """,
+}
+
+
+def upgrade():
+    op.create_table(
+        "agent_inventory_items",
+        sa.Column("agent_id", sa.Integer(), sa.ForeignKey("agents.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("item", sa.String(length=50), primary_key=True),
+        sa.Column("quantity", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.create_index("ix_agent_inventory_items_item_quantity", "agent_inventory_items", ["item", "quantity"])
+
+    op.execute(COPY_FROM_JSON[op.get_context().dialect.name])
+
+    with op.batch_alter_table("agents", schema=None) as batch_op:
+        batch_op.drop_column("inventory")
+
+
+def downgrade():
+    with op.batch_alter_table("agents", schema=None) as batch_op:
+        batch_op.add_column(
+            sa.Column("inventory", sa.JSON(), nullable=False, server_default=sa.text("'{}'"))
+        )
+
+    op.execute(COPY_TO_JSON[op.get_context().dialect.name])
+
+    op.drop_index("ix_agent_inventory_items_item_quantity", table_name="agent_inventory_items")
+    op.drop_table("agent_inventory_items")
@@ -37,8 +37,8 @@ def upgrade():
         sa.Column("credits", sa.Integer(), nullable=False, server_default=sa.text("0")),
         sa.Column("infection_level", sa.Integer(), nullable=False, server_default=sa.text("0")),
         sa.Column("last_action_at", sa.DateTime(), nullable=True),
-        sa.Column("is_active", sa.Boolean(), nullable=False, server_default=sa.text("1")),
-        sa.Column("is_infected", sa.Boolean(), nullable=False, server_default=sa.text("0")),
+        sa.Column("is_active", sa.Boolean(), nullable=False, server_default=sa.true()),
+        sa.Column("is_infected", sa.Boolean(), nullable=False, server_default=sa.false()),
         sa.Column(
             "created_at",
             sa.DateTime(),
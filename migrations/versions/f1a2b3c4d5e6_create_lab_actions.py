@@ -42,8 +42,8 @@ def upgrade():
         sa.Column("id", sa.Integer(), nullable=False),
         sa.Column("lab_action_id", sa.Integer(), nullable=False),
         sa.Column("agent_id", sa.Integer(), nullable=False),
-        sa.Column("is_unlocked", sa.Boolean(), nullable=False, server_default=sa.text("0")),
-        sa.Column("is_disabled", sa.Boolean(), nullable=False, server_default=sa.text("0")),
+        sa.Column("is_unlocked", sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column("is_disabled", sa.Boolean(), nullable=False, server_default=sa.false()),
         sa.Column("last_used_at", sa.DateTime(), nullable=True),
         sa.Column("uses_count", sa.Integer(), nullable=False, server_default=sa.text("0")),
         sa.Column("notes", sa.Text(), nullable=True),
@@ -6,6 +6,8 @@ import click
 from app.extensions import db
 from app.models.agent import Agent
 from app.models.city import City
+from app.services.agent_service import create_agent
+from app.services.task_service import advance_task_pipeline
 
 
 def register_agent_seed_commands(app):
@@ -23,22 +25,8 @@ def register_agent_seed_commands(app):
       click.echo("No cities found. Run seed-cities first.")
       return
 
-    agent = Agent(
-      level=1,
-      xp=0,
-      energy_current=5,
-      energy_max=5,
-      data_current=0,
-      data_max=100,
-      material_current=0,
-      material_max=100,
-      credits=0,
-      current_city_id=city.id,
-      total_trips=0,
-      total_cleaned_cities=0,
-      codename="Agent-01",
-    )
-    db.session.add(agent)
+    agent = create_agent(codename="Agent-01", city=city)
     db.session.commit()
+    advance_task_pipeline(agent)
 
     click.echo(f"✅ Agent created with id={agent.id} in {city.name}.")
@@ -0,0 +1,45 @@
+# seeds/bulk.py
+#
+# Hromadné zápisy pro seed příkazy:
+# - existující klíče se načtou jedním dotazem
+# - nové řádky jdou přes INSERT po dávkách (executemany / insertmanyvalues)
+# - existující řádky přes hromadný UPDATE podle primárního klíče
+# Commit řeší volající – celý seed je jedna transakce.
+
+import time
+
+from sqlalchemy import insert, update
+
+from app.extensions import db
+
+BATCH_SIZE = 5000
+
+
+def _batches(rows, size):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def bulk_insert(model, rows, batch_size: int = BATCH_SIZE) -> int:
+    """Vloží seznam dictů (sloupec → hodnota) bez vytváření ORM objektů."""
+    for batch in _batches(rows, batch_size):
+        db.session.execute(insert(model), batch)
+    return len(rows)
+
+
+def bulk_update(model, rows, batch_size: int = BATCH_SIZE) -> int:
+    """Aktualizuje řádky podle primárního klíče – každý dict musí obsahovat "id"."""
+    for batch in _batches(rows, batch_size):
+        db.session.execute(update(model), batch)
+    return len(rows)
+
+
+class SeedTimer:
+    """Měří dobu seedu a vypisuje propustnost v řádcích za sekundu."""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+
+    def report(self, label: str, rows: int) -> None:
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        print(f"  ➜ {label}: {rows} řádků za {elapsed:.2f} s ({rows / elapsed:,.0f} řádků/s)")
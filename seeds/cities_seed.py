@@ -1,8 +1,12 @@
 # cities_seed.py
 
+from sqlalchemy import select
+
 from app.extensions import db
 from app.models.region import Region
 from app.models.city import City
+from app.services.rail_network_service import invalidate_rail_network
+from seeds.bulk import SeedTimer, bulk_insert, bulk_update
 
 REGIONS = {
     "pacific_northwest": "Pacific Northwest",
@@ -1329,50 +1333,70 @@ for city in CITIES:
 
 
 
+def _city_row(data, region_ids):
+    row = {
+        "name": data["name"],
+        "region_id": region_ids[data["region"]],
+        "importance": data["importance"],
+        "lat": data["lat"],
+        "lon": data["lon"],
+        "px": data["px"],
+        "py": data["py"],
+        "grid_x": data["grid_x"],
+        "grid_y": data["grid_y"],
+        "population": data["population"],
+    }
+    row["state"], row["state_shortcut"] = STATE_MAP.get(data["name"], (None, None))
+
+    # doplníme popis z mapy, pokud je k dispozici
+    desc = DESCRIPTION_MAP.get(data["name"])
+    if desc:
+        row["description"] = desc
+    return row
+
+
+def seed_regions_and_cities(regions, cities):
+    """
+    Hromadný upsert regionů a měst (klíčem je code / name).
+    Vrací (počet nových, počet aktualizovaných) měst; commit dělá volající.
+    """
+    existing_regions = {code: region_id for region_id, code in db.session.execute(select(Region.id, Region.code))}
+    bulk_insert(
+        Region,
+        [{"code": code, "name": name} for code, name in regions.items() if code not in existing_regions],
+    )
+    region_ids = {code: region_id for region_id, code in db.session.execute(select(Region.id, Region.code))}
+
+    existing_cities = {}
+    for city_id, name in db.session.execute(select(City.id, City.name).order_by(City.id)):
+        existing_cities.setdefault(name, city_id)
+
+    # poslední výskyt jména vyhrává – stejně jako dřív opakované přepsání téhož města
+    rows_by_name = {data["name"]: _city_row(data, region_ids) for data in cities}
+    inserts = []
+    updates = []
+    for name, row in rows_by_name.items():
+        city_id = existing_cities.get(name)
+        if city_id is None:
+            inserts.append(row)
+        else:
+            updates.append({"id": city_id, **row})
+
+    bulk_insert(City, inserts)
+    bulk_update(City, updates)
+    return len(inserts), len(updates)
+
+
 def register_city_seed_commands(app):
     @app.cli.command("seed-cities")
     def seed_cities():
         """Seed regions and cities for the map."""
         print("Seeding regions & cities...")
+        timer = SeedTimer()
 
-        # Regions
-        region_cache = {}
-        for code, name in REGIONS.items():
-            region = Region.query.filter_by(code=code).first()
-            if not region:
-                region = Region(code=code, name=name)
-                db.session.add(region)
-            region_cache[code] = region
-
-        db.session.flush()  # ať mají regiony id
-
-        # Cities
-        for data in CITIES:
-            city = City.query.filter_by(name=data["name"]).first()
-            if not city:
-                city = City(name=data["name"])
-                db.session.add(city)
-
-            city.region = region_cache[data["region"]]
-            city.importance = data["importance"]
-            city.lat = data["lat"]
-            city.lon = data["lon"]
-            city.px = data["px"]
-            city.py = data["py"]
-            city.grid_x = data["grid_x"]
-            city.grid_y = data["grid_y"]
-            city.population = data["population"]
-            state_info = STATE_MAP.get(city.name)
-            if state_info:
-                city.state, city.state_shortcut = state_info
-            else:
-                city.state = None
-                city.state_shortcut = None
-
-            # doplníme popis z mapy, pokud je k dispozici
-            desc = DESCRIPTION_MAP.get(city.name)
-            if desc:
-                city.description = desc
+        inserted, updated = seed_regions_and_cities(REGIONS, CITIES)
 
         db.session.commit()
+        invalidate_rail_network()
+        timer.report(f"města (nová {inserted}, aktualizovaná {updated})", inserted + updated)
         print("✅ Seed hotový")
@@ -1,7 +1,10 @@
 # seeds/lab_seed.py
 
+from sqlalchemy import select
+
 from app.extensions import db
 from app.models.lab_action import LabAction
+from seeds.bulk import SeedTimer, bulk_insert, bulk_update
 
 
 LAB_ACTIONS = [
@@ -68,28 +71,44 @@ LAB_ACTIONS = [
 ]
 
 
+def _lab_action_row(payload):
+    return {
+        "code": payload["code"],
+        "name": payload["name"],
+        "category": payload["category"],
+        "description": payload["description"],
+        "unlock_level": payload.get("unlock_level", 1),
+        "unlock_cleaned_cities": payload.get("unlock_cleaned_cities", 0),
+        "unlock_requirements": payload.get("unlock_requirements", {}),
+        "energy_cost": payload.get("energy_cost", 0),
+        "data_cost": payload.get("data_cost", 0),
+        "material_cost": payload.get("material_cost", 0),
+        "cooldown_minutes": payload.get("cooldown_minutes", 0),
+    }
+
+
 def register_lab_seed_commands(app):
     @app.cli.command("seed-lab")
     def seed_lab_actions():
         """Seed laboratorní akce."""
 
         print("Seeding lab actions...")
+        timer = SeedTimer()
+
+        existing = {code: action_id for action_id, code in db.session.execute(select(LabAction.id, LabAction.code))}
+        inserts = []
+        updates = []
         for payload in LAB_ACTIONS:
-            action = LabAction.query.filter_by(code=payload["code"]).first()
-            if not action:
-                action = LabAction(code=payload["code"])
-                db.session.add(action)
+            row = _lab_action_row(payload)
+            action_id = existing.get(row["code"])
+            if action_id is None:
+                inserts.append(row)
+            else:
+                updates.append({"id": action_id, **row})
 
-            action.name = payload["name"]
-            action.category = payload["category"]
-            action.description = payload["description"]
-            action.unlock_level = payload.get("unlock_level", 1)
-            action.unlock_cleaned_cities = payload.get("unlock_cleaned_cities", 0)
-            action.unlock_requirements = payload.get("unlock_requirements", {})
-            action.energy_cost = payload.get("energy_cost", 0)
-            action.data_cost = payload.get("data_cost", 0)
-            action.material_cost = payload.get("material_cost", 0)
-            action.cooldown_minutes = payload.get("cooldown_minutes", 0)
+        bulk_insert(LabAction, inserts)
+        bulk_update(LabAction, updates)
 
         db.session.commit()
+        timer.report("laboratorní akce", len(inserts) + len(updates))
         print("✅ Lab actions ready")
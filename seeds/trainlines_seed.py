@@ -1,9 +1,14 @@
 # seeds/trainlines_seed.py
 
 import math
+
+import numpy as np
+
 from app.extensions import db
 from app.models.city import City
 from app.models.train_line import TrainLine
+from app.services.rail_network_service import invalidate_rail_network
+from seeds.bulk import SeedTimer, bulk_insert
 
 
 MIN_NEIGHBORS = 5  # každé město dostane alespoň 5 sousedů ještě před ořezem
@@ -84,6 +89,66 @@ def _compute_distance(city_a: City, city_b: City) -> float:
     return math.sqrt(dx * dx + dy * dy) * SCALE
 
 
+class _CityCoords:
+    """
+    Souřadnice všech měst jako NumPy pole. Vzdálenosti se počítají po celých
+    řádcích (jedno město → všechna ostatní) stejným vzorcem jako _compute_distance,
+    takže generátor nepotřebuje N×N matici ani opakované volání haversinu v Pythonu.
+    """
+
+    SCALE = 1.416
+    R = 3958.8
+
+    def __init__(self, cities):
+        def column(attr):
+            return np.array(
+                [getattr(c, attr) if getattr(c, attr) is not None else np.nan for c in cities],
+                dtype=np.float64,
+            )
+
+        lat = column("lat")
+        lon = column("lon")
+        self.has_gps = ~(np.isnan(lat) | np.isnan(lon))
+        self.lat = np.radians(np.where(self.has_gps, lat, 0.0))
+        self.lon = np.radians(np.where(self.has_gps, lon, 0.0))
+        self.cos_lat = np.cos(self.lat)
+        self.px = np.nan_to_num(column("px"))
+        self.py = np.nan_to_num(column("py"))
+        self.all_gps = bool(self.has_gps.all())
+
+    def row(self, idx: int, targets=None) -> np.ndarray:
+        """Vzdálenosti v mílích z města na pozici idx do targets (default všechna města)."""
+        if targets is None:
+            targets = slice(None)
+        dlat = self.lat[targets] - self.lat[idx]
+        dlon = self.lon[targets] - self.lon[idx]
+        a = np.sin(dlat / 2) ** 2 + self.cos_lat[idx] * self.cos_lat[targets] * np.sin(dlon / 2) ** 2
+        c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+        distances = self.R * c * self.SCALE
+        if self.all_gps:
+            return distances
+
+        both_gps = self.has_gps[targets] & self.has_gps[idx]
+        dx = self.px[idx] - self.px[targets]
+        dy = self.py[idx] - self.py[targets]
+        return np.where(both_gps, distances, np.sqrt(dx * dx + dy * dy) * self.SCALE)
+
+
+def _k_nearest(distances: np.ndarray, k: int) -> np.ndarray:
+    """
+    Pozice k nejbližších měst (vyřazená mají vzdálenost inf), seřazené podle
+    vzdálenosti a při shodě podle pořadí měst – stejně jako stabilní sorted().
+    """
+    available = int(np.count_nonzero(np.isfinite(distances)))
+    k = min(k, available)
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    kth = distances[np.argpartition(distances, k - 1)[k - 1]]
+    candidates = np.flatnonzero(distances <= kth)
+    order = np.lexsort((candidates, distances[candidates]))
+    return candidates[order][:k]
+
+
 def _compute_frequency(imp_a: int, imp_b: int) -> int:
     """
     Frekvence podle kombinace důležitostí (symetricky).
@@ -125,12 +190,13 @@ def _compute_line_type(imp_a: int, imp_b: int) -> str:
     return "regional"
 
 
-def _select_neighbors(city: City, neighbor_ids, cities_by_id) -> set:
+def _select_neighbors(city: City, neighbor_ids, cities_by_id, distances_by_id) -> set:
     """
     Ořízne seznam sousedů podle nové logiky:
       level 1 → 3–5 spojů do level 1 + 5–8 do level 2/3, max 12 celkem
       level 2 → 1–2 do level 1 + 5–8 do level 2/3, max 10 celkem
       level 3 → 0–2 do level 1 + 3–6 do level 2/3, min 4, max 8 celkem
+    distances_by_id: vzdálenosti z `city` do sousedů (dict id → míle).
     """
     rules = _get_level_rules(city.importance)
     min_total = rules["min_total"]
@@ -143,8 +209,7 @@ def _select_neighbors(city: City, neighbor_ids, cities_by_id) -> set:
         bucket_idx = _find_bucket_index(buckets, _normalize_importance(other.importance))
         if bucket_idx is None:
             continue
-        dist = _compute_distance(city, other)
-        entries.append((nid, dist, bucket_idx))
+        entries.append((nid, distances_by_id[nid], bucket_idx))
 
     entries.sort(key=lambda x: x[1])
 
@@ -202,17 +267,23 @@ def register_trainlines_commands(app):
         """Auto-generate train lines based on city regions and importance."""
         print("🚂 Generuji vlakové linky...")
 
+        timer = SeedTimer()
+
         # 0) Smazat existující linky
+        # celé generování běží v jedné transakci: síť se skládá v paměti
+        # a do DB jdou až výsledné linky jedním hromadným INSERTem
         TrainLine.query.delete()
-        db.session.commit()
 
         cities = City.query.all()
         if not cities:
+            db.session.commit()
             print("❌ Žádná města v DB. Nejprve spusť: flask seed-cities")
             return
 
         # Indexy
         cities_by_id = {c.id: c for c in cities}
+        position_by_id = {c.id: idx for idx, c in enumerate(cities)}
+        coords = _CityCoords(cities)
         regions_map = {}
         for city in cities:
             regions_map.setdefault(city.region_id, []).append(city)
@@ -220,8 +291,9 @@ def register_trainlines_commands(app):
         # pro kontrolu duplicit a stupně vrcholů
         created_pairs = set()          # { (min_id, max_id) }
         neighbors = {c.id: set() for c in cities}  # id → set sousedů
+        degree = np.zeros(len(cities), dtype=np.int64)  # = len(neighbors[...]) po pozicích
 
-        lines_by_pair = {}
+        lines_by_pair = {}  # { (min_id, max_id): řádek pro INSERT } v pořadí vzniku
 
         def add_line(city_a: City, city_b: City) -> bool:
             """Bezpečně přidá linku (neduplicitně) a aktualizuje adjacency."""
@@ -237,21 +309,40 @@ def register_trainlines_commands(app):
             freq = _compute_frequency(city_a.importance, city_b.importance)
             line_type = _compute_line_type(city_a.importance, city_b.importance)
 
-            line = TrainLine(
-                from_city_id=city_a.id,
-                to_city_id=city_b.id,
-                distance_units=dist,
-                frequency_minutes=freq,
-                line_type=line_type,
-                is_active=True,
-            )
-            db.session.add(line)
-            lines_by_pair[key] = line
+            lines_by_pair[key] = {
+                "from_city_id": city_a.id,
+                "to_city_id": city_b.id,
+                "distance_units": dist,
+                "frequency_minutes": freq,
+                "line_type": line_type,
+                "is_active": True,
+            }
 
             neighbors[city_a.id].add(city_b.id)
             neighbors[city_b.id].add(city_a.id)
+            degree[position_by_id[city_a.id]] += 1
+            degree[position_by_id[city_b.id]] += 1
             return True
 
+        def remove_line(pair) -> bool:
+            if lines_by_pair.pop(pair, None) is None:
+                return False
+            from_id, to_id = pair  # klíč je (min_id, max_id) – pro sousedy na směru nezáleží
+            created_pairs.discard(pair)
+            neighbors[from_id].discard(to_id)
+            neighbors[to_id].discard(from_id)
+            degree[position_by_id[from_id]] -= 1
+            degree[position_by_id[to_id]] -= 1
+            return True
+
+        def distances_without_neighbors(city: City) -> np.ndarray:
+            """Řádek vzdáleností, kde město samo a jeho sousedé mají inf."""
+            distances = coords.row(position_by_id[city.id])
+            distances[position_by_id[city.id]] = np.inf
+            if neighbors[city.id]:
+                distances[[position_by_id[nid] for nid in neighbors[city.id]]] = np.inf
+            return distances
+
         # ------------------------------------------------------
         # 1) HUB → všechna města v jeho regionu
         # ------------------------------------------------------
@@ -271,17 +362,14 @@ def register_trainlines_commands(app):
         # ------------------------------------------------------
         print("  ➜ Generuji meziregionální hub ↔ hub linky...")
         all_hubs = [c for c in cities if c.importance == 1]
+        hub_positions = np.array([position_by_id[h.id] for h in all_hubs], dtype=np.intp)
+        hub_regions = np.array([h.region_id for h in all_hubs])
 
         for hub in all_hubs:
-            candidates = [c for c in all_hubs if c.region_id != hub.region_id]
-            if not candidates:
-                continue
-
-            candidates_sorted = sorted(
-                candidates, key=lambda x: _compute_distance(hub, x)
-            )
-            for other_hub in candidates_sorted[:HUB_NEIGHBORS_ACROSS_REGIONS]:
-                add_line(hub, other_hub)
+            distances = coords.row(position_by_id[hub.id], hub_positions)
+            distances[hub_regions == hub.region_id] = np.inf
+            for hub_idx in _k_nearest(distances, HUB_NEIGHBORS_ACROSS_REGIONS):
+                add_line(hub, all_hubs[hub_idx])
 
         # ------------------------------------------------------
         # 3) Každé město má alespoň N sousedů (globálně dle vzdálenosti)
@@ -291,65 +379,47 @@ def register_trainlines_commands(app):
         all_cities_list = list(cities)
 
         for city in all_cities_list:
-            while len(neighbors[city.id]) < MIN_NEIGHBORS:
-                # najít nejbližší město, které ještě není soused
-                candidates = [
-                    other for other in all_cities_list
-                    if other.id != city.id and other.id not in neighbors[city.id]
-                ]
-                if not candidates:
-                    break  # už není koho přidat
-
-                candidates_sorted = sorted(
-                    candidates, key=lambda x: _compute_distance(city, x)
-                )
-                nearest = candidates_sorted[0]
-                add_line(city, nearest)
+            missing = MIN_NEIGHBORS - len(neighbors[city.id])
+            if missing <= 0:
+                continue
+            # k nejbližších, kteří ještě nejsou sousedé – přidáváme je od nejbližšího,
+            # stejně jako dřív opakované "najdi nejbližšího nesouseda"
+            for idx in _k_nearest(distances_without_neighbors(city), missing):
+                add_line(city, all_cities_list[idx])
 
         removed_count = 0
         if TRIM_LINES_BY_IMPORTANCE:
-            db.session.commit()
             print(f"  ➜ Ořežu linky podle důležitosti měst...")
 
             to_remove = set()
             for city in cities:
-                allowed = _select_neighbors(city, neighbors[city.id], cities_by_id)
-                for nid in list(neighbors[city.id]):
+                neighbor_ids = list(neighbors[city.id])
+                neighbor_distances = coords.row(
+                    position_by_id[city.id],
+                    np.array([position_by_id[nid] for nid in neighbor_ids], dtype=np.intp),
+                )
+                distances_by_id = dict(zip(neighbor_ids, neighbor_distances.tolist()))
+                allowed = _select_neighbors(city, neighbors[city.id], cities_by_id, distances_by_id)
+                for nid in neighbor_ids:
                     if nid not in allowed:
                         pair = tuple(sorted((city.id, nid)))
                         to_remove.add(pair)
 
             for pair in to_remove:
-                line = lines_by_pair.get(pair)
-                if line:
-                    from_id = line.from_city_id
-                    to_id = line.to_city_id
-                    db.session.delete(line)
+                if remove_line(pair):
                     removed_count += 1
-                    lines_by_pair.pop(pair, None)
-                    created_pairs.discard(pair)
-                    neighbors[from_id].discard(to_id)
-                    neighbors[to_id].discard(from_id)
-
-            db.session.commit()
         else:
-            db.session.commit()
             print("  ➜ Přeskakuji ořez linek, nechávám plnou hustotu.")
 
+        max_total = np.array([_get_level_rules(c.importance)["max_total"] for c in all_cities_list])
+
         def _find_min_candidate(source_city: City):
-            candidates = sorted(
-                (
-                    other for other in all_cities_list
-                    if other.id != source_city.id and other.id not in neighbors[source_city.id]
-                ),
-                key=lambda other: _compute_distance(source_city, other),
-            )
-            for other in candidates:
-                other_rules = _get_level_rules(other.importance)
-                if len(neighbors[other.id]) >= other_rules["max_total"]:
-                    continue
-                return other
-            return None
+            distances = distances_without_neighbors(source_city)
+            distances[degree >= max_total] = np.inf
+            idx = int(np.argmin(distances))
+            if not np.isfinite(distances[idx]):
+                return None
+            return all_cities_list[idx]
 
         print("  ➜ Dorovnávám města pod minimem spojů...")
         min_topups = 0
@@ -365,11 +435,13 @@ def register_trainlines_commands(app):
                     break
                 min_topups += 1
 
-        if min_topups:
-            db.session.commit()
+        final_count = bulk_insert(TrainLine, list(lines_by_pair.values()))
+        db.session.commit()
+        timer.report("vlakové linky", final_count)
 
         if stuck_cities:
             print(f"  ⚠️ Nepodařilo se dorovnat minima pro: {', '.join(sorted(set(stuck_cities)))} (žádní dostupní kandidáti pod maximem).")
 
-        final_count = TrainLine.query.count()
+        invalidate_rail_network()
+
         print(f"✅ Hotovo, vytvořeno {final_count} vlakových linek (odebráno {removed_count}, doplněno {min_topups}).")